@@ -0,0 +1,60 @@
+# benchmarks/bench_excel.py
+#
+# Exporta a Excel bases temporales de distintos tamaños y mide el tiempo y el
+# pico de memoria de Python (tracemalloc): con la exportación por páginas el
+# pico debe ser casi el mismo sin importar cuántos gastos haya (el tiempo
+# incluye lo que tracemalloc agrega a cada asignación).
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_excel [cantidad ...]
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from modules import db_handler
+from modules.excel_export import exportar_libro_excel
+from modules.importador import leer_gastos
+from benchmarks.bench_tabla_virtual import llenar
+
+
+def medir(cantidad, carpeta):
+    db_handler.cerrar_conexion()
+    db_handler.DB_PATH = os.path.join(carpeta, f"bench_{cantidad}.db")
+    db_handler.init_db()
+    llenar(cantidad)
+    db_handler.insertar_ingresos_lote([("Salario", 20000.0, "mensual", "2025-01-01", "Trabajo")])
+    ruta = os.path.join(carpeta, f"bench_{cantidad}.xlsx")
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    escritas = exportar_libro_excel(ruta, [("Embarazo", 9, 1000.0, 1050.0)])
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{escritas['gastos']:>8} gastos: {segundos:6.1f} s, pico {pico / 2**20:6.1f} MiB, "
+          f"archivo {os.path.getsize(ruta) / 2**20:.1f} MiB")
+
+
+def comprobar_ida_y_vuelta(carpeta):
+    """El libro exportado se puede volver a importar y da los mismos gastos que la base."""
+    ruta = os.path.join(carpeta, "bench_100.xlsx")
+    esperados = [tuple(fila[1:]) for fila in db_handler.obtener_gastos()]
+    leidos = list(leer_gastos(ruta))
+    if leidos != esperados:
+        raise AssertionError(f"La importación del libro exportado no coincide ({len(leidos)} de {len(esperados)} filas)")
+    print(f"Ida y vuelta con importador.py: {len(leidos)} gastos iguales")
+
+
+def main(cantidades=(20_000, 100_000, 300_000)):
+    # Un primer export pequeño para que las importaciones no cuenten en el pico;
+    # con él se comprueba también que el libro se puede volver a importar
+    with tempfile.TemporaryDirectory() as carpeta:
+        medir(100, carpeta)
+        comprobar_ida_y_vuelta(carpeta)
+        for cantidad in cantidades:
+            medir(cantidad, carpeta)
+        db_handler.cerrar_conexion()
+
+
+if __name__ == "__main__":
+    main([int(c) for c in sys.argv[1:]] or (20_000, 100_000, 300_000))
@@ -0,0 +1,61 @@
+# benchmarks/bench_expense_store.py
+#
+# Mide cuánto tardan los totales del plan con el almacén columnar de NumPy.
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_expense_store [cantidad]
+
+import sys
+import time
+
+import numpy as np
+
+from modules.models import Etapa, PlanVida, Gasto
+from modules.expense_store import ANUAL
+
+ETAPAS = [("Embarazo", 9), ("Nacimiento", 1), ("Primer Año", 12), ("Segundo Año", 12),
+          ("Tercer Año", 12), ("Cuarto Año", 12), ("Quinto Año", 12)]
+
+
+def crear_plan():
+    plan = PlanVida()
+    for nombre, duracion in ETAPAS:
+        plan.agregar_etapa(Etapa(nombre, duracion))
+    return plan
+
+
+def medir(funcion, repeticiones=20):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main(cantidad=200_000):
+    rng = np.random.default_rng(0)
+    montos = rng.uniform(10, 5000, cantidad).round(2)
+    periodicidades = rng.integers(0, ANUAL + 1, cantidad)
+    etapas = rng.integers(0, len(ETAPAS), cantidad)
+
+    plan = crear_plan()
+    inicio = time.perf_counter()
+    plan.almacen.agregar_lote(montos, periodicidades, etapas)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    total, plan_ms = medir(plan.calcular_total_plan)
+    _, etapa_ms = medir(lambda: [e.calcular_total_gastos() for e in plan.etapas])
+    print(f"{cantidad} gastos cargados en {carga_ms:.2f} ms")
+    print(f"calcular_total_plan: {plan_ms:.3f} ms (total {total:,.2f} MXN)")
+    print(f"calcular_total_gastos de las {len(ETAPAS)} etapas: {etapa_ms:.3f} ms")
+
+    # Referencia: el cálculo anterior, un objeto Gasto por fila sumado en Python
+    textos = ("único", "mensual", "anual")
+    objetos = [[] for _ in ETAPAS]
+    for monto, periodicidad, etapa in zip(montos.tolist(), periodicidades.tolist(), etapas.tolist()):
+        objetos[etapa].append(Gasto("", monto, textos[periodicidad], None, ETAPAS[etapa][0]))
+    referencia, python_ms = medir(
+        lambda: sum(g.calcular_total(ETAPAS[i][1]) for i, lista in enumerate(objetos) for g in lista),
+        repeticiones=3)
+    print(f"Suma con objetos Gasto en Python: {python_ms:.2f} ms (total {referencia:,.2f} MXN)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
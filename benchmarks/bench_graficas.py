@@ -0,0 +1,101 @@
+# benchmarks/bench_graficas.py
+#
+# Comprueba que redibujar una gráfica muchas veces con modules.charts mantiene
+# la memoria estable, y lo compara con crear una figura nueva en cada clic
+# (plt.subplots sin plt.close), que era lo que hacía la aplicación.
+# Se dibuja con Agg, así que no hace falta pantalla.
+# Las cachés de matplotlib (métricas de texto, glifos) se llenan en los primeros
+# redibujados; por eso la memoria de Python se mide (tracemalloc, que es lento)
+# sólo al final, cuando ya deberían estar estables.
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_graficas [redibujados]
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+from modules.charts import Ranura
+
+TRAMO_MEDIDO = 0.1  # Fracción final de los redibujados que se mide con tracemalloc
+MARGEN_KIB = 256  # Crecimiento tolerado en ese tramo
+
+
+def datos(i, meses=60):
+    # Los datos cambian en cada redibujado pero se repiten cada 50, como al alternar escenarios
+    i %= 50
+    meses_x = np.arange(1, meses + 1)
+    return meses_x, np.cumsum(np.full(meses, 1000.0 + i)), np.cumsum(np.full(meses, 1500.0 + i))
+
+
+def redibujar_con_ranura(ranura, i):
+    ranura.preparar("cronograma")
+    x, gastos, ingresos = datos(i)
+    ranura.linea("Gastos", x, gastos, marker="o", label="Gastos")
+    ranura.linea("Ingresos", x, ingresos, marker="o", label="Ingresos")
+    ranura.ax.set_title("Evolución del Cronograma Financiero")
+    ranura.ax.legend()
+    ranura.redibujar()
+
+
+def redibujar_como_antes(i):
+    fig, ax = plt.subplots(figsize=(6, 4))
+    x, gastos, ingresos = datos(i)
+    ax.plot(x, gastos, marker="o", label="Gastos")
+    ax.plot(x, ingresos, marker="o", label="Ingresos")
+    ax.set_title("Evolución del Cronograma Financiero")
+    ax.legend()
+    fig.canvas.draw()
+
+
+def medir(funcion, veces, tramo):
+    """
+    Llama 'veces' veces a funcion y devuelve cuánto creció la memoria de Python
+    durante las últimas 'tramo' llamadas. tracemalloc empieza un tramo antes de
+    tomar la base, para que lo que se reemplaza en cada redibujado (y se libera
+    después) también esté registrado.
+    """
+    inicio = time.perf_counter()
+    medidas = min(2 * tramo, veces)
+    for i in range(veces - medidas):
+        funcion(i)
+    tracemalloc.start()
+    for i in range(veces - medidas, veces - tramo):
+        funcion(i)
+    # Las figuras y artistas de matplotlib tienen referencias cíclicas: se cuenta sólo lo alcanzable
+    gc.collect()
+    base = tracemalloc.get_traced_memory()[0]
+    for i in range(veces - tramo, veces):
+        funcion(i)
+    gc.collect()
+    crecimiento = (tracemalloc.get_traced_memory()[0] - base) / 1024
+    tracemalloc.stop()
+    return crecimiento, time.perf_counter() - inicio
+
+
+def main():
+    veces = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    tramo = max(int(veces * TRAMO_MEDIDO), 1)
+    ranura = Ranura(figsize=(6, 4))
+    crecimiento, segundos = medir(lambda i: redibujar_con_ranura(ranura, i), veces, tramo)
+    print(f"Ranura reutilizada: {veces} redibujados en {segundos:.1f} s; la memoria cambió {crecimiento:+.0f} KiB "
+          f"en los últimos {tramo}; {len(ranura.fig.axes)} ejes, {len(ranura.ax.lines)} líneas")
+
+    antes = min(veces, 40)
+    crecimiento_antes, segundos_antes = medir(redibujar_como_antes, antes, antes // 2)
+    print(f"Figura nueva por clic: {antes} redibujados en {segundos_antes:.1f} s; la memoria cambió "
+          f"{crecimiento_antes:+.0f} KiB en los últimos {antes // 2}; {len(plt.get_fignums())} figuras abiertas")
+    plt.close("all")
+
+    if crecimiento > MARGEN_KIB or len(ranura.fig.axes) != 1 or len(ranura.ax.lines) != 2:
+        print("FALLO: la memoria crece con los redibujados")
+        sys.exit(1)
+    print("OK: memoria estable")
+
+
+if __name__ == "__main__":
+    main()
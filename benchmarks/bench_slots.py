@@ -0,0 +1,67 @@
+# benchmarks/bench_slots.py
+#
+# Compara memoria y velocidad de las clases de gasto con __slots__ contra la
+# versión anterior basada en __dict__ con su propia cadena if/elif. Los objetos
+# con __slots__ ocupan menos memoria; crearlos y sumarlos es algo más lento
+# (llaman a GastoBase.__init__ y a factor_periodicidad, la regla compartida).
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_slots [cantidad]
+
+import sys
+import time
+import tracemalloc
+
+from modules.models import Gasto
+
+
+class GastoAnterior:
+    def __init__(self, categoria, monto, periodicidad, fecha, etapa):
+        self.categoria = categoria
+        self.monto = monto
+        self.periodicidad = periodicidad
+        self.fecha = fecha
+        self.etapa = etapa
+
+    def calcular_total(self, periodos):
+        if self.periodicidad == "único":
+            return self.monto
+        elif self.periodicidad == "mensual":
+            return self.monto * periodos
+        elif self.periodicidad == "anual":
+            return self.monto * (periodos / 12)
+        else:
+            return 0
+
+
+PERIODICIDADES = ("único", "mensual", "anual")
+
+
+def crear(clase, cantidad):
+    return [clase("Pañales", float(i % 5000), PERIODICIDADES[i % 3], "2025-01-01", "Primer Año")
+            for i in range(cantidad)]
+
+
+def medir(clase, cantidad):
+    # La memoria se mide aparte: tracemalloc hace más lenta cada asignación
+    tracemalloc.start()
+    objetos = crear(clase, cantidad)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    inicio = time.perf_counter()
+    objetos = crear(clase, cantidad)
+    creacion = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    total = sum(g.calcular_total(12) for g in objetos)
+    calculo = time.perf_counter() - inicio
+    return memoria, creacion, calculo, total
+
+
+def main(cantidad=1_000_000):
+    for nombre, clase in (("Anterior (__dict__)", GastoAnterior), ("Gasto (__slots__)", Gasto)):
+        memoria, creacion, calculo, total = medir(clase, cantidad)
+        print(f"{nombre}: {memoria / cantidad:.0f} bytes/objeto, "
+              f"creación {creacion:.2f} s, totales {calculo:.2f} s (total {total:,.0f} MXN)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
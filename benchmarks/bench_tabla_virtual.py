@@ -0,0 +1,64 @@
+# benchmarks/bench_tabla_virtual.py
+#
+# Mide lo que hace la tabla virtual del reporte con muchos gastos: leer el orden
+# de ids por cada columna y leer la ventana visible en posiciones al azar.
+# Usa una base temporal, no la del proyecto.
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_tabla_virtual [cantidad]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from modules import db_handler
+from modules.grid import ProveedorFilas, BUFFER_FILAS
+
+FILAS_VISIBLES = 12
+
+
+def llenar(cantidad):
+    rng = np.random.default_rng(0)
+    categorias = [f"Categoría {i}" for i in range(40)]
+    etapas = ["Embarazo", "Nacimiento", "Primer Año", "Segundo Año", "Tercer Año", "Cuarto Año", "Quinto Año"]
+    periodicidades = ["único", "mensual", "anual"]
+    filas = [(categorias[c], float(m), periodicidades[p], f"2025-{mes:02d}-01", etapas[e], "general")
+             for c, m, p, mes, e in zip(rng.integers(0, 40, cantidad).tolist(),
+                                        rng.uniform(10, 5000, cantidad).round(2).tolist(),
+                                        rng.integers(0, 3, cantidad).tolist(),
+                                        rng.integers(1, 13, cantidad).tolist(),
+                                        rng.integers(0, len(etapas), cantidad).tolist())]
+    db_handler.insertar_gastos_lote(filas)
+
+
+def main(cantidad=500_000):
+    with tempfile.TemporaryDirectory() as carpeta:
+        db_handler.DB_PATH = os.path.join(carpeta, "bench.db")
+        db_handler.init_db()
+        inicio = time.perf_counter()
+        llenar(cantidad)
+        print(f"{cantidad} gastos insertados en {time.perf_counter() - inicio:.1f} s")
+
+        proveedor = ProveedorFilas("gastos")
+        rng = np.random.default_rng(1)
+        for orden, filtros in (("id", {}), ("monto", {}), ("categoria", {}), ("fecha", {}),
+                               ("monto", {"etapa": "Primer Año"})):
+            inicio = time.perf_counter()
+            ids = proveedor.ids(orden, True, filtros)
+            ids_ms = (time.perf_counter() - inicio) * 1000
+            # Saltos al azar, como al arrastrar la barra: ventana visible más el margen
+            posiciones = rng.integers(0, max(ids.size - FILAS_VISIBLES, 1), 50)
+            inicio = time.perf_counter()
+            for posicion in posiciones.tolist():
+                proveedor.filas(ids[max(posicion - BUFFER_FILAS, 0):posicion + FILAS_VISIBLES + BUFFER_FILAS])
+            ventana_ms = (time.perf_counter() - inicio) * 1000 / posiciones.size
+            detalle = f" filtrado {filtros}" if filtros else ""
+            print(f"orden por {orden}{detalle}: {ids.size} ids en {ids_ms:.0f} ms "
+                  f"({ids.nbytes / 2**20:.1f} MiB); ventana de {FILAS_VISIBLES + 2 * BUFFER_FILAS} "
+                  f"filas en {ventana_ms:.2f} ms")
+        db_handler.cerrar_conexion()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -1,23 +1,31 @@
+import time
+_INICIO_ARRANQUE = time.perf_counter()  # Para el modo --medir-arranque
+
 import tkinter as tk
-from tkinter import ttk, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
-import numpy as np
+from tkinter import ttk, messagebox, filedialog
 import datetime
+import logging
 import os
 import sys
 
-from PIL import Image, ImageTk
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+# matplotlib, pandas y reportlab se importan al dibujar o exportar por primera vez (ver modules/charts.py)
 
 # Importar nuestras clases y funciones de los módulos creados
-from modules.models import Gasto, Etapa, PlanVida, Ingreso
+from modules.models import Gasto, Etapa, PlanVida
 from modules import db_handler
-from modules.finances import evaluar_inversion
+from modules.importador import importar_gastos
+from modules.image_cache import imagenes, FondoAjustable
+from modules.snapshot import cargar_snapshot, guardar_snapshot
+from modules.charts import graficas
+from modules.grid import TablaVirtual, ProveedorFilas
+from modules.dataset_cache import datos_gastos, datos_ingresos, marco
+from modules.excel_export import exportar_libro_excel, RUTA_EXCEL
+from modules.pdf_report import generar_reporte_pdf, RUTA_PDF
+from modules.db_executor import ejecutor, en_segundo_plano, calculos, calcular_en_segundo_plano
+from modules.finances import (evaluar_inversion, trayectoria_inversion, simular_montecarlo, barrer_escenarios,
+                              aporte_necesario, tasa_necesaria, amortizar_prestamo, amortizar_tarjeta,
+                              pagos_como_gastos)
 from modules.family_support import total_apoyo, agregar_recurso
-from modules.time_management import generar_cronograma_financiero
 from modules.home_expenses import HomeExpense
 from modules.baby_expenses import BabyExpense
 from modules.hospital_postpartum import HospitalExpense
@@ -25,14 +33,8 @@ from modules.documentation_events import EventExpense
 from modules.services import ServiceExpense
 from modules.family_organization import planificar_horarios
 
-# Aseguramos que existan las carpetas necesarias
-if not os.path.exists("data"):
-    os.makedirs("data")
-if not os.path.exists("images"):
-    os.makedirs("images")
-
-# Inicializamos la base de datos
-db_handler.init_db()
+# Avisos que no requieren al usuario (los errores se muestran con messagebox)
+registro = logging.getLogger("plan_vida")
 
 # Creamos un objeto global para el plan de vida con etapas predefinidas
 plan_vida = PlanVida()
@@ -49,69 +51,107 @@ for nombre, duracion in predefined_stages:
     etapa = Etapa(nombre, duracion)
     plan_vida.agregar_etapa(etapa)
 
-def cargar_gastos():
-    """Carga los gastos desde la base de datos y los asigna al objeto plan_vida."""
-    from modules.db_handler import obtener_gastos
-    datos = obtener_gastos()  # Devuelve una lista de filas
-    if datos:
-        for row in datos:
-            # row tiene la estructura: [id, categoria, monto, periodicidad, fecha, etapa, origen]
-            categoria, monto, periodicidad, fecha, etapa_nombre = row[1], row[2], row[3], row[4], row[5]
-            # Creamos el objeto Gasto
-            gasto = Gasto(categoria, monto, periodicidad, fecha, etapa_nombre)
-            etapa_normalizada = etapa_nombre.strip().lower()
-            for e in plan_vida.etapas:
-                if e.nombre.strip().lower() == etapa_normalizada:
-                    e.agregar_gasto(gasto)
-                    break
-
-# Cargamos los gastos previamente guardados para que el resumen no se reinicie
-cargar_gastos()
-
-# ---------- Funciones extras para las gráficas adicionales ----------
-def simulate_inversion(initial, monthly, rate, term):
-    """Calcula el valor acumulado mes a mes usando interés compuesto."""
-    values = []
-    total = initial
-    monthly_rate = (1 + rate) ** (1/12) - 1
-    for _ in range(term):
-        total = total * (1 + monthly_rate) + monthly
-        values.append(total)
-    return values
-
-def plot_cronograma_financiero_tk(parent, df):
-    """Genera una gráfica de líneas con la evolución de Gastos, Ingresos y Balance."""
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(df["Mes"], df["Gastos"], marker='o', label="Gastos")
-    ax.plot(df["Mes"], df["Ingresos"], marker='o', label="Ingresos")
-    ax.plot(df["Mes"], df["Balance"], marker='o', label="Balance")
-    ax.set_title("Evolución del Cronograma Financiero (60 meses)")
-    ax.set_xlabel("Mes")
-    ax.set_ylabel("Monto (MXN)")
-    ax.legend()
-    ax.grid(True)
-    canvas = FigureCanvasTkAgg(fig, master=parent)
-    canvas.draw()
-    canvas.get_tk_widget().pack()
-
-def plot_inversion_comparativa_tk(parent, initial, monthly, term):
-    """Genera una gráfica comparativa de inversión para tasas del 6% y 12%."""
-    months = list(range(1, term+1))
-    values_6 = simulate_inversion(initial, monthly, 0.06, term)
-    values_12 = simulate_inversion(initial, monthly, 0.12, term)
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(months, values_6, marker='o', label="6% Anual")
-    ax.plot(months, values_12, marker='o', label="12% Anual")
-    ax.set_title("Comparación de Proyección de Inversión")
-    ax.set_xlabel("Meses")
-    ax.set_ylabel("Valor Acumulado (MXN)")
-    ax.legend()
-    ax.grid(True)
-    canvas = FigureCanvasTkAgg(fig, master=parent)
-    canvas.draw()
-    canvas.get_tk_widget().pack()
+def cargar_gastos(datos=None):
+    """
+    Carga los gastos desde la base de datos y los asigna al objeto plan_vida.
+    Si ya se tienen las filas (por ejemplo, leídas en segundo plano) se pasan en 'datos'.
+    """
+    if datos is None:
+        from modules.db_handler import obtener_gastos
+        datos = obtener_gastos()  # Devuelve una lista de filas
+    # row tiene la estructura: [id, categoria, monto, periodicidad, fecha, etapa, origen]
+    desconocidas = plan_vida.asignar_gastos(datos)
+    if desconocidas:
+        detalle = ", ".join(f"{nombre} ({cantidad})" for nombre, cantidad in desconocidas.items())
+        registro.warning("Gastos sin etapa en el plan de vida: %s", detalle)
+    return desconocidas
+
+def cargar_gastos_por_paginas(widget, despues_de_id, hasta_id):
+    """
+    Agrega al plan los gastos con id en (despues_de_id, hasta_id] una página a la vez:
+    el hilo de la BD lee una página, Tk la asigna y entonces se pide la siguiente.
+    """
+    from modules.db_handler import obtener_pagina_gastos, TAMANO_PAGINA
+    def recibida(pagina):
+        cargar_gastos([fila for fila in pagina if fila[0] <= hasta_id])
+        if len(pagina) == TAMANO_PAGINA and pagina[-1][0] < hasta_id:
+            cargar_gastos_por_paginas(widget, pagina[-1][0], hasta_id)
+    en_segundo_plano(widget, obtener_pagina_gastos, despues_de_id, TAMANO_PAGINA,
+                     actualizar_modelo=recibida, al_fallar=mostrar_error_bd)
+
+def cargar_gastos_inicio():
+    """
+    Carga inicial de los gastos. Si el snapshot del plan sigue vigente se usa tal
+    cual; si desde entonces sólo se agregaron gastos, se leen sólo esos; en otro
+    caso se recarga todo desde la base. La versión y las filas se leen en la
+    misma transacción para que correspondan al mismo estado de la base.
+    """
+    with db_handler.transaccion(escritura=False):
+        version = db_handler.version_datos("gastos")
+        guardada = cargar_snapshot(plan_vida, version)
+        if guardada == version:
+            return
+        if guardada is not None:
+            nuevas = list(db_handler.iterar_gastos(despues_de_id=guardada["ultimo_id"]))
+            if len(nuevas) == version["filas"] - guardada["filas"]:
+                cargar_gastos(nuevas)
+            else:
+                guardada = None
+        if guardada is None:
+            plan_vida.limpiar_gastos()
+            cargar_gastos()
+    guardar_snapshot(plan_vida, version)
+
+def preparar_datos():
+    """
+    Crea las carpetas y la base de datos y carga los gastos guardados, para que el
+    resumen no se reinicie. Se llama sólo al ejecutar la aplicación: los procesos
+    de los pools (que en Windows vuelven a importar este archivo) no la repiten.
+    """
+    for carpeta in ("data", "images"):
+        if not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+    db_handler.init_db()
+    cargar_gastos_inicio()
+
+def mostrar_error_bd(error):
+    """Callback por defecto cuando una operación en segundo plano falla."""
+    messagebox.showerror("Error", f"Ocurrió un problema con la base de datos: {error}")
+
+def marcos_desde_bd():
+    """
+    DataFrames (gastos, ingresos) al día con la base (se ejecuta en el hilo de la BD).
+    Los DataFrames en caché sólo leen de la base lo que cambió desde la última vez.
+    """
+    with db_handler.transaccion(escritura=False):
+        return datos_gastos.actualizar(), datos_ingresos.actualizar()
+
+def calcular_cronograma(marcos, meses=60, creditos=()):
+    """
+    Proyección mensual de los DataFrames de marcos_desde_bd (se ejecuta en el hilo de cálculos).
+    creditos: filas extra con forma de gasto, como las de pagos_como_gastos.
+    """
+    from modules.time_management import generar_cronograma_financiero
+    gastos, ingresos = marcos
+    if creditos:
+        import pandas as pd
+        gastos = pd.concat([gastos, marco("gastos", creditos)], ignore_index=True)
+    return generar_cronograma_financiero(gastos, ingresos, meses=meses)
+
+def cronograma_en_segundo_plano(widget, meses=60, creditos=(), al_terminar=None):
+    """
+    Lee los datos en el hilo de la BD y calcula la proyección en el de cálculos,
+    así la cola de la base no espera a pandas. El resultado llega a al_terminar en Tk.
+    """
+    def calcular(marcos):
+        calcular_en_segundo_plano(widget, calcular_cronograma, marcos, meses, creditos,
+                                  al_terminar=al_terminar, al_fallar=mostrar_error_bd)
+    en_segundo_plano(widget, marcos_desde_bd, al_terminar=calcular, al_fallar=mostrar_error_bd)
 
 # ---------------------- Clases del Programa ---------------------------
+# Segundos que se espera al hilo de cálculos al cerrar la aplicación
+LIMITE_CIERRE_CALCULOS_S = 2
+
 class App(tk.Tk):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -134,6 +174,7 @@ class App(tk.Tk):
 
         container = tk.Frame(self)
         container.pack(side="top", fill="both", expand=True)
+        self.container = container
         container.grid_rowconfigure(0, weight=1)
         container.grid_columnconfigure(0, weight=1)
 
@@ -146,11 +187,8 @@ class App(tk.Tk):
         self.icon_back = self.load_icon("icon_back.png", (25, 25))
         self.icon_exit = self.load_icon("icon_exit.png", (40, 40))
 
+        # Las páginas se construyen la primera vez que se muestran (ver show_frame)
         self.frames = {}
-        for F in (HomePage, RegisterExpensePage, ReportPage, SimulationPage, IncomePage, ModulesPage):
-            frame = F(container, self)
-            self.frames[F] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
         self.show_frame(HomePage)
 
     def toggle_fullscreen(self, event=None):
@@ -159,21 +197,19 @@ class App(tk.Tk):
         
     def on_closing(self):
         if messagebox.askokcancel("Salir", "¿Desea salir de la aplicación?"):
+            # Esperamos a que terminen las escrituras pendientes antes de salir
+            ejecutor.detener()
+            # Un cálculo largo (simulación, PDF) no debe trabar la salida: su hilo es
+            # daemon y sólo se le da un momento para terminar
+            calculos.detener(limite=LIMITE_CIERRE_CALCULOS_S)
+            db_handler.cerrar_conexion()
             self.destroy()
             import sys
             sys.exit()
 
     def load_icon(self, filename, size):
-        path = os.path.join("images", filename)
-        if not os.path.exists(path):
-            return None
-        try:
-            img = Image.open(path)
-            img = img.resize(size, Image.LANCZOS)
-            return ImageTk.PhotoImage(img)
-        except Exception as e:
-            print(f"Error cargando ícono {filename}: {e}")
-            return None
+        # Cada ícono se decodifica y reescala una sola vez (caché compartida)
+        return imagenes.icono(filename, size)
 
     def center_window(self):
         self.update_idletasks()
@@ -184,7 +220,11 @@ class App(tk.Tk):
         self.geometry(f"{w}x{h}+{x}+{y}")
 
     def show_frame(self, cont):
-        frame = self.frames[cont]
+        frame = self.frames.get(cont)
+        if frame is None:
+            frame = cont(self.container, self)
+            self.frames[cont] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
         frame.tkraise()
         self.center_window()
 
@@ -194,20 +234,9 @@ class HomePage(tk.Frame):
         super().__init__(parent)
         self.controller = controller
 
-        # 1) Cargamos la imagen original (sin reescalar)
-        self.original_bg = None
-        try:
-            path_bg = os.path.join("images", "Fondo1.jpg")
-            self.original_bg = Image.open(path_bg)
-        except Exception as e:
-            print("Error cargando fondo HomePage:", e)
-
-        # 2) Creamos un Label para el fondo y lo colocamos con relwidth=1 y relheight=1
-        self.bg_label = tk.Label(self)
-        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-
-        # 3) Vinculamos el evento <Configure> para redimensionar cuando cambie el tamaño
-        self.bind("<Configure>", self._resize_bg)
+        # Fondo que ocupa todo el Frame; la imagen se decodifica una vez y sus
+        # versiones reescaladas se comparten con las demás páginas (image_cache)
+        self.fondo = FondoAjustable(self, "Fondo1.jpg")
 
         title_label = tk.Label(self, text="Bienvenido a Plan de Vida del Bebé",
                                font=("Comic Sans MS", 28), fg="#2E86C1", bg="#FFFB8E")
@@ -259,26 +288,6 @@ class HomePage(tk.Frame):
                                 command=self.controller.on_closing)
         btn_exit.pack(pady=5)
         
-    def _resize_bg(self, event):
-        """
-        Redimensiona la imagen de fondo cada vez que el Frame cambie de tamaño.
-        """
-        # Si no cargó la imagen o la ventana está muy pequeña, no hacemos nada
-        if not self.original_bg:
-            return
-
-        new_width = event.width
-        new_height = event.height
-        if new_width < 10 or new_height < 10:
-            return
-
-        # Redimensionamos la imagen original al nuevo tamaño
-        resized_image = self.original_bg.resize((new_width, new_height), Image.LANCZOS)
-
-        # Creamos un nuevo PhotoImage y actualizamos el Label
-        self.bg_image = ImageTk.PhotoImage(resized_image)
-        self.bg_label.config(image=self.bg_image)
-
 # -------------------- Registro de Gastos --------------------
 class RegisterExpensePage(tk.Frame):
     def __init__(self, parent, controller):
@@ -286,15 +295,7 @@ class RegisterExpensePage(tk.Frame):
         self.controller = controller
 
         # Fondo para RegisterExpensePage
-        self.original_bg = None
-        try:
-            path_bg = os.path.join("images", "Fondo2.jpg")
-            self.original_bg = Image.open(path_bg)
-        except Exception as e:
-            print("Error cargando fondo RegisterExpensePage:", e)
-        self.bg_label = tk.Label(self)
-        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        self.bind("<Configure>", self._resize_bg)
+        self.fondo = FondoAjustable(self, "Fondo2.jpg")
 
         title_label = tk.Label(self, text="Registrar Nuevo Gasto",
                                font=("Comic Sans MS", 24), fg="#27AE60", bg="#FFF3A1")
@@ -362,17 +363,6 @@ class RegisterExpensePage(tk.Frame):
         btn_volver.pack(pady=5)
 
 
-    def _resize_bg(self, event):
-        if not self.original_bg:
-            return
-        new_width = event.width
-        new_height = event.height
-        if new_width < 10 or new_height < 10:
-            return
-        resized_image = self.original_bg.resize((new_width, new_height), Image.LANCZOS)
-        self.bg_image = ImageTk.PhotoImage(resized_image)
-        self.bg_label.config(image=self.bg_image)
-
     def agregar_gasto(self):
         # Se obtiene la información del formulario
         categoria = self.combo_categoria.get()
@@ -390,23 +380,22 @@ class RegisterExpensePage(tk.Frame):
             return
         etapa = self.combo_etapa.get()
 
-        # Se crea el objeto Gasto
+        # Se crea el objeto Gasto y se guarda en segundo plano
         nuevo_gasto = Gasto(categoria, monto, periodicidad, fecha, etapa)
         from modules.db_handler import insertar_gasto
-        insertar_gasto(categoria, monto, periodicidad, fecha, etapa, origen="general")
-
-        # Se agrega el gasto a la etapa correspondiente en plan_vida
-        agregado = False
-        etapa_normalizada = etapa.strip().lower()
-        for e in plan_vida.etapas:
-            if e.nombre.strip().lower() == etapa_normalizada:
-                e.agregar_gasto(nuevo_gasto)
-                agregado = True
-                print(f"Gasto agregado a la etapa: {e.nombre}")
-                break
-
-        if not agregado:
-            print("No se encontró la etapa correspondiente para agregar el gasto.")
+
+        def agregar_al_plan(gasto_id):
+            # Se agrega el gasto a la etapa correspondiente en plan_vida
+            e = plan_vida.buscar_etapa(etapa)
+            if e is not None:
+                e.agregar_gasto(nuevo_gasto, gasto_id)
+        en_segundo_plano(self, insertar_gasto, categoria, monto, periodicidad, fecha, etapa, origen="general",
+                         actualizar_modelo=agregar_al_plan,
+                         al_terminar=lambda _: self._gasto_guardado(etapa),
+                         al_fallar=mostrar_error_bd)
+
+    def _gasto_guardado(self, etapa):
+        if plan_vida.buscar_etapa(etapa) is None:
             messagebox.showwarning("Atención", "El gasto no se asoció a ninguna etapa. Verifica que la etapa seleccionada coincida con la definida en el plan de vida.")
 
         messagebox.showinfo("Éxito", "Gasto registrado exitosamente.")
@@ -418,21 +407,23 @@ class RegisterExpensePage(tk.Frame):
         self.combo_etapa.current(0)
 
 # -------------------- Reporte de Gastos --------------------
+# Filas que se cargan por página en el diálogo de borrado
+PAGINA_BORRADO = 200
+# Columnas (clave, título, ancho) de las tablas del reporte, en el orden de las filas de la base
+COLUMNAS_REPORTE_GASTOS = (("id", "Id", 60), ("categoria", "Categoría", 200), ("monto", "Monto", 100),
+                           ("periodicidad", "Periodicidad", 90), ("fecha", "Fecha", 90),
+                           ("etapa", "Etapa", 110), ("origen", "Origen", 90))
+COLUMNAS_REPORTE_INGRESOS = (("id", "Id", 60), ("tipo", "Tipo", 150), ("monto", "Monto", 100),
+                             ("periodicidad", "Periodicidad", 90), ("fecha", "Fecha", 90),
+                             ("descripcion", "Descripción", 250))
+
 class ReportPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
 
         # Fondo para ReportPage
-        self.original_bg = None
-        try:
-            path_bg = os.path.join("images", "Fondo3.jpg")
-            self.original_bg = Image.open(path_bg)
-        except Exception as e:
-            print("Error cargando fondo ReportPage:", e)
-        self.bg_label = tk.Label(self)
-        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        self.bind("<Configure>", self._resize_bg)
+        self.fondo = FondoAjustable(self, "Fondo3.jpg")
 
         # Contenedor superior para controles
         control_frame = tk.Frame(self, bg="#FEC736")
@@ -454,9 +445,13 @@ class ReportPage(tk.Frame):
                                       style="Infantil.TButton", command=self.exportar_excel)
         btn_export_excel.pack(side="left", padx=5, pady=5)
 
-        btn_export_pdf = ttk.Button(control_frame, text="Exportar a PDF",
-                                    style="Infantil.TButton", command=self.exportar_pdf)
-        btn_export_pdf.pack(side="left", padx=5, pady=5)
+        self.btn_export_pdf = ttk.Button(control_frame, text="Exportar a PDF",
+                                         style="Infantil.TButton", command=self.exportar_pdf)
+        self.btn_export_pdf.pack(side="left", padx=5, pady=5)
+
+        btn_importar = ttk.Button(control_frame, text="Importar Gastos",
+                                  style="Infantil.TButton", command=self.importar_archivo)
+        btn_importar.pack(side="left", padx=5, pady=5)
 
         btn_borrar_todos = ttk.Button(control_frame, text="Borrar Todos los Datos",
                                       style="Infantil.TButton", command=self.borrar_datos)
@@ -486,23 +481,64 @@ class ReportPage(tk.Frame):
     def borrar_datos(self):
         from modules.db_handler import borrar_todos_los_datos
         if messagebox.askyesno("Confirmar", "¿Seguro que deseas borrar TODOS los datos?"):
-            borrar_todos_los_datos()
-            messagebox.showinfo("Éxito", "Datos borrados correctamente.")
-            self.generar_reporte()
+            def borrado(_):
+                messagebox.showinfo("Éxito", "Datos borrados correctamente.")
+                self.generar_reporte()
+            en_segundo_plano(self, borrar_todos_los_datos, actualizar_modelo=lambda _: plan_vida.limpiar_gastos(),
+                             al_terminar=borrado, al_fallar=mostrar_error_bd)
 
     def borrar_dato_especifico(self):
-        from modules.db_handler import obtener_gastos, borrar_datos_por_id
-        datos = obtener_gastos()
-        if not datos:
+        from modules.db_handler import obtener_pagina_gastos
+        en_segundo_plano(self, obtener_pagina_gastos, 0, PAGINA_BORRADO,
+                         al_terminar=self._dialogo_borrar, al_fallar=mostrar_error_bd)
+
+    def _dialogo_borrar(self, pagina):
+        from modules.db_handler import obtener_pagina_gastos, borrar_datos_por_id
+        if not pagina:
             messagebox.showinfo("Sin Datos", "No hay datos para borrar.")
             return
+        # Sólo se carga una página de registros a la vez; "inicios" guarda el id
+        # desde el que empezó cada página visitada para poder regresar.
+        inicios = [0]
         top = tk.Toplevel(self)
         top.title("Borrar un Registro")
-        top.geometry("400x150")
+        top.geometry("400x180")
         tk.Label(top, text="Selecciona el registro a borrar:").pack(pady=10)
-        items = [f"{row[0]} - {row[1]} - ${row[2]}" for row in datos]
-        combo = ttk.Combobox(top, values=items, width=50)
+        combo = ttk.Combobox(top, width=50)
         combo.pack(pady=5)
+        nav_frame = tk.Frame(top)
+        nav_frame.pack(pady=5)
+
+        def mostrar(filas):
+            combo["values"] = [f"{row[0]} - {row[1]} - ${row[2]}" for row in filas]
+            combo.set("")
+            btn_anterior.config(state="normal" if len(inicios) > 1 else "disabled")
+            btn_siguiente.config(state="normal" if len(filas) == PAGINA_BORRADO else "disabled")
+
+        def siguiente():
+            valores = combo["values"]
+            if not valores:
+                return
+            ultimo_id = int(valores[-1].split(" - ")[0])
+            def recibida(filas):
+                if filas:
+                    inicios.append(ultimo_id)
+                    mostrar(filas)
+            en_segundo_plano(top, obtener_pagina_gastos, ultimo_id, PAGINA_BORRADO,
+                             al_terminar=recibida, al_fallar=mostrar_error_bd)
+
+        def anterior():
+            if len(inicios) > 1:
+                inicios.pop()
+                en_segundo_plano(top, obtener_pagina_gastos, inicios[-1], PAGINA_BORRADO,
+                                 al_terminar=mostrar, al_fallar=mostrar_error_bd)
+
+        btn_anterior = ttk.Button(nav_frame, text="< Anteriores", command=anterior)
+        btn_anterior.pack(side="left", padx=5)
+        btn_siguiente = ttk.Button(nav_frame, text="Siguientes >", command=siguiente)
+        btn_siguiente.pack(side="left", padx=5)
+        mostrar(pagina)
+
         def confirmar_borrar():
             seleccionado = combo.get()
             if seleccionado:
@@ -510,162 +546,218 @@ class ReportPage(tk.Frame):
                     record_id = int(seleccionado.split(" - ")[0])
                 except ValueError:
                     return
-                borrar_datos_por_id(record_id)
-                messagebox.showinfo("Éxito", "Registro borrado.")
-                top.destroy()
-                self.generar_reporte()
+                def borrado(_):
+                    messagebox.showinfo("Éxito", "Registro borrado.")
+                    top.destroy()
+                    self.generar_reporte()
+                # Mantener el plan en memoria igual que la base
+                en_segundo_plano(self, borrar_datos_por_id, record_id,
+                                 actualizar_modelo=lambda _: plan_vida.quitar_gasto(record_id),
+                                 al_terminar=borrado, al_fallar=mostrar_error_bd)
         btn_confirm = ttk.Button(top, text="Borrar", command=confirmar_borrar)
         btn_confirm.pack(pady=5)
 
-    def _resize_bg(self, event):
-        if not self.original_bg:
-            return
-        new_width = event.width
-        new_height = event.height
-        if new_width < 10 or new_height < 10:
-            return
-        resized_image = self.original_bg.resize((new_width, new_height), Image.LANCZOS)
-        self.bg_image = ImageTk.PhotoImage(resized_image)
-        self.bg_label.config(image=self.bg_image)
+    def _tabla_virtual(self, tabla, columnas):
+        """
+        Tabla ordenable con las filas de 'tabla': sólo se leen de la base las filas
+        visibles (y un margen), así que responde igual con cientos de miles de registros.
+        """
+        tabla_virtual = TablaVirtual(self.report_frame, ProveedorFilas(tabla), columnas,
+                                     formatos={"monto": lambda monto: f"{monto:,.2f}"},
+                                     al_fallar=mostrar_error_bd)
+        tabla_virtual.pack(pady=5, fill="x")
+        tabla_virtual.recargar()
+        return tabla_virtual
 
     def generar_reporte(self):
-        # 1) Limpiar el frame que contendrá el reporte
+        from modules.db_handler import totales_gastos_por_etapa_categoria
+        # La consulta corre en el hilo de la base de datos; Tk sólo dibuja el resultado
+        en_segundo_plano(self, totales_gastos_por_etapa_categoria, al_terminar=self._mostrar_reporte,
+                         al_fallar=mostrar_error_bd)
+
+    def _mostrar_reporte(self, totales):
+        # 1) Limpiar el frame que contendrá el reporte (la gráfica se conserva y se actualiza)
+        conservar = graficas.conserva(self.report_frame)
         for widget in self.report_frame.winfo_children():
-            widget.destroy()
+            if widget not in conservar:
+                widget.destroy()
 
-        from modules.db_handler import obtener_gastos
-        datos = obtener_gastos()
-        if not datos:
+        # 2) Filas ya agregadas por (etapa, categoria)
+        if not totales:
+            for widget in conservar:
+                widget.pack_forget()
             tk.Label(self.report_frame, text="No hay datos para mostrar.", bg="#ffffff").pack()
             return
 
-        # 2) Crear DataFrame con todos los gastos
-        df = pd.DataFrame(datos, columns=["id", "categoria", "monto", 
-                                      "periodicidad", "fecha", "etapa", "origen"])
-
-        # 3) Añadir columna "cat_etapa" = "categoria (etapa)"
-        df["cat_etapa"] = df["categoria"] + " (" + df["etapa"] + ")"
-
         # -- MOSTRAR DETALLE DE CADA ÍTEM --
-        # 4) Mostramos cada fila (cat_etapa, monto) en un Text para no perder el detalle
-        text = tk.Text(self.report_frame, height=10, width=100)
-        text.insert(tk.END, df[["cat_etapa", "monto"]].to_string(index=False))
-        text.pack(pady=5)
+        # 3) Tabla virtual con cada gasto, filtrable por etapa y ordenable por columna
+        filtro_frame = tk.Frame(self.report_frame, bg="#ffffff")
+        filtro_frame.pack(anchor="w", pady=(5, 0))
+        tk.Label(filtro_frame, text="Etapa:", bg="#ffffff").pack(side="left")
+        etapas = ["Todas"] + sorted({etapa for etapa, _, _ in totales if etapa})
+        combo_etapa = ttk.Combobox(filtro_frame, values=etapas, state="readonly", width=20)
+        combo_etapa.current(0)
+        combo_etapa.pack(side="left", padx=5)
+        tabla = self._tabla_virtual("gastos", COLUMNAS_REPORTE_GASTOS)
+        combo_etapa.bind("<<ComboboxSelected>>",
+                         lambda e: tabla.filtrar(etapa=None if combo_etapa.get() == "Todas" else combo_etapa.get()))
 
         # -- MOSTRAR RESUMEN POR ETAPA --
-        # 5) Mostrar el resumen de cada etapa una sola vez
-        resumen_etapas = "Resumen por Etapa:\n"
-        for etapa_obj in plan_vida.etapas:
-            resumen_etapas += f"{etapa_obj.nombre}: {etapa_obj.calcular_total_gastos():.2f} MXN\n"
+        # 4) Resumen de cada etapa: los dos totales salen del plan en memoria (el
+        #    mismo que usan las exportaciones), así real y nominal cuentan los mismos
+        #    gastos; el nominal se indexa gasto por gasto según su fecha
+        filas = self._resumen_etapas()
+        con_nominal = all(nominal is not None for *_, nominal in filas)
+        if con_nominal:
+            resumen_etapas = "Resumen por Etapa (pesos de hoy / nominal con inflación):\n"
+        else:
+            resumen_etapas = "Resumen por Etapa (pesos de hoy):\n"
+        for nombre, _, real, nominal in filas:
+            if con_nominal:
+                resumen_etapas += f"{nombre}: {real:.2f} MXN / {nominal:.2f} MXN\n"
+            else:
+                resumen_etapas += f"{nombre}: {real:.2f} MXN\n"
+        total_real = sum(real for _, _, real, _ in filas)
+        if con_nominal:
+            resumen_etapas += f"Total: {total_real:.2f} MXN / {sum(n for *_, n in filas):.2f} MXN\n"
+        else:
+            resumen_etapas += f"Total: {total_real:.2f} MXN\n"
         tk.Label(self.report_frame, text=resumen_etapas, font=("Arial", 10),
                 justify="left", bg="#ffffff").pack(pady=5)
 
         # -- CREAR GRÁFICA AGRUPADA POR cat_etapa --
-        # 6) Agrupamos para la gráfica (sumando los montos de cada cat_etapa)
-        df_grafica = df.groupby("cat_etapa")["monto"].sum().reset_index()
-
-        # 7) Generamos la gráfica con un tamaño mayor
-        fig, ax = plt.subplots(figsize=(8, 6))  # Aumenta si quieres aún más grande
-        ax.bar(df_grafica["cat_etapa"], df_grafica["monto"])
+        # 5) Etiquetas "categoria (etapa)" con los montos ya sumados en SQL
+        etiquetas = [f"{categoria} ({etapa})" for etapa, categoria, _ in totales]
+        montos = [total for _, _, total in totales]
+
+        # 6) Usamos siempre la misma figura (más grande); si las categorías no
+        #    cambiaron sólo se ajusta la altura de las barras
+        ranura = graficas.ranura(self.report_frame, "reporte", figsize=(8, 6))
+        ranura.preparar("barras")
+        ranura.barras("montos", etiquetas, montos)
+        ax = ranura.ax
         ax.set_title("Gastos Totales por Categoría y Etapa")
         ax.set_xlabel("Categoría (Etapa)")
         ax.set_ylabel("MXN")
 
         # Ajustar las etiquetas para que no se encimen
-        plt.xticks(rotation=45, ha="right")
-        fig.tight_layout()
+        ax.tick_params(axis="x", labelrotation=45)
+        for etiqueta in ax.get_xticklabels():
+            etiqueta.set_horizontalalignment("right")
+        ranura.fig.tight_layout()
 
-        # 8) Mostrar la gráfica en el Frame
-        canvas_fig = FigureCanvasTkAgg(fig, master=self.report_frame)
-        canvas_fig.draw()
-        canvas_fig.get_tk_widget().pack(pady=5)
+        # 7) Mostrar la gráfica al final del Frame
+        ranura.mostrar(pady=5)
+        ranura.redibujar()
 
 
 
 
     def generar_reporte_ingresos(self):
+        from modules.db_handler import obtener_pagina_ingresos
+        en_segundo_plano(self, obtener_pagina_ingresos, 0, 1,
+                         al_terminar=self._mostrar_reporte_ingresos, al_fallar=mostrar_error_bd)
+
+    def _mostrar_reporte_ingresos(self, primera_fila):
         for widget in self.report_frame.winfo_children():
             widget.destroy()
-        from modules.db_handler import obtener_ingresos
-        datos = obtener_ingresos()
-        if not datos:
+        if not primera_fila:
             tk.Label(self.report_frame, text="No hay ingresos para mostrar.", bg="#ffffff").pack()
             return
-        df = pd.DataFrame(datos, columns=["id", "tipo", "monto", "periodicidad", "fecha", "descripcion"])
-        text = tk.Text(self.report_frame, height=10)
-        text.insert(tk.END, df.to_string(index=False))
-        text.pack(pady=5)
+        self._tabla_virtual("ingresos", COLUMNAS_REPORTE_INGRESOS)
+
+    def _resumen_etapas(self):
+        """Filas (etapa, meses, total real, total nominal) del plan en memoria, para las exportaciones."""
+        reales = plan_vida.totales_etapas()
+        try:
+            nominales = plan_vida.totales_etapas(inflacion=True).tolist()
+        except (OSError, ValueError) as e:
+            registro.warning("No se pudo leer la tabla de inflación: %s", e)
+            nominales = [None] * len(plan_vida.etapas)
+        return [(etapa_obj.nombre, etapa_obj.duracion_meses, float(real), nominal)
+                for etapa_obj, real, nominal in zip(plan_vida.etapas, reales, nominales)]
 
     def exportar_excel(self):
-        from modules.db_handler import obtener_gastos
-        datos = obtener_gastos()
-        if not datos:
-            messagebox.showinfo("Exportar", "No hay datos para exportar.")
+        # El libro se escribe en el hilo de cálculos leyendo la base por páginas;
+        # la ventana sigue respondiendo aunque haya cientos de miles de registros
+        def exportado(escritas):
+            if not escritas["gastos"] and not escritas["ingresos"]:
+                messagebox.showinfo("Exportar", f"No hay registros; se exportó sólo el resumen a '{RUTA_EXCEL}'.")
+            else:
+                messagebox.showinfo("Exportar", f"Reporte exportado a '{RUTA_EXCEL}' "
+                                                f"({escritas['gastos']} gastos, {escritas['ingresos']} ingresos)")
+        calcular_en_segundo_plano(self, exportar_libro_excel, RUTA_EXCEL, self._resumen_etapas(),
+                                  al_terminar=exportado,
+                                  al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo exportar: {e}"))
+
+    def importar_archivo(self):
+        ruta = filedialog.askopenfilename(title="Importar gastos",
+                                          filetypes=[("Excel o CSV", "*.xlsx *.csv"), ("Todos", "*.*")])
+        if not ruta:
             return
-        df = pd.DataFrame(datos, columns=["id", "categoria", "monto", "periodicidad", "fecha", "etapa", "origen"])
-        try:
-            df.to_excel("reporte_plan_vida.xlsx", index=False)
-            messagebox.showinfo("Exportar", "Reporte exportado a 'reporte_plan_vida.xlsx'")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar: {e}")
+        def agregar_al_plan(ids):
+            # El resto del plan ya está al día: sólo se leen, por páginas, los gastos importados
+            # (se insertan en una transacción, así que sus ids son consecutivos)
+            if ids:
+                cargar_gastos_por_paginas(self, ids[0] - 1, ids[-1])
+        def importado(ids):
+            messagebox.showinfo("Importar", f"Se importaron {len(ids)} gastos.")
+            self.generar_reporte()
+        en_segundo_plano(self, importar_gastos, ruta, actualizar_modelo=agregar_al_plan, al_terminar=importado,
+                         al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo importar: {e}"))
 
     def exportar_pdf(self):
-        from modules.db_handler import obtener_gastos
-        datos = obtener_gastos()
-        if not datos:
-            messagebox.showinfo("Exportar", "No hay datos para exportar.")
-            return
-        try:
-            pdf_file = "reporte_plan_vida.pdf"
-            c = canvas.Canvas(pdf_file, pagesize=letter)
-            width, height = letter
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(50, height - 50, "Reporte del Plan de Vida del Bebé")
-            c.setFont("Helvetica", 12)
-            c.drawString(50, height - 80, "Reporte de gastos por categoría:")
-            df = pd.DataFrame(datos, columns=["id", "categoria", "monto", "periodicidad", "fecha", "etapa", "origen"])
-            resumen = df.groupby("categoria")["monto"].sum().reset_index()
-            y = height - 110
-            for index, row in resumen.iterrows():
-                line = f"{row['categoria']}: {row['monto']} MXN"
-                c.drawString(50, y, line)
-                y -= 15
-                if y < 50:
-                    c.showPage()
-                    y = height - 50
-            c.save()
-            messagebox.showinfo("Exportar", f"Reporte exportado a '{pdf_file}'")
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo exportar el PDF: {e}")
+        # Con muchos gastos el reporte tiene cientos de páginas: se arma en el hilo de
+        # cálculos mientras la ventana sigue respondiendo
+        simulacion = self.controller.frames.get(SimulationPage)
+        inversion = dict(simulacion.inversion_params if simulacion else INVERSION_PREDETERMINADA)
+        creditos = list(simulacion.creditos) if simulacion else []
+        self.btn_export_pdf.config(state="disabled", text="Generando PDF...")
+
+        def terminado(resultado):
+            self.btn_export_pdf.config(state="normal", text="Exportar a PDF")
+            messagebox.showinfo("Exportar", f"Reporte exportado a '{RUTA_PDF}' ({resultado['paginas']} páginas)")
+
+        def fallido(error):
+            self.btn_export_pdf.config(state="normal", text="Exportar a PDF")
+            messagebox.showerror("Error", f"No se pudo exportar el PDF: {error}")
+
+        calcular_en_segundo_plano(self, generar_reporte_pdf, RUTA_PDF, self._resumen_etapas(), inversion, creditos,
+                                  al_terminar=terminado, al_fallar=fallido)
 
 # -------------------- Simulaciones y Escenarios --------------------
+# Parámetros iniciales de la inversión (también los usa el PDF si no se abrió la página)
+INVERSION_PREDETERMINADA = {
+    "initial": 10000,
+    "monthly": 2000,
+    "term": 60,
+    "rate": 0.06,
+    "volatility": 0.15,
+    "paths": 20000,
+    "target": 150000
+}
+
 class SimulationPage(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        self.inversion_params = {
-            "initial": 10000,
-            "monthly": 2000,
-            "term": 60,
-            "rate": 0.06
-        }
+        self.inversion_params = dict(INVERSION_PREDETERMINADA)
         self.cronograma_params = {
-            "gastos_inicial": 10000,
-            "gastos_final": 60000,
-            "ingresos_inicial": 15000,
-            "ingresos_final": 70000,
             "term": 60
         }
+        # Pagos de créditos registrados en la simulación (filas con forma de gasto)
+        self.creditos = []
+        # Rangos del barrido (tasa x aporte mensual) para el mapa de calor
+        self.barrido_params = {
+            "rate_min": 0.0,
+            "rate_max": 0.15,
+            "rate_steps": 31,
+            "monthly_min": 0,
+            "monthly_max": 5000,
+            "monthly_steps": 21
+        }
         # Fondo para SimulationPage
-        self.original_bg = None
-        try:
-            path_bg = os.path.join("images", "Fondo2.jpg")
-            self.original_bg = Image.open(path_bg)
-        except Exception as e:
-            print("Error cargando fondo SimulationPage:", e)
-        self.bg_label = tk.Label(self)
-        self.bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        self.bind("<Configure>", self._resize_bg)
+        self.fondo = FondoAjustable(self, "Fondo2.jpg")
 
         title_label = tk.Label(self, text="Simulaciones y Escenarios",
                                font=("Comic Sans MS", 24), fg="#D35400", bg="#FFF3A1")
@@ -712,6 +804,18 @@ class SimulationPage(tk.Frame):
         btn_graph_inver = ttk.Button(adv_control_frame, text="Mostrar Gráfica Inversión",
                                      style="Infantil.TButton", command=self.mostrar_grafica_inversion)
         btn_graph_inver.pack(side="left", padx=5, pady=5)
+        btn_graph_mc = ttk.Button(adv_control_frame, text="Simulación Monte Carlo",
+                                  style="Infantil.TButton", command=self.mostrar_grafica_montecarlo)
+        btn_graph_mc.pack(side="left", padx=5, pady=5)
+        btn_graph_sweep = ttk.Button(adv_control_frame, text="Mapa de Calor",
+                                     style="Infantil.TButton", command=self.mostrar_mapa_calor)
+        btn_graph_sweep.pack(side="left", padx=5, pady=5)
+        btn_goal = ttk.Button(adv_control_frame, text="Aporte para la Meta",
+                              style="Infantil.TButton", command=self.calcular_aporte_meta)
+        btn_goal.pack(side="left", padx=5, pady=5)
+        btn_credit = ttk.Button(adv_control_frame, text="Agregar Crédito",
+                                style="Infantil.TButton", command=self.agregar_credito)
+        btn_credit.pack(side="left", padx=5, pady=5)
         self.advanced_graph_frame = tk.Frame(self.advanced_frame, bg="#F7F7F7")
         self.advanced_graph_frame.pack(fill="both", expand=True, padx=10, pady=10)
         btn_volver = ttk.Button(self, text="Volver al Inicio", image=self.controller.icon_back,
@@ -720,17 +824,6 @@ class SimulationPage(tk.Frame):
         btn_volver.pack(pady=5)
 
 
-    def _resize_bg(self, event):
-        if not self.original_bg:
-            return
-        new_width = event.width
-        new_height = event.height
-        if new_width < 10 or new_height < 10:
-            return
-        resized_image = self.original_bg.resize((new_width, new_height), Image.LANCZOS)
-        self.bg_image = ImageTk.PhotoImage(resized_image)
-        self.bg_label.config(image=self.bg_image)
-
     def generate_time_chart(self):
         try:
             sleep = float(self.entry_sleep.get())
@@ -747,19 +840,18 @@ class SimulationPage(tk.Frame):
             return
         labels = ["Sueño", "Trabajo", "Estudio", "Cuidado del Bebé", "Otros"]
         values = [sleep, work, study, care, other]
-        for widget in self.time_chart_frame.winfo_children():
-            widget.destroy()
-        fig, ax = plt.subplots(figsize=(4, 4))
-        ax.pie(values, labels=labels, autopct="%1.1f%%")
-        ax.set_title("Distribución de Horas Diarias")
-        canvas = FigureCanvasTkAgg(fig, master=self.time_chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack()
+        ranura = graficas.ranura(self.time_chart_frame, "horas", figsize=(4, 4))
+        # El pastel se vuelve a trazar en los mismos ejes; la figura y el widget se reutilizan
+        ranura.limpiar()
+        ranura.ax.pie(values, labels=labels, autopct="%1.1f%%")
+        ranura.ax.set_title("Distribución de Horas Diarias")
+        ranura.mostrar()
+        ranura.redibujar(ajustar=False)
 
     def editar_simulaciones(self):
         editor = tk.Toplevel(self)
         editor.title("Editar Simulaciones")
-        editor.geometry("400x400")
+        editor.geometry("520x660")
         # Sección de Inversión
         inv_frame = tk.LabelFrame(editor, text="Simulación de Inversión", padx=10, pady=10)
         inv_frame.pack(fill="x", padx=10, pady=10)
@@ -779,36 +871,54 @@ class SimulationPage(tk.Frame):
         entry_term = tk.Entry(inv_frame)
         entry_term.insert(0, str(self.inversion_params["term"]))
         entry_term.grid(row=3, column=1, padx=5, pady=5)
+        tk.Label(inv_frame, text="Volatilidad Anual (%):").grid(row=4, column=0, sticky="w")
+        entry_volatility = tk.Entry(inv_frame)
+        entry_volatility.insert(0, str(self.inversion_params["volatility"] * 100))
+        entry_volatility.grid(row=4, column=1, padx=5, pady=5)
+        tk.Label(inv_frame, text="Escenarios Monte Carlo:").grid(row=5, column=0, sticky="w")
+        entry_paths = tk.Entry(inv_frame)
+        entry_paths.insert(0, str(self.inversion_params["paths"]))
+        entry_paths.grid(row=5, column=1, padx=5, pady=5)
+        tk.Label(inv_frame, text="Meta (MXN):").grid(row=6, column=0, sticky="w")
+        entry_target = tk.Entry(inv_frame)
+        entry_target.insert(0, str(self.inversion_params["target"]))
+        entry_target.grid(row=6, column=1, padx=5, pady=5)
         # Sección de Cronograma
         cron_frame = tk.LabelFrame(editor, text="Simulación de Cronograma", padx=10, pady=10)
         cron_frame.pack(fill="x", padx=10, pady=10)
-        tk.Label(cron_frame, text="Gastos Inicial (MXN):").grid(row=0, column=0, sticky="w")
-        entry_gastos_ini = tk.Entry(cron_frame)
-        entry_gastos_ini.insert(0, str(self.cronograma_params["gastos_inicial"]))
-        entry_gastos_ini.grid(row=0, column=1, padx=5, pady=5)
-        tk.Label(cron_frame, text="Gastos Final (MXN):").grid(row=1, column=0, sticky="w")
-        entry_gastos_fin = tk.Entry(cron_frame)
-        entry_gastos_fin.insert(0, str(self.cronograma_params["gastos_final"]))
-        entry_gastos_fin.grid(row=1, column=1, padx=5, pady=5)
-        tk.Label(cron_frame, text="Ingresos Inicial (MXN):").grid(row=2, column=0, sticky="w")
-        entry_ingresos_ini = tk.Entry(cron_frame)
-        entry_ingresos_ini.insert(0, str(self.cronograma_params["ingresos_inicial"]))
-        entry_ingresos_ini.grid(row=2, column=1, padx=5, pady=5)
-        tk.Label(cron_frame, text="Ingresos Final (MXN):").grid(row=3, column=0, sticky="w")
-        entry_ingresos_fin = tk.Entry(cron_frame)
-        entry_ingresos_fin.insert(0, str(self.cronograma_params["ingresos_final"]))
-        entry_ingresos_fin.grid(row=3, column=1, padx=5, pady=5)
+        tk.Label(cron_frame, text="Horizonte (meses):").grid(row=0, column=0, sticky="w")
+        entry_horizonte = tk.Entry(cron_frame)
+        entry_horizonte.insert(0, str(self.cronograma_params["term"]))
+        entry_horizonte.grid(row=0, column=1, padx=5, pady=5)
+        # Sección de Barrido
+        sweep_frame = tk.LabelFrame(editor, text="Barrido de Escenarios (Mapa de Calor)", padx=10, pady=10)
+        sweep_frame.pack(fill="x", padx=10, pady=10)
+        entradas_barrido = {}
+        for fila, (clave, texto, escala) in enumerate([
+                ("rate", "Tasa Anual (%) mín / máx / pasos:", 100),
+                ("monthly", "Aporte Mensual mín / máx / pasos:", 1)]):
+            tk.Label(sweep_frame, text=texto).grid(row=fila, column=0, sticky="w")
+            for col, sufijo in enumerate(("min", "max", "steps")):
+                valor = self.barrido_params[f"{clave}_{sufijo}"]
+                entry = tk.Entry(sweep_frame, width=7)
+                entry.insert(0, str(valor if sufijo == "steps" else valor * escala))
+                entry.grid(row=fila, column=col + 1, padx=2, pady=5)
+                entradas_barrido[(clave, sufijo)] = (entry, escala)
         def aplicar_cambios():
             try:
                 self.inversion_params["initial"] = float(entry_initial.get())
                 self.inversion_params["monthly"] = float(entry_monthly.get())
                 self.inversion_params["rate"] = float(entry_rate.get()) / 100
                 self.inversion_params["term"] = int(entry_term.get())
-                self.cronograma_params["gastos_inicial"] = float(entry_gastos_ini.get())
-                self.cronograma_params["gastos_final"] = float(entry_gastos_fin.get())
-                self.cronograma_params["ingresos_inicial"] = float(entry_ingresos_ini.get())
-                self.cronograma_params["ingresos_final"] = float(entry_ingresos_fin.get())
-                self.cronograma_params["term"] = int(entry_term.get())
+                self.inversion_params["volatility"] = float(entry_volatility.get()) / 100
+                self.inversion_params["paths"] = int(entry_paths.get())
+                self.inversion_params["target"] = float(entry_target.get())
+                self.cronograma_params["term"] = int(entry_horizonte.get())
+                for (clave, sufijo), (entry, escala) in entradas_barrido.items():
+                    if sufijo == "steps":
+                        self.barrido_params[f"{clave}_{sufijo}"] = max(int(entry.get()), 1)
+                    else:
+                        self.barrido_params[f"{clave}_{sufijo}"] = float(entry.get()) / escala
                 messagebox.showinfo("Éxito", "Parámetros actualizados correctamente.")
                 editor.destroy()
             except Exception as ex:
@@ -816,63 +926,205 @@ class SimulationPage(tk.Frame):
         btn_aplicar = ttk.Button(editor, text="Aplicar Cambios", style="Infantil.TButton", command=aplicar_cambios)
         btn_aplicar.pack(pady=10)
 
-    def simulate_inversion(self, initial, monthly, rate, term):
-        values = []
-        total = initial
-        monthly_rate = (1 + rate) ** (1/12) - 1
-        for _ in range(term):
-            total = total * (1 + monthly_rate) + monthly
-            values.append(total)
-        return values
-
     def mostrar_grafica_cronograma(self):
-        for widget in self.advanced_graph_frame.winfo_children():
-            widget.destroy()
-        term = self.cronograma_params["term"]
-        gastos = np.linspace(self.cronograma_params["gastos_inicial"],
-                             self.cronograma_params["gastos_final"], term)
-        ingresos = np.linspace(self.cronograma_params["ingresos_inicial"],
-                               self.cronograma_params["ingresos_final"], term)
-        df = pd.DataFrame({
-            "Mes": list(range(1, term + 1)),
-            "Gastos": gastos,
-            "Ingresos": ingresos
-        })
-        df["Balance"] = df["Ingresos"] - df["Gastos"]
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.plot(df["Mes"], df["Gastos"], marker='o', label="Gastos")
-        ax.plot(df["Mes"], df["Ingresos"], marker='o', label="Ingresos")
-        ax.plot(df["Mes"], df["Balance"], marker='o', label="Balance")
-        ax.set_title("Evolución del Cronograma Financiero")
+        # Proyección real de los gastos e ingresos registrados, calculada en segundo plano
+        cronograma_en_segundo_plano(self, self.cronograma_params["term"], list(self.creditos),
+                                    al_terminar=self._dibujar_cronograma)
+
+    def agregar_credito(self):
+        """Registra un préstamo o tarjeta; sus pagos mensuales entran al cronograma como gastos."""
+        dialogo = tk.Toplevel(self)
+        dialogo.title("Agregar Crédito")
+        dialogo.geometry("420x330")
+        form = tk.Frame(dialogo)
+        form.pack(padx=10, pady=10)
+        tk.Label(form, text="Tipo:").grid(row=0, column=0, sticky="w")
+        combo_tipo = ttk.Combobox(form, values=["Préstamo (pago fijo)", "Tarjeta (pago mínimo)"], state="readonly")
+        combo_tipo.current(0)
+        combo_tipo.grid(row=0, column=1, padx=5, pady=3)
+        campos = {}
+        for fila, (clave, texto, valor) in enumerate([
+                ("concepto", "Concepto:", "Hospital"),
+                ("monto", "Monto (MXN):", 30000),
+                ("rate", "Tasa Anual (%):", 24),
+                ("term", "Plazo (meses) / % mínimo:", 12),
+                ("inicio", "Primer pago (YYYY-MM):", datetime.date.today().strftime("%Y-%m"))], start=1):
+            tk.Label(form, text=texto).grid(row=fila, column=0, sticky="w")
+            entry = tk.Entry(form)
+            entry.insert(0, str(valor))
+            entry.grid(row=fila, column=1, padx=5, pady=3)
+            campos[clave] = entry
+
+        def guardar():
+            try:
+                monto = float(campos["monto"].get())
+                rate = float(campos["rate"].get()) / 100
+                plazo = float(campos["term"].get())
+                inicio = datetime.datetime.strptime(campos["inicio"].get().strip()[:7], "%Y-%m").strftime("%Y-%m")
+            except ValueError as ex:
+                messagebox.showerror("Error", f"Verifica los valores ingresados: {ex}")
+                return
+            if combo_tipo.current() == 0:
+                tabla = amortizar_prestamo(monto, rate, int(plazo))
+            else:
+                tabla = amortizar_tarjeta(monto, rate, pct_minimo=plazo / 100, meses=self.cronograma_params["term"])
+            concepto = campos["concepto"].get().strip() or "Crédito"
+            self.creditos.extend(pagos_como_gastos(tabla["pago"], inicio, categoria=f"Crédito: {concepto}"))
+            messagebox.showinfo("Éxito", f"Crédito agregado. Total a pagar: ${tabla['pago'].sum():,.2f} "
+                                         f"(intereses ${tabla['interes'].sum():,.2f}).")
+            dialogo.destroy()
+
+        ttk.Button(dialogo, text="Agregar", style="Infantil.TButton", command=guardar).pack(pady=5)
+
+    def _dibujar_cronograma(self, df):
+        # Todas las simulaciones avanzadas comparten una ranura; cada tipo conserva sus artistas
+        ranura = graficas.ranura(self.advanced_graph_frame, "avanzada")
+        ranura.preparar("cronograma")
+        for columna in ("Gastos", "Ingresos", "Balance"):
+            ranura.linea(columna, df["Mes"], df[columna], marker='o', label=columna)
+        ranura.linea("Balance Acumulado", df["Mes"], df["Balance Acumulado"], label="Balance Acumulado")
+        ax = ranura.ax
+        ax.set_title(f"Evolución del Cronograma Financiero ({df['Periodo'].iloc[0]} a {df['Periodo'].iloc[-1]})")
         ax.set_xlabel("Mes")
         ax.set_ylabel("Monto (MXN)")
         ax.legend()
         ax.grid(True)
-        canvas_fig = FigureCanvasTkAgg(fig, master=self.advanced_graph_frame)
-        canvas_fig.draw()
-        canvas_fig.get_tk_widget().pack(pady=5)
+        ranura.mostrar(pady=5)
+        ranura.redibujar()
 
     def mostrar_grafica_inversion(self):
-        for widget in self.advanced_graph_frame.winfo_children():
-            widget.destroy()
+        import numpy as np
         term = self.inversion_params["term"]
         initial = self.inversion_params["initial"]
         monthly = self.inversion_params["monthly"]
         rate = self.inversion_params["rate"]
         months = list(range(1, term + 1))
-        values_current = self.simulate_inversion(initial, monthly, rate, term)
-        values_12 = self.simulate_inversion(initial, monthly, 0.12, term)
-        fig, ax = plt.subplots(figsize=(6, 4))
-        ax.plot(months, values_current, marker='o', label=f"Tasa {rate*100:.1f}%")
-        ax.plot(months, values_12, marker='o', label="Tasa 12%")
+        values_current, values_12 = trayectoria_inversion(initial, monthly, np.array([rate, 0.12]), term)
+        ranura = graficas.ranura(self.advanced_graph_frame, "avanzada")
+        ranura.preparar("inversion")
+        ranura.linea("actual", months, values_current, marker='o', label=f"Tasa {rate*100:.1f}%")
+        ranura.linea("12", months, values_12, marker='o', label="Tasa 12%")
+        ax = ranura.ax
         ax.set_title("Comparación de Proyección de Inversión")
         ax.set_xlabel("Meses")
         ax.set_ylabel("Valor Acumulado (MXN)")
         ax.legend()
         ax.grid(True)
-        canvas_fig = FigureCanvasTkAgg(fig, master=self.advanced_graph_frame)
-        canvas_fig.draw()
-        canvas_fig.get_tk_widget().pack(pady=5)
+        ranura.mostrar(pady=5)
+        ranura.redibujar()
+
+    def mostrar_grafica_montecarlo(self):
+        p = self.inversion_params
+        # Decenas de miles de escenarios: se simulan fuera del hilo de Tk
+        calcular_en_segundo_plano(self, simular_montecarlo, p["initial"], p["monthly"], p["rate"], p["term"],
+                                  volatility=p["volatility"], caminos=p["paths"], objetivo=p["target"], semilla=0,
+                                  al_terminar=self._dibujar_montecarlo,
+                                  al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo simular: {e}"))
+
+    def calcular_aporte_meta(self):
+        """Aporte mensual que cubre el total del plan al final de la última etapa."""
+        import numpy as np
+        p = self.inversion_params
+        dialogo = tk.Toplevel(self)
+        dialogo.title("Aporte para la Meta")
+        dialogo.geometry("460x420")
+        form = tk.Frame(dialogo)
+        form.pack(padx=10, pady=10)
+        campos = {}
+        # Por defecto: lo que cuesta todo el plan registrado y los meses hasta el final del Quinto Año
+        for fila, (clave, texto, valor) in enumerate([
+                ("target", "Meta (MXN):", round(plan_vida.calcular_total_plan(), 2)),
+                ("term", "Plazo (meses):", plan_vida.duracion_total()),
+                ("initial", "Inversión Inicial (MXN):", p["initial"]),
+                ("rate", "Tasa de Interés Anual (%):", p["rate"] * 100)]):
+            tk.Label(form, text=texto).grid(row=fila, column=0, sticky="w")
+            entry = tk.Entry(form)
+            entry.insert(0, str(valor))
+            entry.grid(row=fila, column=1, padx=5, pady=3)
+            campos[clave] = entry
+        resultado = tk.Text(dialogo, height=14, width=52)
+        resultado.pack(padx=10, pady=5)
+
+        def resolver():
+            try:
+                target = float(campos["target"].get())
+                term = int(campos["term"].get())
+                initial = float(campos["initial"].get())
+                rate = float(campos["rate"].get()) / 100
+            except ValueError as ex:
+                messagebox.showerror("Error", f"Verifica los valores ingresados: {ex}")
+                return
+            aporte = aporte_necesario(target, initial, rate, term)
+            # Forma por lotes: la misma meta para varias tasas de una vez
+            tasas = np.arange(0, 0.13, 0.02)
+            aportes = aporte_necesario(target, initial, tasas, term)
+            tasa = tasa_necesaria(target, initial, p["monthly"], term)
+            resultado.delete("1.0", tk.END)
+            resultado.insert(tk.END, f"Aporte mensual necesario al {rate*100:.1f}%: ${aporte:,.2f}\n\n")
+            resultado.insert(tk.END, "Tasa    Aporte mensual\n")
+            for t, a in zip(tasas, aportes):
+                resultado.insert(tk.END, f"{t*100:4.0f}%   ${a:,.2f}\n")
+            if np.isnan(tasa):
+                resultado.insert(tk.END, f"\nCon ${p['monthly']:,.2f} al mes ninguna tasa razonable alcanza la meta.\n")
+            else:
+                resultado.insert(tk.END, f"\nCon ${p['monthly']:,.2f} al mes se necesita una tasa del {tasa*100:.2f}%.\n")
+
+        ttk.Button(dialogo, text="Calcular", style="Infantil.TButton", command=resolver).pack(pady=5)
+        resolver()
+
+    def mostrar_mapa_calor(self):
+        import numpy as np
+        p = self.inversion_params
+        b = self.barrido_params
+        rates = np.linspace(b["rate_min"], b["rate_max"], b["rate_steps"])
+        monthlies = np.linspace(b["monthly_min"], b["monthly_max"], b["monthly_steps"])
+        calcular_en_segundo_plano(self, barrer_escenarios, p["initial"], monthlies, rates, p["term"],
+                                  al_terminar=self._dibujar_mapa_calor,
+                                  al_fallar=lambda e: messagebox.showerror("Error", f"No se pudo calcular: {e}"))
+
+    def _dibujar_mapa_calor(self, tabla):
+        p = self.inversion_params
+        mapa = tabla.pivot(index="Aporte Mensual", columns="Tasa", values="Valor Final")
+        rates = mapa.columns.to_numpy() * 100
+        monthlies = mapa.index.to_numpy()
+        ranura = graficas.ranura(self.advanced_graph_frame, "avanzada")
+        extension = (rates[0], rates[-1], monthlies[0], monthlies[-1])
+        ax = ranura.ax
+        if ranura.preparar("mapa"):
+            # Ya había un mapa: se cambian los datos de la imagen y se reescala la barra de color
+            imagen = ranura.artistas["imagen"]
+            imagen.set_data(mapa.to_numpy())
+            imagen.set_extent(extension)
+            imagen.autoscale()
+        else:
+            ax = ranura.ax
+            imagen = ax.imshow(mapa.to_numpy(), origin="lower", aspect="auto", cmap="viridis", extent=extension)
+            ranura.fig.colorbar(imagen, ax=ax, label="Valor Final (MXN)")
+            ranura.artistas["imagen"] = imagen
+        ax.set_title(f"Valor final a {p['term']} meses (inicial ${p['initial']:,.0f})")
+        ax.set_xlabel("Tasa Anual (%)")
+        ax.set_ylabel("Aporte Mensual (MXN)")
+        ranura.mostrar(pady=5)
+        ranura.redibujar(ajustar=False)
+
+    def _dibujar_montecarlo(self, resultado):
+        p = self.inversion_params
+        months = resultado["meses"]
+        ranura = graficas.ranura(self.advanced_graph_frame, "avanzada")
+        ranura.preparar("montecarlo")
+        ax = ranura.ax
+        ranura.reemplazar("banda", lambda: ax.fill_between(months, resultado["P5"], resultado["P95"],
+                                                           alpha=0.3, label="P5 - P95"))
+        ranura.linea("P50", months, resultado["P50"], label="Mediana (P50)")
+        ranura.linea("meta", [months[0], months[-1]], [p["target"], p["target"]], color="red",
+                     linestyle="--", label=f"Meta ${p['target']:,.0f}")
+        ax.set_title(f"Monte Carlo: {resultado['probabilidad']:.1%} de alcanzar la meta")
+        ax.set_xlabel("Meses")
+        ax.set_ylabel("Valor Acumulado (MXN)")
+        ax.legend()
+        ax.grid(True)
+        ranura.mostrar(pady=5)
+        ranura.redibujar()
 
 # -------------------- Registrar Ingresos --------------------
 class IncomePage(tk.Frame):
@@ -926,9 +1178,12 @@ class IncomePage(tk.Frame):
         except ValueError:
             messagebox.showerror("Error", "La fecha debe tener formato YYYY-MM-DD.")
             return
-        nuevo_ingreso = Ingreso(tipo, monto, periodicidad, fecha, descripcion)
         from modules.db_handler import insertar_ingreso
-        insertar_ingreso(tipo, monto, periodicidad, fecha, descripcion)
+        en_segundo_plano(self, insertar_ingreso, tipo, monto, periodicidad, fecha, descripcion,
+                         al_terminar=lambda _: self._ingreso_guardado(),
+                         al_fallar=mostrar_error_bd)
+
+    def _ingreso_guardado(self):
         messagebox.showinfo("Éxito", "Ingreso registrado exitosamente.")
         self.combo_tipo.current(0)
         self.entry_monto.delete(0, tk.END)
@@ -948,39 +1203,53 @@ class ModulesPage(tk.Frame):
         title.pack(pady=10)
         self.nb = ttk.Notebook(self)
         self.nb.pack(fill="both", expand=True, padx=10, pady=10)
+        # Cada pestaña se arma la primera vez que se selecciona
+        self._pendientes = {}
         # Apoyo Familiar
         self.support_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.support_tab, text="Apoyo Familiar")
-        self.setup_support_tab()
+        self._pendientes[self.support_tab] = self.setup_support_tab
         # Gastos del Hogar
         self.home_exp_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.home_exp_tab, text="Gastos del Hogar")
-        self.setup_home_exp_tab()
+        self._pendientes[self.home_exp_tab] = self.setup_home_exp_tab
         # Gastos del Bebé
         self.baby_exp_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.baby_exp_tab, text="Gastos del Bebé")
-        self.setup_baby_exp_tab()
+        self._pendientes[self.baby_exp_tab] = self.setup_baby_exp_tab
         # Hospital/Postparto
         self.hosp_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.hosp_tab, text="Hospital/Postparto")
-        self.setup_hosp_tab()
+        self._pendientes[self.hosp_tab] = self.setup_hosp_tab
         # Documentación y Eventos
         self.events_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.events_tab, text="Documentación/ Eventos")
-        self.setup_events_tab()
+        self._pendientes[self.events_tab] = self.setup_events_tab
         # Servicios
         self.services_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.services_tab, text="Servicios")
-        self.setup_services_tab()
+        self._pendientes[self.services_tab] = self.setup_services_tab
+        # Cronograma Financiero
+        self.cronogram_tab = tk.Frame(self.nb, bg="#F7F7F7")
+        self.nb.add(self.cronogram_tab, text="Cronograma")
+        self._pendientes[self.cronogram_tab] = self.setup_cronogram_tab
         # Gráficas Extras
         self.extra_graph_tab = tk.Frame(self.nb, bg="#F7F7F7")
         self.nb.add(self.extra_graph_tab, text="Gráficas Extras")
-        self.setup_extra_graph_tab()
+        self._pendientes[self.extra_graph_tab] = self.setup_extra_graph_tab
+        self.nb.bind("<<NotebookTabChanged>>", self._construir_pestana)
+        self._construir_pestana()
         btn_volver = ttk.Button(self, text="Volver al Inicio", image=self.controller.icon_back,
                                 compound="left", style="Infantil.TButton",
                                 command=lambda: self.controller.show_frame(HomePage))
         btn_volver.pack(pady=5)
 
+    def _construir_pestana(self, event=None):
+        pestana = self.nametowidget(self.nb.select())
+        setup = self._pendientes.pop(pestana, None)
+        if setup is not None:
+            setup()
+
     def setup_fin_tab(self):
         # Aquí se pueden agregar más módulos si es necesario
         pass
@@ -1007,10 +1276,18 @@ class ModulesPage(tk.Frame):
 
     def setup_cronogram_tab(self):
         tk.Label(self.cronogram_tab, text="Cronograma Financiero (60 meses)", font=("Comic Sans MS", 16), bg="#F7F7F7").pack(pady=5)
-        df = generar_cronograma_financiero()
-        self.mod_cronogram_text = tk.Text(self.cronogram_tab, width=80, height=15)
-        self.mod_cronogram_text.insert(tk.END, df.to_string(index=False))
+        btn_actualizar = ttk.Button(self.cronogram_tab, text="Actualizar Cronograma", style="Infantil.TButton",
+                                    command=self.actualizar_cronograma)
+        btn_actualizar.pack(pady=5)
+        self.mod_cronogram_text = tk.Text(self.cronogram_tab, width=100, height=15)
         self.mod_cronogram_text.pack(pady=5)
+        self.actualizar_cronograma()
+
+    def actualizar_cronograma(self):
+        def mostrar(df):
+            self.mod_cronogram_text.delete("1.0", tk.END)
+            self.mod_cronogram_text.insert(tk.END, df.to_string(index=False, float_format="%.2f"))
+        cronograma_en_segundo_plano(self, 60, al_terminar=mostrar)
 
     def setup_home_exp_tab(self):
         tk.Label(self.home_exp_tab, text="Gastos del Hogar", font=("Comic Sans MS", 16), bg="#F7F7F7").pack(pady=5)
@@ -1040,7 +1317,7 @@ class ModulesPage(tk.Frame):
             total = expense.total(12)
             self.mod_home_result.config(text=f"Gasto Anual: {total:.2f} MXN")
             from modules.db_handler import insertar_gasto
-            insertar_gasto(name, monto, periodicidad, datetime.date.today().strftime("%Y-%m-%d"), "Hogar", origen="hogar")
+            en_segundo_plano(self, insertar_gasto, name, monto, periodicidad, datetime.date.today().strftime("%Y-%m-%d"), "Hogar", origen="hogar", al_fallar=mostrar_error_bd)
         except Exception as e:
             messagebox.showerror("Error", "Verifica los datos ingresados.")
 
@@ -1076,7 +1353,7 @@ class ModulesPage(tk.Frame):
             total = expense.total(12)
             self.mod_baby_result.config(text=f"Gasto Anual: {total:.2f} MXN")
             from modules.db_handler import insertar_gasto
-            insertar_gasto(item, cost * freq, period, datetime.date.today().strftime("%Y-%m-%d"), "Bebé", origen="bebé")
+            en_segundo_plano(self, insertar_gasto, item, cost * freq, period, datetime.date.today().strftime("%Y-%m-%d"), "Bebé", origen="bebé", al_fallar=mostrar_error_bd)
         except Exception as e:
             messagebox.showerror("Error", "Verifica los datos ingresados.")
 
@@ -1107,7 +1384,7 @@ class ModulesPage(tk.Frame):
             expense = HospitalExpense(item, cost, fecha)
             self.mod_hosp_result.config(text=f"Gasto '{item}' registrado: {cost:.2f} MXN en {fecha}")
             from modules.db_handler import insertar_gasto
-            insertar_gasto(item, cost, "único", fecha, "Hospital", origen="hospital")
+            en_segundo_plano(self, insertar_gasto, item, cost, "único", fecha, "Hospital", origen="hospital", al_fallar=mostrar_error_bd)
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un problema: {e}")
 
@@ -1138,7 +1415,7 @@ class ModulesPage(tk.Frame):
             event_expense = EventExpense(event, cost, date)
             self.mod_event_result.config(text=f"Evento '{event}' registrado: {cost:.2f} MXN en {date}")
             from modules.db_handler import insertar_gasto
-            insertar_gasto(event, cost, "único", date, "Eventos", origen="documentacion")
+            en_segundo_plano(self, insertar_gasto, event, cost, "único", date, "Eventos", origen="documentacion", al_fallar=mostrar_error_bd)
         except Exception as e:
             messagebox.showerror("Error", "Verifica los datos ingresados.")
 
@@ -1170,7 +1447,7 @@ class ModulesPage(tk.Frame):
             total = expense.total(12)
             self.mod_service_result.config(text=f"Gasto Anual: {total:.2f} MXN")
             from modules.db_handler import insertar_gasto
-            insertar_gasto(service, cost, period, datetime.date.today().strftime("%Y-%m-%d"), "Servicios", origen="servicios")
+            en_segundo_plano(self, insertar_gasto, service, cost, period, datetime.date.today().strftime("%Y-%m-%d"), "Servicios", origen="servicios", al_fallar=mostrar_error_bd)
         except Exception as e:
             messagebox.showerror("Error", "Verifica los datos ingresados.")
 
@@ -1221,5 +1498,16 @@ class ModulesPage(tk.Frame):
         btn_volver.pack(pady=5)
 
 if __name__ == "__main__":
+    preparar_datos()
     app = App()
+    if "--medir-arranque" in sys.argv:
+        # <Map> llega cuando el gestor de ventanas ya mostró la ventana principal (after_idle
+        # podía correr antes); update_idletasks termina de dibujar lo pendiente antes de medir
+        def reportar_arranque(evento):
+            if evento.widget is not app:
+                return  # <Map> de un widget hijo
+            app.update_idletasks()
+            print(f"Tiempo hasta la primera ventana interactiva: {time.perf_counter() - _INICIO_ARRANQUE:.3f} s")
+            app.after(0, app.destroy)
+        app.bind("<Map>", reportar_arranque, add="+")
     app.mainloop()
@@ -1,18 +1,33 @@
 # modules/baby_expenses.py
 
-class BabyExpense:
+from modules.expense_base import GastoBase
+
+
+class BabyExpense(GastoBase):
+    __slots__ = ("item", "_costo", "_frecuencia")
+
     def __init__(self, item, costo, periodicidad, frecuencia=1):
+        # frecuencia = unidades compradas en cada periodo; el monto por periodo es
+        # costo * frecuencia, lo mismo que se guarda como monto en la base
+        super().__init__(costo * frecuencia, periodicidad)
         self.item = item
-        self.costo = costo
-        self.periodicidad = periodicidad
-        self.frecuencia = frecuencia
-
-    def total(self, periodos):
-        if self.periodicidad == "único":
-            return self.costo * self.frecuencia
-        elif self.periodicidad == "mensual":
-            return self.costo * self.frecuencia * periodos
-        elif self.periodicidad == "anual":
-            return self.costo * self.frecuencia * (periodos / 12)
-        else:
-            return 0
+        self._costo = costo
+        self._frecuencia = frecuencia
+
+    @property
+    def costo(self):
+        return self._costo
+
+    @costo.setter
+    def costo(self, valor):
+        self._costo = valor
+        self.monto = valor * self._frecuencia
+
+    @property
+    def frecuencia(self):
+        return self._frecuencia
+
+    @frecuencia.setter
+    def frecuencia(self, valor):
+        self._frecuencia = valor
+        self.monto = self._costo * valor
@@ -0,0 +1,113 @@
+# modules/charts.py
+
+
+class Ranura:
+    """
+    Una gráfica reutilizable: una Figure y su lienzo que se crean una sola vez.
+    Las actualizaciones cambian los datos de los artistas existentes (set_data,
+    alturas de barras) y piden el redibujado con draw_idle, en lugar de crear
+    otra figura y otro widget en cada clic. Se usa la API orientada a objetos
+    de Figure, sin pyplot, así no quedan figuras registradas sin cerrar.
+    Con master=None dibuja fuera de pantalla (Agg), por ejemplo para exportar.
+    """
+    def __init__(self, master=None, figsize=(6, 4)):
+        # matplotlib se importa al crear la primera gráfica, no al arrancar la aplicación
+        from matplotlib.figure import Figure
+        self.fig = Figure(figsize=figsize)
+        if master is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.widget = None
+        else:
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+            self.widget = self.canvas.get_tk_widget()
+        self.ax = self.fig.add_subplot()
+        self.tipo = None
+        self.artistas = {}
+
+    def preparar(self, tipo):
+        """
+        Deja la figura lista para una gráfica de 'tipo'. Si ya mostraba ese tipo
+        conserva los artistas (para actualizarlos) y devuelve True; si no, vacía
+        la figura y devuelve False.
+        """
+        if self.tipo == tipo:
+            return True
+        self.fig.clear()
+        self.ax = self.fig.add_subplot()
+        self.artistas = {}
+        self.tipo = tipo
+        return False
+
+    def limpiar(self):
+        """Vacía los ejes conservando la figura (para gráficas que no se actualizan por partes, como la de pastel)."""
+        self.ax.clear()
+        self.artistas = {}
+
+    def linea(self, clave, x, y, **estilo):
+        linea = self.artistas.get(clave)
+        if linea is None:
+            (linea,) = self.ax.plot(x, y, **estilo)
+            self.artistas[clave] = linea
+        else:
+            linea.set_data(x, y)
+            linea.set(**estilo)
+        return linea
+
+    def barras(self, clave, etiquetas, alturas):
+        """Barras por etiqueta; si las etiquetas no cambiaron sólo se ajustan las alturas."""
+        etiquetas = list(etiquetas)
+        anteriores = self.artistas.get(clave)
+        if anteriores is not None and anteriores[0] == etiquetas:
+            for barra, altura in zip(anteriores[1], alturas):
+                barra.set_height(altura)
+            return anteriores[1]
+        if anteriores is not None:
+            # Cambiaron las categorías del eje: se rehace la gráfica desde cero
+            tipo, self.tipo = self.tipo, None
+            self.preparar(tipo)
+        barras = self.ax.bar(etiquetas, alturas)
+        self.artistas[clave] = (etiquetas, barras)
+        return barras
+
+    def reemplazar(self, clave, crear):
+        """Para artistas sin actualización en el lugar (p. ej. fill_between): quita el anterior y crea otro."""
+        anterior = self.artistas.pop(clave, None)
+        if anterior is not None:
+            anterior.remove()
+        self.artistas[clave] = crear()
+        return self.artistas[clave]
+
+    def mostrar(self, **pack):
+        """Coloca el widget al final de su contenedor (si ya estaba, lo mueve)."""
+        if self.widget is not None:
+            self.widget.pack_forget()
+            self.widget.pack(**pack)
+
+    def redibujar(self, ajustar=True):
+        if ajustar:
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+
+class GestorGraficas:
+    """Entrega una Ranura por (contenedor, nombre) y la reutiliza mientras su widget exista."""
+    def __init__(self):
+        self._ranuras = {}
+
+    def ranura(self, master, nombre="principal", figsize=(6, 4)):
+        clave = (str(master), nombre)
+        ranura = self._ranuras.get(clave)
+        if ranura is None or (ranura.widget is not None and not ranura.widget.winfo_exists()):
+            ranura = Ranura(master, figsize)
+            self._ranuras[clave] = ranura
+        return ranura
+
+    def conserva(self, master):
+        """Widgets de las gráficas de ese contenedor (para no destruirlos al limpiarlo)."""
+        return {r.widget for (m, _), r in self._ranuras.items() if m == str(master) and r.widget is not None}
+
+
+graficas = GestorGraficas()
@@ -0,0 +1,92 @@
+# modules/dataset_cache.py
+
+import threading
+
+import numpy as np
+
+from modules import db_handler
+from modules.expense_base import Periodicidad
+
+# Columnas de las filas de cada tabla, como las devuelve db_handler
+COLUMNAS = {
+    "gastos": ("id",) + db_handler.COLUMNAS_GASTOS,
+    "ingresos": ("id",) + db_handler.COLUMNAS_INGRESOS,
+}
+_ITERAR = {"gastos": db_handler.iterar_gastos, "ingresos": db_handler.iterar_ingresos}
+
+
+def marco(tabla, filas):
+    """
+    DataFrame tipado con las filas de 'tabla': id entero, monto flotante, fecha
+    datetime64 y, ya calculados, el código de periodicidad ('codigo') y el mes
+    absoluto año * 12 + mes - 1 ('mes', -1 si la fecha no es válida).
+    """
+    import pandas as pd
+    df = pd.DataFrame.from_records(list(filas), columns=COLUMNAS[tabla])
+    # Las filas que no vienen de la base (p. ej. pagos de créditos) no tienen id
+    df["id"] = pd.to_numeric(df["id"], errors="coerce").fillna(-1).astype(np.int64)
+    df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0).astype(np.float64)
+    codigos = {texto: int(Periodicidad.desde_texto(texto)) for texto in df["periodicidad"].unique()}
+    df["codigo"] = df["periodicidad"].map(codigos).astype(np.int8)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce", format="%Y-%m-%d")
+    df["mes"] = (df["fecha"].dt.year * 12 + df["fecha"].dt.month - 1).fillna(-1).astype(np.int64)
+    return df
+
+
+class ConjuntoDatos:
+    """
+    DataFrame de una tabla que se pone al día con version_datos en lugar de
+    releerse completo: si sólo hubo inserciones agrega las filas nuevas, si sólo
+    hubo borrados quita esos ids, y únicamente ante otros cambios lo rehace.
+    Los DataFrames entregados no se modifican después: cada cambio crea uno nuevo,
+    así que se pueden seguir usando desde otro hilo.
+    """
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.version = None
+        self._df = None
+        self._lock = threading.RLock()
+
+    def actualizar(self):
+        """DataFrame al día con la base (la versión y las filas se leen en una misma transacción)."""
+        with self._lock, db_handler.transaccion(escritura=False):
+            version = db_handler.version_datos(self.tabla)
+            if version != self.version:
+                self._df = self._ponerse_al_dia(version)
+                self.version = version
+            return self._df
+
+    def _cargar_todo(self):
+        return marco(self.tabla, _ITERAR[self.tabla]())
+
+    def _ponerse_al_dia(self, version):
+        anterior = self.version
+        if (anterior is None or version["base"] != anterior["base"]
+                or version["inserciones"] < anterior["inserciones"]
+                or version["modificaciones"] < anterior["modificaciones"]):
+            return self._cargar_todo()
+        df = self._df
+        cambios = version["modificaciones"] - anterior["modificaciones"]
+        if cambios:
+            ids = np.frombuffer(db_handler.obtener_ids_ordenados(self.tabla), dtype=np.int64)
+            vigentes = np.isin(df["id"].to_numpy(), ids)
+            # Si faltan tantas filas como modificaciones hubo, todas fueron borrados;
+            # si no, hubo algún UPDATE y no sabemos qué fila cambió
+            if np.count_nonzero(~vigentes) != cambios:
+                return self._cargar_todo()
+            df = df[vigentes].reset_index(drop=True)
+        if version["inserciones"] > anterior["inserciones"]:
+            import pandas as pd
+            nuevas = list(_ITERAR[self.tabla](despues_de_id=anterior["ultimo_id"]))
+            if nuevas:
+                df = pd.concat([df, marco(self.tabla, nuevas)], ignore_index=True)
+        # Comprobación final: cualquier diferencia con la base se resuelve recargando
+        if len(df) != version["filas"]:
+            return self._cargar_todo()
+        return df
+
+
+# Las usa el cronograma (main.marcos_desde_bd), que se recalcula cada vez que se
+# muestra: entre una vista y otra sólo se leen de la base las filas que cambiaron
+datos_gastos = ConjuntoDatos("gastos")
+datos_ingresos = ConjuntoDatos("ingresos")
@@ -0,0 +1,118 @@
+# modules/db_executor.py
+
+import queue
+import threading
+from concurrent.futures import Future
+
+from modules import db_handler
+
+# Cada cuántos milisegundos revisa Tk si un resultado ya está listo
+INTERVALO_SONDEO_MS = 30
+
+
+class EjecutorBD:
+    """
+    Ejecuta las funciones de db_handler en un único hilo dedicado.
+    Como sólo hay un hilo y una cola FIFO, las escrituras se aplican en el
+    mismo orden en que se enviaron. El hilo es daemon: no impide que la
+    aplicación termine.
+    """
+    def __init__(self, nombre="EjecutorBD"):
+        self._nombre = nombre
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def _asegurar_hilo(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, name=self._nombre, daemon=True)
+                self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            tarea = self._cola.get()
+            if tarea is None:
+                # El hilo usa su propia conexión (una por hilo); la cerramos al salir
+                db_handler.cerrar_conexion()
+                return
+            futuro, funcion, args, kwargs = tarea
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                futuro.set_result(funcion(*args, **kwargs))
+            except BaseException as e:
+                futuro.set_exception(e)
+
+    def enviar(self, funcion, *args, **kwargs):
+        """Encola funcion(*args, **kwargs) y devuelve un Future con su resultado."""
+        self._asegurar_hilo()
+        futuro = Future()
+        self._cola.put((futuro, funcion, args, kwargs))
+        return futuro
+
+    def detener(self, esperar=True, limite=None):
+        """
+        Termina el hilo después de procesar lo que ya estaba en la cola.
+        Con esperar, espera a que termine (a lo más 'limite' segundos si se indica).
+        """
+        with self._lock:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is not None and hilo.is_alive():
+            self._cola.put(None)
+            if esperar:
+                hilo.join(limite)
+
+
+ejecutor = EjecutorBD()
+
+
+def entregar_en_tk(widget, futuro, al_terminar=None, al_fallar=None, actualizar_modelo=None):
+    """
+    Revisa el Future desde el hilo de Tk, que es el único que puede tocar widgets
+    (y el modelo en memoria), y al terminar llama a:
+      actualizar_modelo(resultado): cambios a plan_vida; se aplica siempre, aunque
+        el widget ya no exista, para que el modelo no se separe de la base.
+      al_terminar(resultado) o al_fallar(excepcion): la parte visual; sólo si el
+        widget sigue existiendo.
+    El sondeo se hace con after() de la ventana principal, que vive tanto como la aplicación.
+    """
+    raiz = widget.nametowidget(".")
+
+    def revisar():
+        if not raiz.winfo_exists():
+            return
+        if not futuro.done():
+            raiz.after(INTERVALO_SONDEO_MS, revisar)
+            return
+        error = futuro.exception()
+        if error is None and actualizar_modelo is not None:
+            actualizar_modelo(futuro.result())
+        # Si el widget se destruyó mientras esperábamos, el resultado ya no tiene dónde mostrarse
+        if not widget.winfo_exists():
+            return
+        if error is not None:
+            if al_fallar is not None:
+                al_fallar(error)
+            else:
+                print(f"Error en la base de datos: {error}")
+        elif al_terminar is not None:
+            al_terminar(futuro.result())
+    raiz.after(INTERVALO_SONDEO_MS, revisar)
+    return futuro
+
+
+def en_segundo_plano(widget, funcion, *args, al_terminar=None, al_fallar=None, actualizar_modelo=None, **kwargs):
+    """Atajo: envía la función al ejecutor y entrega el resultado a Tk."""
+    return entregar_en_tk(widget, ejecutor.enviar(funcion, *args, **kwargs), al_terminar, al_fallar,
+                          actualizar_modelo)
+
+
+# Cálculos pesados (simulaciones, reportes) en su propio hilo, para no retrasar la cola de la BD
+calculos = EjecutorBD("Calculos")
+
+
+def calcular_en_segundo_plano(widget, funcion, *args, al_terminar=None, al_fallar=None, **kwargs):
+    """Como en_segundo_plano, pero en el hilo de cálculos en vez del de la base de datos."""
+    return entregar_en_tk(widget, calculos.enviar(funcion, *args, **kwargs), al_terminar, al_fallar)
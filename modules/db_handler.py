@@ -2,83 +2,574 @@
 
 import sqlite3
 import os
+import threading
+import itertools
+import uuid
+from array import array
+from contextlib import contextmanager
 
-def init_db():
-    if not os.path.exists("data"):
-        os.makedirs("data")
-    conn = sqlite3.connect("data/plan_vida.db")
+DB_PATH = os.path.join("data", "plan_vida.db")
+
+# Tiempo máximo (segundos) que una conexión espera cuando otra instancia
+# de la aplicación tiene la base bloqueada, antes de lanzar "database is locked".
+BUSY_TIMEOUT = 10
+# Tamaño de la caché de páginas por conexión (valor negativo = KiB).
+CACHE_SIZE_KIB = 16000
+
+_local = threading.local()
+
+
+def _configurar_conexion(conn):
     cursor = conn.cursor()
+    # WAL permite lectores concurrentes mientras otra instancia escribe.
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Con WAL, NORMAL sólo sincroniza en los checkpoints y sigue siendo seguro
+    # ante caídas de la aplicación.
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}")
+    cursor.close()
+
+
+def obtener_conexion():
+    """
+    Devuelve la conexión del hilo actual, creándola la primera vez.
+    Cada hilo reutiliza su propia conexión durante toda la vida de la aplicación.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        directorio = os.path.dirname(DB_PATH)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio)
+        # isolation_level=None: las transacciones se abren explícitamente en transaccion()
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, isolation_level=None)
+        _configurar_conexion(conn)
+        _local.conn = conn
+        _local.profundidad = 0
+    return conn
+
+
+def cerrar_conexion():
+    """Cierra la conexión del hilo actual (por ejemplo, al salir de la aplicación)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.profundidad = 0
+
+
+@contextmanager
+def transaccion(escritura=True):
+    """
+    Abre una transacción sobre la conexión del hilo y entrega un cursor.
+    Hace COMMIT al salir sin errores y ROLLBACK si ocurre una excepción.
+    Las escrituras usan BEGIN IMMEDIATE para tomar el bloqueo al inicio y así
+    esperar (busy_timeout) en lugar de fallar a mitad de la transacción.
+    Las transacciones anidadas se integran en la transacción exterior.
+    """
+    conn = obtener_conexion()
+    cursor = conn.cursor()
+    if _local.profundidad > 0:
+        _local.profundidad += 1
+        try:
+            yield cursor
+        finally:
+            _local.profundidad -= 1
+            cursor.close()
+        return
+    cursor.execute("BEGIN IMMEDIATE" if escritura else "BEGIN")
+    _local.profundidad = 1
+    try:
+        yield cursor
+    except BaseException:
+        _local.profundidad = 0
+        conn.rollback()
+        cursor.close()
+        raise
+    _local.profundidad = 0
+    conn.commit()
+    cursor.close()
+
+
+def init_db():
+    with transaccion() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS gastos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                categoria TEXT,
+                monto REAL,
+                periodicidad TEXT,
+                fecha TEXT,
+                etapa TEXT,
+                origen TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ingresos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT,
+                monto REAL,
+                periodicidad TEXT,
+                fecha TEXT,
+                descripcion TEXT
+            )
+        ''')
+        # Índices para los reportes agregados
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_etapa_categoria ON gastos (etapa, categoria)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_gastos_fecha ON gastos (fecha)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ingresos_fecha ON ingresos (fecha)')
+        # Índices para la tabla del reporte filtrada por etapa y ordenada por monto
+        # o fecha (por categoría sirve idx_gastos_etapa_categoria). Cada índice
+        # encarece las inserciones, así que no hay uno por columna
+        for tabla, columnas in _INDICES_ORDEN:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{tabla}_{"_".join(columnas)} '
+                           f'ON {tabla} ({", ".join(columnas)})')
+        _crear_resumenes(cursor)
+        _crear_contadores(cursor)
+        _crear_identidad(cursor)
+
+
+# Tablas resumen mantenidas por triggers: cada fila acumula el total y la
+# cantidad de registros de un grupo, así los resúmenes cuestan O(grupos) y no
+# O(filas). Las claves nulas se guardan como '' para que el grupo sea único.
+_RESUMENES = {
+    "resumen_gastos": {
+        "origen": "gastos",
+        "claves": ("etapa", "categoria", "periodicidad"),
+    },
+    "resumen_ingresos": {
+        "origen": "ingresos",
+        "claves": ("tipo", "periodicidad"),
+    },
+}
+
+
+def _crear_resumenes(cursor):
+    for resumen, definicion in _RESUMENES.items():
+        tabla = definicion["origen"]
+        claves = definicion["claves"] + ("mes",)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (resumen,))
+        existia = cursor.fetchone() is not None
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {resumen} (
+                {", ".join(f"{c} TEXT NOT NULL" for c in claves)},
+                total REAL NOT NULL,
+                cantidad INTEGER NOT NULL,
+                PRIMARY KEY ({", ".join(claves)})
+            )
+        ''')
+
+        def valores(fila):
+            # Expresiones de las claves para la fila NEW u OLD del trigger
+            return [f"COALESCE({fila}.{c}, '')" for c in definicion["claves"]] + \
+                   [f"COALESCE(substr({fila}.fecha, 1, 7), '')"]
+
+        def sumar(fila):
+            return f'''
+                INSERT INTO {resumen} ({", ".join(claves)}, total, cantidad)
+                VALUES ({", ".join(valores(fila))}, COALESCE({fila}.monto, 0), 1)
+                ON CONFLICT ({", ".join(claves)}) DO UPDATE SET
+                    total = total + excluded.total,
+                    cantidad = cantidad + 1;
+            '''
+
+        def restar(fila):
+            condicion = " AND ".join(f"{c} = {v}" for c, v in zip(claves, valores(fila)))
+            return f'''
+                UPDATE {resumen}
+                SET total = total - COALESCE({fila}.monto, 0), cantidad = cantidad - 1
+                WHERE {condicion};
+                DELETE FROM {resumen} WHERE {condicion} AND cantidad <= 0;
+            '''
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_insert AFTER INSERT ON {tabla}
+            BEGIN {sumar("NEW")} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_delete AFTER DELETE ON {tabla}
+            BEGIN {restar("OLD")} END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_update AFTER UPDATE ON {tabla}
+            BEGIN {restar("OLD")} {sumar("NEW")} END
+        ''')
+        if not existia:
+            # Primera vez: llenamos el resumen con los registros que ya existían
+            cursor.execute(f'''
+                INSERT INTO {resumen} ({", ".join(claves)}, total, cantidad)
+                SELECT {", ".join(valores(tabla))}, SUM(COALESCE(monto, 0)), COUNT(*)
+                FROM {tabla}
+                GROUP BY {", ".join(valores(tabla))}
+            ''')
+
+# Contadores persistentes de cambios por tabla. PRAGMA data_version sólo sirve
+# para comparar dentro de una misma conexión, así que para saber entre una
+# ejecución y otra si los datos cambiaron usamos estos contadores (triggers).
+# Las inserciones se cuentan aparte: si sólo hubo inserciones, quien guardó un
+# estado previo puede ponerse al día leyendo las filas nuevas (id mayor).
+# También se lleva la cantidad de filas, para no tener que hacer COUNT(*).
+_TABLAS_CONTADAS = ("gastos", "ingresos")
+
+
+def _crear_contadores(cursor):
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS gastos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            categoria TEXT,
-            monto REAL,
-            periodicidad TEXT,
-            fecha TEXT,
-            etapa TEXT,
-            origen TEXT
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ingresos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            tipo TEXT,
-            monto REAL,
-            periodicidad TEXT,
-            fecha TEXT,
-            descripcion TEXT
+        CREATE TABLE IF NOT EXISTS contadores_cambios (
+            tabla TEXT PRIMARY KEY,
+            inserciones INTEGER NOT NULL DEFAULT 0,
+            modificaciones INTEGER NOT NULL DEFAULT 0,
+            filas INTEGER NOT NULL DEFAULT 0
         )
     ''')
-    conn.commit()
-    conn.close()
+    cursor.execute("SELECT tabla FROM contadores_cambios")
+    existentes = {tabla for tabla, in cursor.fetchall()}
+    for tabla in _TABLAS_CONTADAS:
+        if tabla not in existentes:
+            cursor.execute(f"INSERT INTO contadores_cambios (tabla, filas) SELECT ?, COUNT(*) FROM {tabla}", (tabla,))
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contar_insert AFTER INSERT ON {tabla}
+            BEGIN UPDATE contadores_cambios SET inserciones = inserciones + 1, filas = filas + 1
+                  WHERE tabla = '{tabla}'; END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contar_update AFTER UPDATE ON {tabla}
+            BEGIN UPDATE contadores_cambios SET modificaciones = modificaciones + 1 WHERE tabla = '{tabla}'; END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{tabla}_contar_delete AFTER DELETE ON {tabla}
+            BEGIN UPDATE contadores_cambios SET modificaciones = modificaciones + 1, filas = filas - 1
+                  WHERE tabla = '{tabla}'; END
+        ''')
+
+
+def _crear_identidad(cursor):
+    # Identificador al azar de esta base, fijado al crearla: distingue su estado
+    # guardado (snapshot, cachés) del de otro archivo con los mismos contadores
+    cursor.execute("CREATE TABLE IF NOT EXISTS identidad_base (id TEXT NOT NULL)")
+    cursor.execute("SELECT 1 FROM identidad_base")
+    if cursor.fetchone() is None:
+        cursor.execute("INSERT INTO identidad_base (id) VALUES (?)", (uuid.uuid4().hex,))
+
+
+def version_datos(tabla="gastos"):
+    """
+    Huella de los datos de la tabla: identificador de la base, contadores de
+    inserciones y modificaciones, número de filas y último id. Si no cambió, los
+    datos no cambiaron. Todo sale de tablas de una fila y del final de la clave primaria: O(1).
+    """
+    if tabla not in _TABLAS_CONTADAS:
+        raise ValueError(f"No se puede obtener la versión de '{tabla}'")
+    with transaccion(escritura=False) as cursor:
+        cursor.execute("SELECT inserciones, modificaciones, filas FROM contadores_cambios WHERE tabla = ?", (tabla,))
+        inserciones, modificaciones, filas = cursor.fetchone() or (0, 0, 0)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {tabla}")
+        ultimo_id, = cursor.fetchone()
+        cursor.execute("SELECT id FROM identidad_base")
+        base = (cursor.fetchone() or (None,))[0]
+    return {"base": base, "inserciones": inserciones, "modificaciones": modificaciones, "filas": filas,
+            "ultimo_id": ultimo_id}
+
 
 def insertar_gasto(categoria, monto, periodicidad, fecha, etapa, origen="general"):
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO gastos (categoria, monto, periodicidad, fecha, etapa, origen)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (categoria, monto, periodicidad, fecha, etapa, origen))
-    conn.commit()
-    conn.close()
+    with transaccion() as cursor:
+        cursor.execute('''
+            INSERT INTO gastos (categoria, monto, periodicidad, fecha, etapa, origen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (categoria, monto, periodicidad, fecha, etapa, origen))
+        return cursor.lastrowid
 
 def insertar_ingreso(tipo, monto, periodicidad, fecha, descripcion):
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO ingresos (tipo, monto, periodicidad, fecha, descripcion)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (tipo, monto, periodicidad, fecha, descripcion))
-    conn.commit()
-    conn.close()
+    with transaccion() as cursor:
+        cursor.execute('''
+            INSERT INTO ingresos (tipo, monto, periodicidad, fecha, descripcion)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (tipo, monto, periodicidad, fecha, descripcion))
+        return cursor.lastrowid
 
 def obtener_gastos():
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM gastos')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with transaccion(escritura=False) as cursor:
+        cursor.execute('SELECT * FROM gastos')
+        return cursor.fetchall()
 
 def obtener_ingresos():
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM ingresos')
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with transaccion(escritura=False) as cursor:
+        cursor.execute('SELECT * FROM ingresos')
+        return cursor.fetchall()
 
 def borrar_todos_los_datos():
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM gastos')
-    cursor.execute('DELETE FROM ingresos')
-    conn.commit()
-    conn.close()
+    with transaccion() as cursor:
+        cursor.execute('DELETE FROM gastos')
+        cursor.execute('DELETE FROM ingresos')
 
 def borrar_datos_por_id(record_id):
-    conn = sqlite3.connect("data/plan_vida.db")
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM gastos WHERE id = ?', (record_id,))
-    conn.commit()
-    conn.close()
+    with transaccion() as cursor:
+        cursor.execute('DELETE FROM gastos WHERE id = ?', (record_id,))
+
+
+# ---------------- Lectura paginada (keyset por id) ----------------
+TAMANO_PAGINA = 500
+
+_FILTRABLES = {
+    "gastos": ("categoria", "periodicidad", "etapa", "origen"),
+    "ingresos": ("tipo", "periodicidad"),
+}
+
+
+def _condiciones(tabla, fecha_desde, fecha_hasta, filtros, condiciones, parametros):
+    for col, valor in filtros.items():
+        if col not in _FILTRABLES[tabla]:
+            raise ValueError(f"No se puede filtrar {tabla} por '{col}'.")
+        if valor is not None:
+            condiciones.append(f"{col} = ?")
+            parametros.append(valor)
+    if fecha_desde is not None:
+        condiciones.append("fecha >= ?")
+        parametros.append(fecha_desde)
+    if fecha_hasta is not None:
+        condiciones.append("fecha <= ?")
+        parametros.append(fecha_hasta)
+    return condiciones, parametros
+
+def _pagina(tabla, despues_de_id, limite, fecha_desde, fecha_hasta, filtros):
+    condiciones, parametros = _condiciones(tabla, fecha_desde, fecha_hasta, filtros, ["id > ?"], [despues_de_id])
+    parametros.append(limite)
+    with transaccion(escritura=False) as cursor:
+        # "id > ultimo id visto" usa la clave primaria: cada página cuesta lo mismo
+        # sin importar qué tan adelante esté, a diferencia de OFFSET.
+        cursor.execute(f'''
+            SELECT * FROM {tabla}
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY id
+            LIMIT ?
+        ''', parametros)
+        return cursor.fetchall()
+
+def _paginas(tabla, tamano_pagina, despues_de_id, fecha_desde, fecha_hasta, filtros):
+    while True:
+        pagina = _pagina(tabla, despues_de_id, tamano_pagina, fecha_desde, fecha_hasta, filtros)
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamano_pagina:
+            return
+        despues_de_id = pagina[-1][0]
+
+# Columnas por las que la tabla del reporte puede ordenar; cada una tiene índice
+# (la clave primaria desempata, y SQLite la guarda en todo índice)
+_ORDENABLES = {
+    "gastos": ("id", "categoria", "monto", "periodicidad", "fecha", "etapa", "origen"),
+    "ingresos": ("id", "tipo", "monto", "periodicidad", "fecha", "descripcion"),
+}
+_INDICES_ORDEN = (("gastos", ("etapa", "monto")), ("gastos", ("etapa", "fecha")))
+# Máximo de parámetros por consulta "id IN (...)" (límite clásico de SQLite: 999)
+LOTE_IDS = 900
+
+
+def obtener_ids_ordenados(tabla, orden="id", descendente=False, fecha_desde=None, fecha_hasta=None, **filtros):
+    """
+    Ids de 'tabla' que cumplen los filtros, en el orden pedido, como array('q').
+    Sólo devuelve ids (no las filas), así que sirve para saber qué fila va en cada
+    posición de una tabla virtual de cientos de miles. Por id o por fecha, o
+    filtrando gastos por etapa y ordenando por categoría, monto o fecha, SQLite
+    recorre sólo un índice; en los demás casos ordena los ids en un árbol temporal.
+    """
+    if orden not in _ORDENABLES[tabla]:
+        raise ValueError(f"No se puede ordenar {tabla} por '{orden}'.")
+    condiciones, parametros = _condiciones(tabla, fecha_desde, fecha_hasta, filtros, [], [])
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    sentido = "DESC" if descendente else "ASC"
+    claves = f"id {sentido}" if orden == "id" else f"{orden} {sentido}, id {sentido}"
+    with transaccion(escritura=False) as cursor:
+        cursor.execute(f"SELECT id FROM {tabla} {donde} ORDER BY {claves}", parametros)
+        return array("q", (fila[0] for fila in cursor))
+
+def obtener_filas_por_id(tabla, ids):
+    """Filas completas de los ids dados, en el mismo orden (los ids borrados se omiten)."""
+    if tabla not in _ORDENABLES:
+        raise ValueError(f"Tabla desconocida '{tabla}'.")
+    ids = [int(i) for i in ids]
+    encontradas = {}
+    with transaccion(escritura=False) as cursor:
+        for inicio in range(0, len(ids), LOTE_IDS):
+            lote = ids[inicio:inicio + LOTE_IDS]
+            cursor.execute(f"SELECT * FROM {tabla} WHERE id IN ({','.join('?' * len(lote))})", lote)
+            encontradas.update((fila[0], fila) for fila in cursor)
+    return [encontradas[i] for i in ids if i in encontradas]
+
+def primera_fecha():
+    """Fecha ('YYYY-MM-DD') más antigua entre gastos e ingresos, o None. Usa los índices de fecha."""
+    with transaccion(escritura=False) as cursor:
+        cursor.execute('''
+            SELECT MIN(f) FROM (
+                SELECT MIN(fecha) AS f FROM gastos WHERE fecha >= '0'
+                UNION ALL
+                SELECT MIN(fecha) FROM ingresos WHERE fecha >= '0'
+            )
+        ''')
+        return cursor.fetchone()[0]
+
+def obtener_pagina_gastos(despues_de_id=0, limite=TAMANO_PAGINA, fecha_desde=None, fecha_hasta=None, **filtros):
+    """
+    Devuelve hasta 'limite' gastos con id mayor a 'despues_de_id', ordenados por id.
+    filtros opcionales: categoria, periodicidad, etapa, origen (igualdad) y rango de fecha.
+    Para la siguiente página se pasa el id de la última fila recibida.
+    """
+    return _pagina("gastos", despues_de_id, limite, fecha_desde, fecha_hasta, filtros)
+
+def obtener_pagina_ingresos(despues_de_id=0, limite=TAMANO_PAGINA, fecha_desde=None, fecha_hasta=None, **filtros):
+    """Igual que obtener_pagina_gastos, con filtros opcionales tipo y periodicidad."""
+    return _pagina("ingresos", despues_de_id, limite, fecha_desde, fecha_hasta, filtros)
+
+def paginas_gastos(tamano_pagina=TAMANO_PAGINA, despues_de_id=0, fecha_desde=None, fecha_hasta=None, **filtros):
+    """Generador de páginas (listas de filas) de gastos ordenadas por id."""
+    return _paginas("gastos", tamano_pagina, despues_de_id, fecha_desde, fecha_hasta, filtros)
+
+def paginas_ingresos(tamano_pagina=TAMANO_PAGINA, despues_de_id=0, fecha_desde=None, fecha_hasta=None, **filtros):
+    """Generador de páginas (listas de filas) de ingresos ordenadas por id."""
+    return _paginas("ingresos", tamano_pagina, despues_de_id, fecha_desde, fecha_hasta, filtros)
+
+def iterar_gastos(tamano_pagina=TAMANO_PAGINA, **filtros):
+    """Recorre los gastos fila por fila manteniendo en memoria sólo una página."""
+    for pagina in paginas_gastos(tamano_pagina, **filtros):
+        yield from pagina
+
+def iterar_ingresos(tamano_pagina=TAMANO_PAGINA, **filtros):
+    """Recorre los ingresos fila por fila manteniendo en memoria sólo una página."""
+    for pagina in paginas_ingresos(tamano_pagina, **filtros):
+        yield from pagina
+
+
+# ---------------- Consultas agregadas para reportes ----------------
+_AGRUPABLES = {
+    "gastos": ("categoria", "etapa", "origen", "periodicidad"),
+    "ingresos": ("tipo", "periodicidad"),
+}
+
+
+def _totales(tabla, columnas):
+    for col in columnas:
+        if col not in _AGRUPABLES[tabla]:
+            raise ValueError(f"No se puede agrupar {tabla} por '{col}'.")
+    campos = ", ".join(columnas)
+    # Si las columnas forman parte de la clave del resumen leemos de ahí
+    # (una fila por grupo); si no, agregamos sobre la tabla completa.
+    for resumen, definicion in _RESUMENES.items():
+        if definicion["origen"] == tabla and set(columnas) <= set(definicion["claves"]):
+            origen, columna_monto = resumen, "total"
+            break
+    else:
+        origen, columna_monto = tabla, "monto"
+    with transaccion(escritura=False) as cursor:
+        cursor.execute(f'''
+            SELECT {campos}, SUM({columna_monto})
+            FROM {origen}
+            GROUP BY {campos}
+            ORDER BY {campos}
+        ''')
+        return cursor.fetchall()
+
+def totales_gastos_por_etapa():
+    """Lista de (etapa, total)."""
+    return _totales("gastos", ("etapa",))
+
+def totales_gastos_por_categoria():
+    """Lista de (categoria, total)."""
+    return _totales("gastos", ("categoria",))
+
+def totales_gastos_por_etapa_categoria():
+    """Lista de (etapa, categoria, total)."""
+    return _totales("gastos", ("etapa", "categoria"))
+
+def totales_gastos_por_origen():
+    """Lista de (origen, total)."""
+    return _totales("gastos", ("origen",))
+
+def _totales_por_mes(tabla):
+    resumen = f"resumen_{tabla}"
+    with transaccion(escritura=False) as cursor:
+        cursor.execute(f'''
+            SELECT mes, SUM(total)
+            FROM {resumen}
+            GROUP BY mes
+            ORDER BY mes
+        ''')
+        return cursor.fetchall()
+
+def totales_gastos_por_mes():
+    """Lista de ('YYYY-MM', total) de gastos."""
+    return _totales_por_mes("gastos")
+
+def totales_ingresos_por_mes():
+    """Lista de ('YYYY-MM', total) de ingresos."""
+    return _totales_por_mes("ingresos")
+
+def totales_gastos_por_etapa_periodicidad():
+    """Lista de (etapa, periodicidad, total); base para los totales por etapa del plan."""
+    return _totales("gastos", ("etapa", "periodicidad"))
+
+def obtener_resumen_gastos():
+    """Filas completas del resumen: (etapa, categoria, periodicidad, mes, total, cantidad)."""
+    with transaccion(escritura=False) as cursor:
+        cursor.execute('SELECT * FROM resumen_gastos ORDER BY etapa, categoria, periodicidad, mes')
+        return cursor.fetchall()
+
+def obtener_resumen_ingresos():
+    """Filas completas del resumen: (tipo, periodicidad, mes, total, cantidad)."""
+    with transaccion(escritura=False) as cursor:
+        cursor.execute('SELECT * FROM resumen_ingresos ORDER BY tipo, periodicidad, mes')
+        return cursor.fetchall()
+
+
+COLUMNAS_GASTOS = ("categoria", "monto", "periodicidad", "fecha", "etapa", "origen")
+COLUMNAS_INGRESOS = ("tipo", "monto", "periodicidad", "fecha", "descripcion")
+TAMANO_LOTE = 1000
+
+
+def _normalizar_fila(fila, columnas, defaults):
+    # Acepta tuplas/listas en el orden de las columnas o diccionarios por nombre
+    if isinstance(fila, dict):
+        return tuple(fila.get(col, defaults.get(col)) for col in columnas)
+    fila = tuple(fila)
+    if len(fila) < len(columnas):
+        fila = fila + tuple(defaults.get(col) for col in columnas[len(fila):])
+    return fila[:len(columnas)]
+
+
+def _insertar_lote(tabla, columnas, defaults, filas, tamano_lote):
+    sql = (f"INSERT INTO {tabla} ({', '.join(columnas)}) "
+           f"VALUES ({', '.join('?' for _ in columnas)})")
+    ids = []
+    iterador = iter(filas)
+    with transaccion() as cursor:
+        while True:
+            lote = list(itertools.islice(iterador, tamano_lote))
+            if not lote:
+                break
+            cursor.executemany(sql, [_normalizar_fila(f, columnas, defaults) for f in lote])
+            # Dentro de una transacción BEGIN IMMEDIATE nadie más puede insertar,
+            # así que los ids AUTOINCREMENT del lote son consecutivos.
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (tabla,))
+            ultimo = cursor.fetchone()[0]
+            ids.extend(range(ultimo - len(lote) + 1, ultimo + 1))
+    return ids
+
+
+def insertar_gastos_lote(filas, tamano_lote=TAMANO_LOTE):
+    """
+    Inserta muchos gastos en una sola transacción.
+    filas: cualquier iterable de tuplas (categoria, monto, periodicidad, fecha, etapa[, origen])
+           o de diccionarios con esas claves.
+    Devuelve la lista de ids insertados, en el mismo orden que las filas.
+    """
+    return _insertar_lote("gastos", COLUMNAS_GASTOS, {"origen": "general"}, filas, tamano_lote)
+
+
+def insertar_ingresos_lote(filas, tamano_lote=TAMANO_LOTE):
+    """
+    Inserta muchos ingresos en una sola transacción.
+    filas: cualquier iterable de tuplas (tipo, monto, periodicidad, fecha[, descripcion])
+           o de diccionarios con esas claves.
+    Devuelve la lista de ids insertados, en el mismo orden que las filas.
+    """
+    return _insertar_lote("ingresos", COLUMNAS_INGRESOS, {"descripcion": ""}, filas, tamano_lote)
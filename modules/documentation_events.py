@@ -1,7 +1,21 @@
 # modules/documentation_events.py
 
-class EventExpense:
+from modules.expense_base import GastoBase
+
+
+class EventExpense(GastoBase):
+    __slots__ = ("evento", "fecha")
+
     def __init__(self, evento, costo, fecha):
+        super().__init__(costo, "único")
         self.evento = evento
-        self.costo = costo
         self.fecha = fecha
+
+    @property
+    def costo(self):
+        # El costo es el monto por periodo de GastoBase
+        return self.monto
+
+    @costo.setter
+    def costo(self, valor):
+        self.monto = valor
@@ -0,0 +1,106 @@
+# modules/excel_export.py
+
+import datetime
+import itertools
+
+from modules import db_handler
+from modules.importador import COLUMNAS_EXPORTADAS
+
+RUTA_EXCEL = "reporte_plan_vida.xlsx"
+# Filas que se leen de SQLite por cada página; es lo único que se tiene en memoria
+PAGINA_EXCEL = 2000
+
+# Los encabezados son los nombres de las columnas de la base: así importador.py
+# puede volver a leer la hoja Gastos de este mismo archivo
+TITULOS_GASTOS = tuple(COLUMNAS_EXPORTADAS)
+TITULOS_INGRESOS = ("id",) + db_handler.COLUMNAS_INGRESOS
+ANCHOS_GASTOS = (8, 30, 14, 13, 12, 16, 14)
+ANCHOS_INGRESOS = (8, 20, 14, 13, 12, 40)
+
+
+def _hoja_registros(libro, nombre, titulos, anchos, paginas, formatos):
+    """Escribe una hoja con encabezado y las filas de cada página según llegan; devuelve cuántas filas escribió."""
+    hoja = libro.add_worksheet(nombre)
+    for columna, ancho in enumerate(anchos):
+        # La columna de montos (posición 2 en ambas tablas) lleva formato de moneda
+        hoja.set_column(columna, columna, ancho, formatos["moneda"] if columna == 2 else None)
+    hoja.write_row(0, 0, titulos, formatos["encabezado"])
+    hoja.freeze_panes(1, 0)
+    fila = 0
+    for pagina in paginas:
+        for registro in pagina:
+            fila += 1
+            hoja.write_row(fila, 0, registro)
+    hoja.autofilter(0, 0, max(fila, 1), len(titulos) - 1)
+    return fila
+
+
+def _hoja_resumen(libro, resumen_etapas, formatos):
+    hoja = libro.add_worksheet("Resumen por Etapa")
+    hoja.set_column(0, 0, 18)
+    hoja.set_column(1, 1, 8)
+    hoja.set_column(2, 3, 22, formatos["moneda"])
+    hoja.write_row(0, 0, ("Etapa", "Meses", "Total (pesos de hoy)", "Total nominal (con inflación)"),
+                   formatos["encabezado"])
+    total_real, total_nominal = 0.0, 0.0
+    for fila, (etapa, meses, real, nominal) in enumerate(resumen_etapas, start=1):
+        hoja.write_row(fila, 0, (etapa, meses, real, nominal))
+        total_real += real
+        total_nominal = None if nominal is None or total_nominal is None else total_nominal + nominal
+    hoja.write_row(len(resumen_etapas) + 1, 0, ("Total", None, total_real, total_nominal), formatos["total"])
+
+
+def _hoja_flujo(libro, cronograma, formatos):
+    hoja = libro.add_worksheet("Flujo Mensual")
+    hoja.set_column(0, 1, 10)
+    hoja.set_column(2, len(cronograma.columns) - 1, 18, formatos["moneda"])
+    hoja.write_row(0, 0, list(cronograma.columns), formatos["encabezado"])
+    hoja.freeze_panes(1, 0)
+    for fila, valores in enumerate(cronograma.itertuples(index=False), start=1):
+        hoja.write_row(fila, 0, valores)
+
+
+def exportar_libro_excel(ruta=RUTA_EXCEL, resumen_etapas=(), meses=60, creditos=(), tamano_pagina=PAGINA_EXCEL):
+    """
+    Escribe el libro con las hojas Gastos, Ingresos, Resumen por Etapa y Flujo Mensual.
+    Gastos es la primera hoja y la activa, que es la que lee importador.py.
+    Las filas se leen de SQLite por páginas y XlsxWriter en modo constant_memory
+    las manda a disco fila por fila, así que la memoria no crece con la cantidad
+    de registros. Todo se lee en una misma transacción, para que las hojas
+    correspondan al mismo estado de la base. Pensado para correr fuera del hilo de Tk.
+    resumen_etapas: filas (etapa, meses, total real, total nominal o None).
+    creditos: filas extra con forma de gasto que se suman al flujo mensual.
+    Devuelve {"gastos": filas escritas, "ingresos": filas escritas}.
+    """
+    # xlsxwriter y pandas (time_management) se cargan al exportar, no al arrancar la aplicación
+    import xlsxwriter
+    from modules.time_management import proyectar_flujo_por_paginas, mes_absoluto
+    libro = xlsxwriter.Workbook(ruta, {"constant_memory": True})
+    formatos = {
+        "encabezado": libro.add_format({"bold": True, "bg_color": "#FEC736", "border": 1}),
+        "moneda": libro.add_format({"num_format": "#,##0.00"}),
+        "total": libro.add_format({"bold": True, "num_format": "#,##0.00", "top": 1}),
+    }
+    try:
+        with db_handler.transaccion(escritura=False):
+            escritas = {
+                # Primera hoja, y por lo tanto la activa al abrir el libro
+                "gastos": _hoja_registros(libro, "Gastos", TITULOS_GASTOS, ANCHOS_GASTOS,
+                                          db_handler.paginas_gastos(tamano_pagina), formatos),
+                "ingresos": _hoja_registros(libro, "Ingresos", TITULOS_INGRESOS, ANCHOS_INGRESOS,
+                                            db_handler.paginas_ingresos(tamano_pagina), formatos),
+            }
+            _hoja_resumen(libro, list(resumen_etapas), formatos)
+            # El flujo empieza en el registro más antiguo, como en la pestaña del cronograma
+            inicio = db_handler.primera_fecha()
+            if inicio is None or mes_absoluto(inicio) < 0:
+                inicio = datetime.date.today().isoformat()
+            paginas = db_handler.paginas_gastos(tamano_pagina)
+            if creditos:
+                paginas = itertools.chain(paginas, [list(creditos)])
+            cronograma = proyectar_flujo_por_paginas(paginas, db_handler.paginas_ingresos(tamano_pagina),
+                                                     inicio, meses)
+            _hoja_flujo(libro, cronograma, formatos)
+    finally:
+        libro.close()
+    return escritas
@@ -0,0 +1,86 @@
+# modules/expense_base.py
+
+from enum import IntEnum
+
+
+class Periodicidad(IntEnum):
+    UNICO = 0
+    MENSUAL = 1
+    ANUAL = 2
+    OTRA = 3  # Cualquier texto no reconocido; su total es 0
+
+    @classmethod
+    def desde_texto(cls, texto):
+        return _POR_TEXTO.get(texto, cls.OTRA)
+
+    @property
+    def texto(self):
+        return _TEXTOS.get(self)
+
+
+_TEXTOS = {Periodicidad.UNICO: "único", Periodicidad.MENSUAL: "mensual", Periodicidad.ANUAL: "anual"}
+_POR_TEXTO = {texto: codigo for codigo, texto in _TEXTOS.items()}
+
+_CODIGOS = {texto: int(codigo) for texto, codigo in _POR_TEXTO.items()}
+_UNICO, _MENSUAL, _ANUAL, _OTRA = (int(p) for p in Periodicidad)
+
+
+def codigo_periodicidad(periodicidad):
+    """Código entero (Periodicidad) de un texto de periodicidad; OTRA si no se reconoce."""
+    return _CODIGOS.get(periodicidad, _OTRA)
+
+
+def factor_periodicidad(codigo, periodos):
+    """
+    Única regla de la aplicación: cuántas veces se paga un monto con esa
+    periodicidad en 'periodos' meses (único -> 1, mensual -> periodos,
+    anual -> periodos / 12, otra -> 0). 'periodos' puede ser un arreglo de NumPy.
+    """
+    if codigo == _MENSUAL:
+        return periodos
+    if codigo == _UNICO:
+        return 1
+    if codigo == _ANUAL:
+        return periodos / 12
+    return 0
+
+
+def total_periodico(monto, periodicidad, periodos):
+    """
+    Total de un monto a lo largo de 'periodos' meses.
+    periodicidad puede ser el texto ('único', 'mensual', 'anual') o un Periodicidad.
+    """
+    codigo = int(periodicidad) if isinstance(periodicidad, Periodicidad) else codigo_periodicidad(periodicidad)
+    return monto * factor_periodicidad(codigo, periodos)
+
+
+class GastoBase:
+    """
+    Base compacta (con __slots__) para los gastos e ingresos de la aplicación:
+    el monto por periodo y la periodicidad (como texto y como código). El total
+    sale de factor_periodicidad. Las subclases que guardan el importe con otro
+    nombre (costo) o calculado (costo * frecuencia) mantienen 'monto' al día.
+    """
+    __slots__ = ("monto", "_periodicidad", "_codigo")
+
+    def __init__(self, monto, periodicidad="único"):
+        self.monto = monto
+        # Sin pasar por la propiedad: se crean muchos objetos
+        self._periodicidad = periodicidad
+        self._codigo = _CODIGOS.get(periodicidad, _OTRA)
+
+    @property
+    def periodicidad(self):
+        return self._periodicidad
+
+    @periodicidad.setter
+    def periodicidad(self, valor):
+        self._periodicidad = valor
+        self._codigo = _CODIGOS.get(valor, _OTRA)
+
+    @property
+    def codigo_periodicidad(self):
+        return Periodicidad(self._codigo)
+
+    def total(self, periodos):
+        return self.monto * factor_periodicidad(self._codigo, periodos)
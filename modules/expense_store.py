@@ -0,0 +1,316 @@
+# modules/expense_store.py
+
+import datetime
+
+import numpy as np
+
+from modules.expense_base import Periodicidad, codigo_periodicidad, factor_periodicidad
+
+# Códigos enteros para la periodicidad de cada gasto (los de Periodicidad)
+UNICO, MENSUAL, ANUAL, OTRA = (int(p) for p in Periodicidad)
+FECHA_DESCONOCIDA = -1
+
+
+def codificar_periodicidad(periodicidad):
+    return codigo_periodicidad(periodicidad)
+
+
+def fecha_a_ordinal(fecha):
+    """Convierte 'YYYY-MM-DD' (o date/datetime) a ordinal; FECHA_DESCONOCIDA si no se puede."""
+    if isinstance(fecha, datetime.datetime):
+        return fecha.date().toordinal()
+    if isinstance(fecha, datetime.date):
+        return fecha.toordinal()
+    try:
+        return datetime.date.fromisoformat(str(fecha)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return FECHA_DESCONOCIDA
+
+
+def factores_periodicidad(duraciones):
+    """
+    Matriz (etapas x códigos) con el multiplicador de cada periodicidad para la
+    duración de cada etapa, con la misma regla (factor_periodicidad) que los objetos de gasto.
+    """
+    duraciones = np.asarray(duraciones, dtype=np.float64)
+    factores = np.zeros((duraciones.size, OTRA + 1), dtype=np.float64)
+    for codigo in Periodicidad:
+        factores[:, codigo] = factor_periodicidad(codigo, duraciones)
+    return factores
+
+
+_COLUMNAS = ("id", "monto", "periodicidad", "etapa", "fecha", "categoria")
+SIN_ID = -1
+# Las mismas columnas como un solo registro binario (para guardar y mapear el estado)
+DTYPE_REGISTRO = np.dtype([("id", np.int64), ("monto", np.float64), ("periodicidad", np.int8),
+                           ("etapa", np.int32), ("fecha", np.int32), ("categoria", np.int32)])
+
+
+class AlmacenGastos:
+    """
+    Guarda los gastos en columnas de NumPy paralelas (id, monto, periodicidad,
+    etapa, fecha y categoría) en lugar de un objeto por gasto. Además mantiene
+    la suma de montos por (etapa, periodicidad), que se actualiza en O(1) al
+    agregar o quitar un gasto, así los totales no recorren las filas.
+    """
+    def __init__(self, capacidad=64):
+        self.n = 0
+        self.id = np.full(capacidad, SIN_ID, dtype=np.int64)  # id en la base, SIN_ID si no se conoce
+        self.monto = np.zeros(capacidad, dtype=np.float64)
+        self.periodicidad = np.zeros(capacidad, dtype=np.int8)
+        self.etapa = np.zeros(capacidad, dtype=np.int32)
+        self.fecha = np.zeros(capacidad, dtype=np.int32)
+        self.categoria = np.zeros(capacidad, dtype=np.int32)
+        self.categorias = []  # código -> texto de la categoría
+        self._codigos_categoria = {}
+        self._posiciones = {}  # id en la base -> posición; None = aún no construido (ver posiciones)
+        # Textos originales que no caben en los códigos (periodicidad o fecha no reconocidas)
+        self._periodicidad_texto = {}
+        self._fecha_texto = {}
+        # Sumas acumuladas: fila = etapa, columna = código de periodicidad
+        self.sumas = np.zeros((8, OTRA + 1), dtype=np.float64)
+        # Cambia con cada modificación; sirve para invalidar totales en caché
+        self.version = 0
+        # Por etapa, el valor de 'version' en su último cambio (caché de una sola etapa)
+        self.versiones = np.zeros(8, dtype=np.int64)
+
+    def __len__(self):
+        return self.n
+
+    def _asegurar_capacidad(self, minimo):
+        capacidad = self.monto.size
+        if minimo <= capacidad:
+            return
+        while capacidad < minimo:
+            capacidad = max(capacidad * 2, 64)
+        for nombre in _COLUMNAS:
+            viejo = getattr(self, nombre)
+            relleno = SIN_ID if nombre == "id" else 0
+            nuevo = np.full(capacidad, relleno, dtype=viejo.dtype)
+            nuevo[:self.n] = viejo[:self.n]
+            setattr(self, nombre, nuevo)
+
+    def _asegurar_etapa(self, etapa):
+        filas = self.sumas.shape[0]
+        if etapa < filas:
+            return
+        while filas <= etapa:
+            filas *= 2
+        sumas = np.zeros((filas, OTRA + 1), dtype=np.float64)
+        sumas[:self.sumas.shape[0]] = self.sumas
+        self.sumas = sumas
+        versiones = np.zeros(filas, dtype=np.int64)
+        versiones[:self.versiones.size] = self.versiones
+        self.versiones = versiones
+
+    def codigo_categoria(self, categoria):
+        codigo = self._codigos_categoria.get(categoria)
+        if codigo is None:
+            codigo = len(self.categorias)
+            self.categorias.append(categoria)
+            self._codigos_categoria[categoria] = codigo
+        return codigo
+
+    def agregar(self, categoria, monto, periodicidad, fecha, etapa, gasto_id=None):
+        """Agrega un gasto de la etapa con índice 'etapa' y devuelve su posición."""
+        self._asegurar_capacidad(self.n + 1)
+        self._asegurar_etapa(etapa)
+        i = self.n
+        codigo = codificar_periodicidad(periodicidad)
+        ordinal = fecha_a_ordinal(fecha)
+        self.id[i] = SIN_ID if gasto_id is None else gasto_id
+        self.monto[i] = monto
+        self.periodicidad[i] = codigo
+        self.etapa[i] = etapa
+        self.fecha[i] = ordinal
+        self.categoria[i] = self.codigo_categoria(categoria)
+        if codigo == OTRA:
+            self._periodicidad_texto[i] = periodicidad
+        if ordinal == FECHA_DESCONOCIDA:
+            self._fecha_texto[i] = fecha
+        if gasto_id is not None and self._posiciones is not None:
+            self._posiciones[gasto_id] = i
+        self.sumas[etapa, codigo] += monto
+        self.n += 1
+        self.version += 1
+        self.versiones[etapa] = self.version
+        return i
+
+    def agregar_lote(self, montos, periodicidades, etapas, fechas=None, categorias=None, ids=None):
+        """
+        Agrega muchos gastos ya codificados de una vez.
+        periodicidades: códigos UNICO/MENSUAL/ANUAL; fechas: ordinales; categorias: códigos.
+        """
+        montos = np.asarray(montos, dtype=np.float64)
+        periodicidades = np.asarray(periodicidades, dtype=np.int8)
+        etapas = np.asarray(etapas, dtype=np.int32)
+        cantidad = montos.size
+        if cantidad == 0:
+            return
+        self._asegurar_capacidad(self.n + cantidad)
+        self._asegurar_etapa(int(etapas.max()))
+        inicio, fin = self.n, self.n + cantidad
+        self.id[inicio:fin] = SIN_ID if ids is None else ids
+        self.monto[inicio:fin] = montos
+        self.periodicidad[inicio:fin] = periodicidades
+        self.etapa[inicio:fin] = etapas
+        self.fecha[inicio:fin] = FECHA_DESCONOCIDA if fechas is None else fechas
+        self.categoria[inicio:fin] = 0 if categorias is None else categorias
+        if categorias is None and not self.categorias:
+            self.codigo_categoria("")
+        if ids is not None and self._posiciones is not None:
+            self._posiciones.update(zip(np.asarray(ids).tolist(), range(inicio, fin)))
+        np.add.at(self.sumas, (etapas, periodicidades), montos)
+        self.n = fin
+        self.version += 1
+        self.versiones[np.unique(etapas)] = self.version
+
+    @property
+    def posiciones(self):
+        """Diccionario id -> posición; tras restaurar un estado se arma la primera vez que se usa."""
+        if self._posiciones is None:
+            ids = self.id[:self.n]
+            conocidos = np.flatnonzero(ids != SIN_ID)
+            self._posiciones = dict(zip(ids[conocidos].tolist(), conocidos.tolist()))
+        return self._posiciones
+
+    def etapa_de(self, gasto_id):
+        """Índice de etapa del gasto con ese id de la base, o None si no está."""
+        i = self.posiciones.get(gasto_id)
+        return None if i is None else int(self.etapa[i])
+
+    def quitar(self, gasto_id):
+        """
+        Quita el gasto con ese id de la base. Devuelve la etapa a la que pertenecía
+        o None si no estaba. El último gasto pasa a ocupar su lugar (O(1)).
+        """
+        i = self.posiciones.get(gasto_id)
+        if i is None:
+            return None
+        return self.quitar_posicion(i)
+
+    def quitar_posicion(self, i):
+        """Como quitar, pero por posición en las columnas (sirve también para gastos sin id)."""
+        gasto_id = int(self.id[i])
+        if gasto_id != SIN_ID and self._posiciones is not None:
+            self._posiciones.pop(gasto_id, None)
+        etapa = int(self.etapa[i])
+        self.sumas[etapa, self.periodicidad[i]] -= self.monto[i]
+        ultimo = self.n - 1
+        self._periodicidad_texto.pop(i, None)
+        self._fecha_texto.pop(i, None)
+        if i != ultimo:
+            for nombre in _COLUMNAS:
+                columna = getattr(self, nombre)
+                columna[i] = columna[ultimo]
+            for textos in (self._periodicidad_texto, self._fecha_texto):
+                if ultimo in textos:
+                    textos[i] = textos.pop(ultimo)
+            id_movido = int(self.id[i])
+            if id_movido != SIN_ID:
+                self.posiciones[id_movido] = i
+        self.n = ultimo
+        self.version += 1
+        self.versiones[etapa] = self.version
+        return etapa
+
+    def vaciar(self):
+        self.n = 0
+        self._posiciones = {}
+        self._periodicidad_texto.clear()
+        self._fecha_texto.clear()
+        self.sumas[:] = 0
+        self.version += 1
+        self.versiones[:] = self.version
+
+    def version_etapa(self, etapa):
+        """Versión de los gastos de una etapa: sólo cambia cuando cambia esa etapa."""
+        return int(self.versiones[etapa]) if etapa < self.versiones.size else 0
+
+    def sumas_etapa(self, etapa):
+        """Suma de montos de la etapa por código de periodicidad."""
+        if etapa >= self.sumas.shape[0]:
+            return np.zeros(OTRA + 1)
+        return self.sumas[etapa]
+
+    def totales_por_etapa(self, duraciones, factores=None):
+        """
+        Total de cada etapa (arreglo alineado con 'duraciones') a partir de las sumas acumuladas.
+        factores: matriz (etapas x códigos) alternativa, por ejemplo la de inflación.
+        """
+        num_etapas = len(duraciones)
+        if num_etapas == 0:
+            return np.zeros(0)
+        self._asegurar_etapa(num_etapas - 1)
+        if factores is None:
+            factores = factores_periodicidad(duraciones)
+        return (self.sumas[:num_etapas] * factores).sum(axis=1)
+
+    def total_etapa(self, etapa, duracion):
+        return float(self.sumas_etapa(etapa) @ factores_periodicidad([duracion])[0])
+
+    def recalcular_sumas(self):
+        """Reconstruye las sumas acumuladas desde las columnas (corrige el redondeo acumulado)."""
+        self.sumas[:] = 0
+        n = self.n
+        np.add.at(self.sumas, (self.etapa[:n], self.periodicidad[:n]), self.monto[:n])
+        self.version += 1
+        self.versiones[:] = self.version
+
+    def posiciones_etapa(self, etapa):
+        """Posiciones de los gastos de una etapa, en el orden en que los recorre filas()."""
+        return np.flatnonzero(self.etapa[:self.n] == etapa)
+
+    def filas(self, etapa):
+        """Recorre los gastos de una etapa como tuplas (categoria, monto, periodicidad, fecha, id)."""
+        for i in self.posiciones_etapa(etapa):
+            yield self.fila(int(i))
+
+    def fila(self, i):
+        """Gasto en la posición i como tupla (categoria, monto, periodicidad, fecha, id)."""
+        codigo = int(self.periodicidad[i])
+        periodicidad = Periodicidad(codigo).texto if codigo != OTRA else self._periodicidad_texto.get(i)
+        ordinal = int(self.fecha[i])
+        if ordinal == FECHA_DESCONOCIDA:
+            fecha = self._fecha_texto.get(i)
+        else:
+            fecha = datetime.date.fromordinal(ordinal).isoformat()
+        gasto_id = int(self.id[i])
+        return (self.categorias[int(self.categoria[i])], float(self.monto[i]), periodicidad, fecha,
+                None if gasto_id == SIN_ID else gasto_id)
+
+    def exportar(self):
+        """
+        Estado del almacén como (registro, meta): un arreglo estructurado con las
+        columnas y un diccionario serializable en JSON con lo demás.
+        """
+        registro = np.empty(self.n, dtype=DTYPE_REGISTRO)
+        for nombre in _COLUMNAS:
+            registro[nombre] = getattr(self, nombre)[:self.n]
+        meta = {
+            "categorias": list(self.categorias),
+            "periodicidad_texto": [[i, t] for i, t in self._periodicidad_texto.items()],
+            "fecha_texto": [[i, t] for i, t in self._fecha_texto.items()],
+            "sumas": self.sumas.tolist(),
+        }
+        return registro, meta
+
+    def restaurar(self, registro, meta):
+        """
+        Reemplaza el contenido con un estado de exportar(). Las columnas pasan a
+        ser vistas del registro (que puede venir mapeado en memoria, en modo
+        copia-en-escritura), así no se copian hasta que el almacén crezca.
+        """
+        for nombre in _COLUMNAS:
+            setattr(self, nombre, registro[nombre])
+        self.n = registro.size
+        self.categorias = list(meta["categorias"])
+        self._codigos_categoria = {c: i for i, c in enumerate(self.categorias)}
+        self._periodicidad_texto = {int(i): t for i, t in meta["periodicidad_texto"]}
+        self._fecha_texto = {int(i): t for i, t in meta["fecha_texto"]}
+        self.sumas = np.array(meta["sumas"], dtype=np.float64).reshape(-1, OTRA + 1)
+        if self.sumas.shape[0] == 0:
+            self.sumas = np.zeros((8, OTRA + 1), dtype=np.float64)
+        self._posiciones = None
+        self.version += 1
+        self.versiones = np.full(self.sumas.shape[0], self.version, dtype=np.int64)
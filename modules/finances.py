@@ -1,17 +1,372 @@
 # modules/finances.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Monte Carlo: caminos por bloque y a partir de cuántos caminos se reparte en procesos
+TAMANO_BLOQUE = 5000
+UMBRAL_PROCESOS = 40000
+PERCENTILES = (5, 50, 95)
+# Hasta cuántos valores (caminos x meses) se guardan todos para percentiles exactos
+# (25 millones = 200 MB); por encima se usan histogramas por mes de BINS_HISTOGRAMA clases
+LIMITE_VALORES_EXACTOS = 25_000_000
+BINS_HISTOGRAMA = 4096
+# Barrido de escenarios: combinaciones por bloque y a partir de cuántas se usa el pool de procesos
+BLOQUE_BARRIDO = 250000
+UMBRAL_BARRIDO = 2000000
+COLUMNAS_BARRIDO = ("Inicial", "Aporte Mensual", "Tasa", "Plazo")
+
+
+def tasa_mensual(rate):
+    """Tasa mensual equivalente a una tasa anual efectiva (acepta escalares o arreglos)."""
+    return np.power(1 + np.asarray(rate, dtype=np.float64), 1 / 12) - 1
+
+
+def valor_final(initial, monthly, rate, term):
+    """
+    Valor de la inversión al final de 'term' meses en forma cerrada (anualidad):
+        VF = inicial * (1 + r)^n + aporte * ((1 + r)^n - 1) / r
+    con r la tasa mensual equivalente. Todos los parámetros pueden ser arreglos
+    y se combinan por broadcasting, así se evalúan muchos escenarios de una vez.
+    """
+    initial = np.asarray(initial, dtype=np.float64)
+    monthly = np.asarray(monthly, dtype=np.float64)
+    term = np.asarray(term, dtype=np.float64)
+    r = tasa_mensual(rate)
+    crecimiento = np.power(1 + r, term)
+    # Con tasa 0 el factor de la anualidad es simplemente el número de meses
+    factor = np.divide(crecimiento - 1, r, out=np.array(term * np.ones_like(r)), where=r != 0)
+    return initial * crecimiento + monthly * factor
+
+
+def trayectoria_inversion(initial, monthly, rate, term, curva_tasas=None, aportes=None):
+    """
+    Valor acumulado al final de cada mes (equivale a repetir
+    total = total * (1 + r) + aporte durante 'term' meses).
+    initial, monthly y rate pueden ser arreglos de escenarios (forma S).
+    curva_tasas: tasas anuales mes a mes, forma (..., term); reemplaza a 'rate'.
+    aportes: aportes mes a mes, forma (..., term); reemplaza a 'monthly'.
+    Devuelve un arreglo de forma S + (term,).
+    """
+    term = int(term)
+    if curva_tasas is None:
+        tasas = np.expand_dims(tasa_mensual(rate), -1) * np.ones(term)
+    else:
+        tasas = tasa_mensual(curva_tasas)
+    if aportes is None:
+        aportes = np.expand_dims(np.asarray(monthly, dtype=np.float64), -1) * np.ones(term)
+    else:
+        aportes = np.asarray(aportes, dtype=np.float64)
+    return _acumular(initial, aportes, tasas)
+
+
+def _acumular(initial, aportes, tasas):
+    """Trayectoria con tasas mensuales 'tasas' y aportes mes a mes (último eje = tiempo)."""
+    inicial = np.expand_dims(np.asarray(initial, dtype=np.float64), -1)
+    # V_t = G_t * (inicial + sum_{s<=t} aporte_s / G_s), con G_t = prod_{s<=t} (1 + r_s)
+    crecimiento = np.cumprod(1 + tasas, axis=-1)
+    return crecimiento * (inicial + np.cumsum(aportes / crecimiento, axis=-1))
+
+
+def aporte_necesario(target, initial, rate, term, curva_tasas=None):
+    """
+    Aporte mensual necesario para llegar a 'target' al final de 'term' meses.
+    Usa la inversa de la anualidad: aporte = (meta - inicial * (1 + r)^n) / factor.
+    Con curva_tasas (tasas anuales mes a mes, forma (..., term)) el valor sigue
+    siendo lineal en el aporte, así que también hay solución cerrada.
+    Acepta arreglos (muchas familias o escenarios a la vez). Si la inversión
+    inicial ya alcanza la meta, el aporte es 0.
+    """
+    target = np.asarray(target, dtype=np.float64)
+    initial = np.asarray(initial, dtype=np.float64)
+    if curva_tasas is None:
+        crecimiento = np.power(1 + tasa_mensual(rate), np.asarray(term, dtype=np.float64))
+        factor = valor_final(0, 1, rate, term)
+    else:
+        acumulado = np.cumprod(1 + tasa_mensual(curva_tasas), axis=-1)
+        crecimiento = acumulado[..., -1]
+        factor = crecimiento * np.sum(1 / acumulado, axis=-1)
+    aporte = np.maximum((target - initial * crecimiento) / factor, 0)
+    return float(aporte) if aporte.ndim == 0 else aporte
+
+
+def resolver_intervalo(funcion, objetivo, bajo, alto, tolerancia=1e-10, max_iter=200):
+    """
+    Bisección vectorizada: busca x en [bajo, alto] con funcion(x) = objetivo,
+    para una funcion creciente. Todos los parámetros pueden ser arreglos;
+    donde el objetivo no queda dentro del intervalo el resultado es NaN.
+    """
+    objetivo = np.asarray(objetivo, dtype=np.float64)
+    bajo, alto = (np.asarray(x, dtype=np.float64) for x in (bajo, alto))
+    bajo, alto, objetivo = np.broadcast_arrays(bajo, alto, objetivo)
+    bajo, alto = bajo.copy(), alto.copy()
+    acotado = (funcion(bajo) <= objetivo) & (funcion(alto) >= objetivo)
+    for _ in range(max_iter):
+        medio = (bajo + alto) / 2
+        arriba = funcion(medio) >= objetivo
+        alto = np.where(arriba, medio, alto)
+        bajo = np.where(arriba, bajo, medio)
+        if np.all(alto - bajo <= tolerancia):
+            break
+    resultado = np.where(acotado, (bajo + alto) / 2, np.nan)
+    return float(resultado) if resultado.ndim == 0 else resultado
+
+
+def tasa_necesaria(target, initial, monthly, term, bajo=-0.99, alto=1.0):
+    """
+    Tasa anual necesaria para llegar a 'target' con el aporte dado. No tiene
+    inversa cerrada, así que se resuelve por bisección (vectorizada); NaN si
+    ninguna tasa en [bajo, alto] alcanza la meta.
+    """
+    return resolver_intervalo(lambda r: valor_final(initial, monthly, r, term), target, bajo, alto)
+
+
 def calcular_inversion(initial, monthly, rate, term):
-    total = initial
-    monthly_rate = (1 + rate) ** (1/12) - 1
-    for _ in range(term):
-        total = total * (1 + monthly_rate) + monthly
-    return total
+    resultado = valor_final(initial, monthly, rate, term)
+    return float(resultado) if resultado.ndim == 0 else resultado
+
+
+def interpretar_tasa(rate_type):
+    """Convierte '6%', '12.5%', 0.06 o similares en tasa anual decimal."""
+    if isinstance(rate_type, str):
+        texto = rate_type.strip()
+        try:
+            if texto.endswith("%"):
+                return float(texto[:-1]) / 100
+            return float(texto)
+        except ValueError:
+            raise ValueError(f"Tasa no soportada: '{rate_type}'. Usa un valor como '6%' o 0.06.")
+    return float(rate_type)
+
 
 def evaluar_inversion(rate_type, initial, monthly, term):
-    if rate_type == '6%':
-        rate = 0.06
-    elif rate_type == '12%':
-        rate = 0.12
+    return calcular_inversion(initial, monthly, interpretar_tasa(rate_type), term)
+
+
+def _rendimientos(generador, caminos, term, rate, volatility, distribucion):
+    """Rendimientos mensuales simulados (caminos x term) con media igual a la tasa mensual."""
+    media = tasa_mensual(rate)
+    sigma = volatility / np.sqrt(12)
+    if distribucion == "normal":
+        return generador.normal(media, sigma, size=(caminos, term))
+    if distribucion == "lognormal":
+        # log(1 + r) normal, ajustado para que E[1 + r] = 1 + media
+        mu = np.log1p(media) - sigma ** 2 / 2
+        return np.expm1(generador.normal(mu, sigma, size=(caminos, term)))
+    raise ValueError(f"Distribución no soportada: '{distribucion}'. Usa 'normal' o 'lognormal'.")
+
+
+def _simular_bloque(initial, monthly, rate, volatility, term, caminos, semilla, distribucion, objetivo,
+                    modo="valores", limites=None):
+    """
+    Simula un bloque de caminos y devuelve (resumen, caminos que alcanzaron el objetivo).
+    El resumen depende de 'modo': "valores" -> la matriz completa (caminos x meses);
+    "rango" -> (mínimo, máximo) por mes; "histograma" -> conteos (meses x BINS_HISTOGRAMA)
+    entre los 'limites' (mínimo, máximo) por mes. La misma semilla da los mismos caminos.
+    """
+    generador = np.random.default_rng(semilla)
+    tasas = _rendimientos(generador, caminos, term, rate, volatility, distribucion)
+    valores = _acumular(initial, np.full(term, float(monthly)), tasas)
+    exitos = 0 if objetivo is None else int(np.count_nonzero(valores[:, -1] >= objetivo))
+    if modo == "valores":
+        return valores, exitos
+    if modo == "rango":
+        return (valores.min(axis=0), valores.max(axis=0)), exitos
+    bajo, ancho = _clases(limites)
+    clases = np.clip(((valores - bajo) / ancho).astype(np.int64), 0, BINS_HISTOGRAMA - 1)
+    clases += np.arange(term) * BINS_HISTOGRAMA
+    conteos = np.bincount(clases.ravel(), minlength=term * BINS_HISTOGRAMA)
+    return conteos.reshape(term, BINS_HISTOGRAMA), exitos
+
+
+def _clases(limites):
+    """Inicio y ancho de las clases del histograma de cada mes."""
+    bajo, alto = limites
+    ancho = (alto - bajo) / BINS_HISTOGRAMA
+    return bajo, np.where(ancho > 0, ancho, 1.0)
+
+
+def _percentiles_histograma(conteos, limites, percentiles):
+    """Percentiles por mes a partir de los conteos, interpolando dentro de la clase."""
+    bajo, ancho = _clases(limites)
+    acumulados = np.cumsum(conteos, axis=1)
+    total = acumulados[:, -1]
+    meses = np.arange(conteos.shape[0])
+    bandas = []
+    for q in percentiles:
+        objetivo = q / 100 * total
+        clase = np.minimum((acumulados < objetivo[:, None]).sum(axis=1), BINS_HISTOGRAMA - 1)
+        antes = np.where(clase > 0, acumulados[meses, clase - 1], 0)
+        en_clase = np.maximum(conteos[meses, clase], 1)
+        fraccion = np.clip((objetivo - antes) / en_clase, 0.0, 1.0)
+        bandas.append(bajo + ancho * (clase + fraccion))
+    return np.array(bandas)
+
+
+def simular_montecarlo(initial, monthly, rate, term, volatility=0.15, caminos=20000, objetivo=None,
+                       semilla=None, distribucion="lognormal", percentiles=PERCENTILES, procesos=None):
+    """
+    Simulación Monte Carlo de una inversión con rendimientos mensuales aleatorios.
+    rate / volatility: rendimiento y volatilidad anuales (0.06 = 6%).
+    Los caminos se simulan por bloques de TAMANO_BLOQUE. Si todos los valores
+    caben en LIMITE_VALORES_EXACTOS los percentiles se calculan exactos sobre la
+    matriz completa; si no, en dos pasadas con las mismas semillas: la primera da
+    el rango de cada mes y la segunda histogramas por mes que se suman entre
+    bloques (error menor que una clase: rango / BINS_HISTOGRAMA). Con más de
+    UMBRAL_PROCESOS caminos los bloques se reparten en un pool de procesos. La
+    misma semilla da el mismo resultado con o sin procesos.
+    Devuelve un diccionario con 'meses', una banda 'P<n>' por percentil y
+    'probabilidad' de terminar con al menos 'objetivo' (None si no se indicó).
+    """
+    term = int(term)
+    caminos = int(caminos)
+    if term <= 0 or caminos <= 0:
+        raise ValueError("El plazo y el número de caminos deben ser mayores que cero.")
+    tamanos = [TAMANO_BLOQUE] * (caminos // TAMANO_BLOQUE)
+    if caminos % TAMANO_BLOQUE:
+        tamanos.append(caminos % TAMANO_BLOQUE)
+    # Una semilla independiente por bloque: el resultado no depende del orden de ejecución
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    tareas = [(initial, monthly, rate, volatility, term, n, s, distribucion, objetivo)
+              for n, s in zip(tamanos, semillas)]
+    usar_procesos = caminos > UMBRAL_PROCESOS and len(tareas) > 1
+
+    def correr(modo, limites=None):
+        columnas = list(zip(*tareas)) + [[modo] * len(tareas), [limites] * len(tareas)]
+        if usar_procesos:
+            max_workers = procesos or min(len(tareas), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                return list(pool.map(_simular_bloque, *columnas))
+        return [_simular_bloque(*t) for t in zip(*columnas)]
+
+    if caminos * term <= LIMITE_VALORES_EXACTOS:
+        resultados = correr("valores")
+        bandas = np.percentile(np.concatenate([v for v, _ in resultados]), percentiles, axis=0)
+    else:
+        resultados = correr("rango")
+        limites = (np.min([r[0] for r, _ in resultados], axis=0), np.max([r[1] for r, _ in resultados], axis=0))
+        conteos = sum(h for h, _ in correr("histograma", limites))
+        bandas = _percentiles_histograma(conteos, limites, percentiles)
+    resultado = {"meses": np.arange(1, term + 1)}
+    for q, banda in zip(percentiles, bandas):
+        resultado[f"P{q:g}"] = banda
+    exitos = sum(e for _, e in resultados)
+    resultado["probabilidad"] = None if objetivo is None else exitos / caminos
+    return resultado
+
+
+def _barrer_bloque(ejes, inicio, fin):
+    """Valor final de las combinaciones inicio..fin-1 (en orden de la rejilla) de los ejes dados."""
+    indices = np.unravel_index(np.arange(inicio, fin), tuple(len(e) for e in ejes))
+    initial, monthly, rate, term = (eje[i] for eje, i in zip(ejes, indices))
+    return valor_final(initial, monthly, rate, term)
+
+
+def barrer_escenarios(initials, monthlies, rates, terms, procesos=None):
+    """
+    Evalúa la rejilla completa de combinaciones (inicial x aporte x tasa x plazo)
+    con la fórmula cerrada. Cada parámetro puede ser un número o una lista de
+    valores (por ejemplo np.linspace). Las rejillas de más de UMBRAL_BARRIDO
+    combinaciones se reparten por bloques en un pool de procesos.
+    Devuelve un DataFrame con una fila por combinación: Inicial, Aporte Mensual,
+    Tasa, Plazo y Valor Final.
+    """
+    ejes = [np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (initials, monthlies, rates, terms)]
+    forma = tuple(len(e) for e in ejes)
+    total = int(np.prod(forma))
+    if total > UMBRAL_BARRIDO:
+        limites = list(range(0, total, BLOQUE_BARRIDO)) + [total]
+        max_workers = procesos or min(len(limites) - 1, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            bloques = pool.map(_barrer_bloque, [ejes] * (len(limites) - 1), limites[:-1], limites[1:])
+            valores = np.concatenate(list(bloques))
     else:
-        raise ValueError("Tasa no soportada, usa '6%' o '12%'.")
-    return calcular_inversion(initial, monthly, rate, term)
+        valores = _barrer_bloque(ejes, 0, total)
+    # Las columnas de parámetros se arman repitiendo cada eje según su posición en la rejilla
+    tabla = {}
+    repeticiones = 1
+    for nombre, eje, restante in zip(COLUMNAS_BARRIDO, ejes, (int(np.prod(forma[i + 1:])) for i in range(4))):
+        tabla[nombre] = np.tile(np.repeat(eje, restante), repeticiones)
+        repeticiones *= len(eje)
+    tabla["Valor Final"] = valores
+    import pandas as pd
+    return pd.DataFrame(tabla)
+
+
+def _tabla_desde_saldos(saldo_inicial, saldos, tasas):
+    """Pago, interés y capital de cada mes a partir de los saldos (pago = saldo previo con interés - saldo)."""
+    previos = np.concatenate((saldo_inicial[:, None], saldos[:, :-1]), axis=1)
+    interes = previos * tasas[:, None]
+    pago = previos + interes - saldos
+    return {"pago": pago, "interes": interes, "capital": pago - interes, "saldo": saldos}
+
+
+def amortizar_prestamo(principal, rate, term):
+    """
+    Tablas de amortización de préstamos a pago fijo (sistema francés), en lote.
+    principal, rate (tasa anual nominal, se cobra rate / 12 al mes) y term
+    (meses) pueden ser arreglos de la misma longitud: un préstamo por posición.
+    El saldo de cada mes sale de la fórmula cerrada, sin recorrer los periodos.
+    Devuelve {'pago', 'interes', 'capital', 'saldo'} con arreglos (préstamos x meses);
+    'meses' es el plazo más largo y los préstamos más cortos quedan en 0 al terminar.
+    """
+    principal, r, term = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64))
+                                               for v in (principal, np.asarray(rate) / 12, term)))
+    meses = int(term.max())
+    k = np.arange(1, meses + 1)
+    crecimiento = np.power(1 + r[:, None], k)
+    final = np.power(1 + r, term)
+    # Pago fijo: P * r / (1 - (1 + r)^-n); con tasa 0, P / n
+    pago = np.divide(principal * r * final, final - 1, out=principal / term, where=r != 0)
+    anualidad = np.divide(crecimiento - 1, r[:, None], out=np.broadcast_to(k, crecimiento.shape).astype(np.float64),
+                          where=r[:, None] != 0)
+    saldos = principal[:, None] * crecimiento - pago[:, None] * anualidad
+    saldos = np.where(k >= term[:, None], 0.0, np.maximum(saldos, 0.0))
+    return _tabla_desde_saldos(principal, saldos, r)
+
+
+def amortizar_tarjeta(saldo, rate, pct_minimo=0.05, pago_minimo=200, meses=120):
+    """
+    Tablas de tarjetas de crédito pagando sólo el mínimo, en lote: cada mes se
+    paga el mayor entre pct_minimo del saldo con intereses y pago_minimo (o el
+    saldo completo si es menor). rate es la tasa anual nominal (rate / 12 al mes).
+    Mientras rige el porcentaje el saldo decrece geométricamente y después, con
+    el pago mínimo fijo, como una anualidad; ambas fases tienen forma cerrada.
+    Devuelve el mismo diccionario que amortizar_prestamo para 'meses' meses.
+    """
+    saldo, r, pct, piso = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=np.float64))
+                                               for v in (saldo, np.asarray(rate) / 12, pct_minimo, pago_minimo)))
+    k = np.arange(1, int(meses) + 1)
+    q = (1 + r) * (1 - pct)
+    # Meses en que el porcentaje supera al pago mínimo: pct * (1 + r) * saldo * q^(k-1) >= piso
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cruce = np.log(piso / (pct * (1 + r) * saldo)) / np.log(q)
+    fase1 = np.where(pct * (1 + r) * saldo < piso, 0,
+                     np.where(q < 1, np.floor(np.nan_to_num(cruce, nan=0.0, posinf=meses)) + 1, meses))
+    fase1 = np.clip(fase1, 0, meses)[:, None]
+    saldo_cruce = saldo[:, None] * np.power(q[:, None], fase1)
+    j = np.maximum(k - fase1, 0)
+    crecimiento = np.power(1 + r[:, None], j)
+    anualidad = np.divide(crecimiento - 1, r[:, None], out=j.astype(np.float64), where=r[:, None] != 0)
+    saldos = np.where(k <= fase1, saldo[:, None] * np.power(q[:, None], k),
+                      saldo_cruce * crecimiento - piso[:, None] * anualidad)
+    # Una vez liquidada, la deuda se queda en 0 (el último pago cubre el resto)
+    saldos = np.where(np.minimum.accumulate(saldos, axis=1) <= 0, 0.0, saldos)
+    return _tabla_desde_saldos(saldo, saldos, r)
+
+
+def pagos_como_gastos(pagos, inicio, categoria="Crédito", etapa=None):
+    """
+    Convierte una matriz de pagos (créditos x meses) en filas con la forma de la
+    tabla gastos (id, categoria, monto, periodicidad, fecha, etapa, origen), una por
+    mes con pago, para sumarlas al flujo de efectivo como gastos únicos.
+    inicio: 'YYYY-MM' o 'YYYY-MM-DD' del primer pago.
+    """
+    pagos = np.atleast_2d(np.asarray(pagos, dtype=np.float64))
+    mes0 = int(str(inicio)[:4]) * 12 + int(str(inicio)[5:7]) - 1
+    creditos, meses = np.nonzero(pagos > 0.005)
+    absolutos = mes0 + meses
+    return [(None, categoria, float(pagos[c, m]), "único", f"{a // 12:04d}-{a % 12 + 1:02d}-01", etapa, "credito")
+            for c, m, a in zip(creditos.tolist(), meses.tolist(), absolutos.tolist())]
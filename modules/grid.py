@@ -0,0 +1,213 @@
+# modules/grid.py
+
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+from modules import db_handler
+from modules.db_executor import en_segundo_plano
+
+# Filas que se piden de más arriba y abajo de la ventana visible
+BUFFER_FILAS = 50
+
+
+class ProveedorFilas:
+    """
+    Filas de una tabla de la base por posición. ids() devuelve el orden completo
+    (sólo los ids, del índice de la columna) y filas() lee las filas de unos
+    cuantos ids; ambas corren en el hilo de la base de datos.
+    """
+    def __init__(self, tabla):
+        self.tabla = tabla
+
+    def ids(self, orden="id", descendente=False, filtros=None):
+        ids = db_handler.obtener_ids_ordenados(self.tabla, orden, descendente, **(filtros or {}))
+        return np.frombuffer(ids, dtype=np.int64) if len(ids) else np.empty(0, dtype=np.int64)
+
+    def filas(self, ids):
+        return db_handler.obtener_filas_por_id(self.tabla, ids)
+
+
+class TablaVirtual:
+    """
+    Treeview que muestra millones de filas sin crearlas: tiene tantos ítems como
+    filas visibles y, al desplazarse, sólo cambia sus valores. La barra de
+    desplazamiento representa la posición dentro del arreglo de ids; las filas
+    de la ventana visible (más un margen) se piden al proveedor en segundo plano.
+    Al hacer clic en un encabezado se ordena por esa columna con SQL indexado.
+    columnas: secuencia de (clave, título, ancho) en el orden de las filas;
+    formatos: {clave: función} para mostrar un valor.
+    """
+    def __init__(self, master, proveedor, columnas, filas_visibles=12, formatos=None, al_fallar=None):
+        self.proveedor = proveedor
+        self.columnas = [clave for clave, _, _ in columnas]
+        self.titulos = {clave: titulo for clave, titulo, _ in columnas}
+        self.formatos = formatos or {}
+        self.filas_visibles = filas_visibles
+        self.al_fallar = al_fallar
+        self.orden, self.descendente, self.filtros = "id", False, {}
+        self._ids = np.empty(0, dtype=np.int64)
+        self._inicio = 0
+        self._cache = {}  # id -> fila, sólo de la ventana actual y su margen
+        self._pidiendo = False
+        self._generacion = 0  # Descarta respuestas de un orden o filtro anterior
+        self._seleccionado = None
+
+        self.frame = tk.Frame(master, bg="#ffffff")
+        self.tree = ttk.Treeview(self.frame, columns=self.columnas, show="headings",
+                                 height=filas_visibles, selectmode="browse")
+        for clave, titulo, ancho in columnas:
+            self.tree.heading(clave, text=titulo, command=lambda c=clave: self.ordenar(c))
+            self.tree.column(clave, width=ancho, anchor="e" if clave in ("id", "monto") else "w")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._desplazar)
+        self.etiqueta = tk.Label(self.frame, text="Cargando...", bg="#ffffff", anchor="w")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.etiqueta.grid(row=1, column=0, columnspan=2, sticky="w")
+
+        self.tree.bind("<MouseWheel>", lambda e: self._mover(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self._mover(-3))
+        self.tree.bind("<Button-5>", lambda e: self._mover(3))
+        self.tree.bind("<Prior>", lambda e: self._mover(-self.filas_visibles) or "break")
+        self.tree.bind("<Next>", lambda e: self._mover(self.filas_visibles) or "break")
+        self.tree.bind("<Up>", lambda e: self._tecla(-1))
+        self.tree.bind("<Down>", lambda e: self._tecla(1))
+        self.tree.bind("<<TreeviewSelect>>", self._al_seleccionar)
+
+    def pack(self, **opciones):
+        self.frame.pack(**opciones)
+
+    # ---------- orden y filtros ----------
+    def recargar(self):
+        """Vuelve a pedir el orden de ids (por ejemplo, después de cambios en la base)."""
+        self._generacion += 1
+        generacion = self._generacion
+        self.etiqueta.config(text="Cargando...")
+        en_segundo_plano(self.frame, self.proveedor.ids, self.orden, self.descendente, dict(self.filtros),
+                         al_terminar=lambda ids: self._recibir_ids(generacion, ids), al_fallar=self._fallo)
+
+    def ordenar(self, columna):
+        """Ordena por 'columna'; un segundo clic en la misma columna invierte el sentido."""
+        self.descendente = not self.descendente if columna == self.orden else False
+        self.orden = columna
+        for clave in self.columnas:
+            flecha = (" ▼" if self.descendente else " ▲") if clave == columna else ""
+            self.tree.heading(clave, text=self.titulos[clave] + flecha)
+        self.recargar()
+
+    def filtrar(self, **filtros):
+        """Filtros de igualdad de db_handler (None quita el filtro de esa columna)."""
+        self.filtros = {col: valor for col, valor in filtros.items() if valor is not None}
+        self.recargar()
+
+    def _recibir_ids(self, generacion, ids):
+        if generacion != self._generacion:
+            return
+        self._ids = ids
+        self._cache = {}
+        self._pidiendo = False
+        self.etiqueta.config(text=f"{ids.size:,} registros")
+        self._ir_a(0)
+
+    def _fallo(self, error):
+        self._pidiendo = False
+        if self.al_fallar is not None:
+            self.al_fallar(error)
+        else:
+            print(f"Error en la base de datos: {error}")
+
+    # ---------- desplazamiento ----------
+    def _maximo_inicio(self):
+        return max(self._ids.size - self.filas_visibles, 0)
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        # Mismo protocolo que yview: ("moveto", fracción) o ("scroll", n, "units"/"pages")
+        if accion == "moveto":
+            self._ir_a(int(round(float(cantidad) * self._ids.size)))
+        elif accion == "scroll":
+            paso = self.filas_visibles if unidad == "pages" else 1
+            self._mover(int(cantidad) * paso)
+
+    def _mover(self, filas):
+        self._ir_a(self._inicio + filas)
+
+    def _tecla(self, direccion):
+        # Las flechas recorren los ítems visibles; en el borde se desplaza la ventana
+        items = self.tree.get_children()
+        foco = self.tree.focus()
+        if not items or foco not in items:
+            return None
+        posicion = items.index(foco) + direccion
+        if 0 <= posicion < len(items):
+            return None
+        self._mover(direccion)
+        self.tree.focus(foco)
+        self.tree.selection_set(foco)
+        return "break"
+
+    def _ir_a(self, inicio):
+        self._inicio = min(max(inicio, 0), self._maximo_inicio())
+        total = self._ids.size
+        if total:
+            self.scrollbar.set(self._inicio / total, min(self._inicio + self.filas_visibles, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self._pintar()
+        self._pedir_faltantes()
+
+    def _ventana(self, margen):
+        return self._ids[max(self._inicio - margen, 0):self._inicio + self.filas_visibles + margen]
+
+    def _pedir_faltantes(self):
+        # Se pide cuando falta algo de la ventana visible o de la mitad del margen,
+        # y entonces se trae todo el margen de una vez
+        if self._pidiendo or all(int(i) in self._cache for i in self._ventana(BUFFER_FILAS // 2)):
+            return
+        faltantes = [int(i) for i in self._ventana(BUFFER_FILAS) if int(i) not in self._cache]
+        self._pidiendo = True
+        generacion = self._generacion
+        en_segundo_plano(self.frame, self.proveedor.filas, faltantes,
+                         al_terminar=lambda filas: self._recibir_filas(generacion, filas), al_fallar=self._fallo)
+
+    def _recibir_filas(self, generacion, filas):
+        if generacion != self._generacion:
+            return
+        self._pidiendo = False
+        vigentes = set(self._ventana(BUFFER_FILAS).tolist())
+        self._cache = {i: fila for i, fila in self._cache.items() if i in vigentes}
+        self._cache.update((fila[0], fila) for fila in filas if fila[0] in vigentes)
+        self._pintar()
+        self._pedir_faltantes()
+
+    # ---------- dibujo ----------
+    def _formatear(self, fila):
+        return [self.formatos[clave](valor) if clave in self.formatos and valor is not None else valor
+                for clave, valor in zip(self.columnas, fila)]
+
+    def _pintar(self):
+        ids = self._ids[self._inicio:self._inicio + self.filas_visibles].tolist()
+        items = list(self.tree.get_children())
+        # Los ítems se crean o quitan sólo si cambia cuántas filas caben; lo demás es actualizar valores
+        for item in items[len(ids):]:
+            self.tree.delete(item)
+        for _ in range(len(items), len(ids)):
+            items.append(self.tree.insert("", "end"))
+        seleccion = []
+        for item, id_fila in zip(items, ids):
+            fila = self._cache.get(id_fila)
+            valores = self._formatear(fila) if fila is not None else [id_fila] + ["…"] * (len(self.columnas) - 1)
+            self.tree.item(item, values=valores, tags=(str(id_fila),))
+            if id_fila == self._seleccionado:
+                seleccion.append(item)
+        # La selección sigue al registro, no a la posición del ítem
+        self.tree.selection_set(seleccion)
+
+    def _al_seleccionar(self, _evento):
+        seleccion = self.tree.selection()
+        if seleccion:
+            self._seleccionado = int(self.tree.item(seleccion[0], "tags")[0])
+
+    def seleccionado(self):
+        """Id del registro seleccionado, o None."""
+        return self._seleccionado
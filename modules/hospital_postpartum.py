@@ -1,7 +1,21 @@
 # modules/hospital_postpartum.py
 
-class HospitalExpense:
+from modules.expense_base import GastoBase
+
+
+class HospitalExpense(GastoBase):
+    __slots__ = ("item", "fecha")
+
     def __init__(self, item, costo, fecha):
+        super().__init__(costo, "único")
         self.item = item
-        self.costo = costo
         self.fecha = fecha
+
+    @property
+    def costo(self):
+        # El costo es el monto por periodo de GastoBase
+        return self.monto
+
+    @costo.setter
+    def costo(self, valor):
+        self.monto = valor
@@ -0,0 +1,124 @@
+# modules/image_cache.py
+
+import os
+import tkinter as tk
+from collections import OrderedDict
+
+# PIL se importa al abrir la primera imagen, no al arrancar la aplicación
+
+CARPETA_IMAGENES = "images"
+# Cuántas versiones reescaladas (archivo, tamaño) se conservan
+MAX_VARIANTES = 12
+# Milisegundos sin nuevos <Configure> antes de hacer el reescalado de calidad
+RETARDO_AJUSTE_MS = 150
+
+
+class CacheImagenes:
+    """
+    Decodifica cada archivo de imagen una sola vez y guarda las versiones
+    reescaladas más recientes (LRU por archivo y tamaño), para que varias
+    páginas con el mismo fondo, o el mismo tamaño de ventana, no repitan trabajo.
+    """
+    def __init__(self, carpeta=CARPETA_IMAGENES, max_variantes=MAX_VARIANTES):
+        self.carpeta = carpeta
+        self.max_variantes = max_variantes
+        self._originales = {}  # archivo -> Image decodificada (None si no se pudo abrir)
+        self._variantes = OrderedDict()  # (archivo, tamaño) -> PhotoImage con LANCZOS
+        self._iconos = {}  # (archivo, tamaño) -> PhotoImage; no se desalojan
+
+    def original(self, archivo):
+        if archivo not in self._originales:
+            imagen = None
+            path = os.path.join(self.carpeta, archivo)
+            if os.path.exists(path):
+                try:
+                    from PIL import Image
+                    imagen = Image.open(path)
+                    imagen.load()  # Decodifica ahora y no en cada reescalado
+                except Exception as e:
+                    print(f"Error cargando imagen {archivo}: {e}")
+                    imagen = None
+            self._originales[archivo] = imagen
+        return self._originales[archivo]
+
+    def buscar(self, archivo, tamano):
+        """Versión de calidad ya calculada para ese tamaño, o None."""
+        clave = (archivo, tamano)
+        foto = self._variantes.get(clave)
+        if foto is not None:
+            self._variantes.move_to_end(clave)
+        return foto
+
+    def redimensionada(self, archivo, tamano, rapido=False):
+        """
+        PhotoImage del archivo al tamaño dado. Con rapido=True usa un filtro
+        barato y no se guarda (sirve mientras se arrastra el borde de la ventana).
+        """
+        foto = self.buscar(archivo, tamano)
+        if foto is not None:
+            return foto
+        imagen = self.original(archivo)
+        if imagen is None:
+            return None
+        from PIL import Image, ImageTk
+        if rapido:
+            return ImageTk.PhotoImage(imagen.resize(tamano, Image.NEAREST))
+        foto = ImageTk.PhotoImage(imagen.resize(tamano, Image.LANCZOS))
+        self._variantes[(archivo, tamano)] = foto
+        if len(self._variantes) > self.max_variantes:
+            self._variantes.popitem(last=False)
+        return foto
+
+    def icono(self, archivo, tamano):
+        clave = (archivo, tamano)
+        if clave not in self._iconos:
+            imagen = self.original(archivo)
+            if imagen is None:
+                self._iconos[clave] = None
+            else:
+                from PIL import Image, ImageTk
+                self._iconos[clave] = ImageTk.PhotoImage(imagen.resize(tamano, Image.LANCZOS))
+        return self._iconos[clave]
+
+
+imagenes = CacheImagenes()
+
+
+class FondoAjustable:
+    """
+    Label de fondo que ocupa todo su frame y sigue su tamaño. En cada <Configure>
+    pone una versión rápida (o la de calidad si ya está en caché) y programa con
+    after() el reescalado LANCZOS para cuando el tamaño deje de cambiar.
+    """
+    def __init__(self, frame, archivo, cache=None):
+        self.frame = frame
+        self.archivo = archivo
+        self.cache = cache or imagenes
+        self.label = tk.Label(frame)
+        self.label.place(x=0, y=0, relwidth=1, relheight=1)
+        self._foto = None  # Referencia viva de la imagen mostrada
+        self._pendiente = None
+        frame.bind("<Configure>", self._al_configurar)
+
+    def _mostrar(self, foto):
+        if foto is not None:
+            self._foto = foto
+            self.label.config(image=foto)
+
+    def _al_configurar(self, event):
+        tamano = (event.width, event.height)
+        if tamano[0] < 10 or tamano[1] < 10 or self.cache.original(self.archivo) is None:
+            return
+        if self._pendiente is not None:
+            self.frame.after_cancel(self._pendiente)
+            self._pendiente = None
+        foto = self.cache.buscar(self.archivo, tamano)
+        if foto is not None:
+            self._mostrar(foto)
+            return
+        self._mostrar(self.cache.redimensionada(self.archivo, tamano, rapido=True))
+        self._pendiente = self.frame.after(RETARDO_AJUSTE_MS, lambda: self._ajustar(tamano))
+
+    def _ajustar(self, tamano):
+        self._pendiente = None
+        self._mostrar(self.cache.redimensionada(self.archivo, tamano))
@@ -0,0 +1,77 @@
+# modules/importador.py
+
+import csv
+import datetime
+import os
+
+from modules import db_handler
+
+# Mismas columnas que escribe excel_export (hoja Gastos)
+COLUMNAS_EXPORTADAS = ["id", "categoria", "monto", "periodicidad", "fecha", "etapa", "origen"]
+
+
+def _leer_csv(ruta):
+    with open(ruta, newline="", encoding="utf-8-sig") as f:
+        for fila in csv.DictReader(f):
+            yield fila
+
+
+def _leer_xlsx(ruta):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Se necesita 'openpyxl' para importar archivos .xlsx.")
+    # read_only recorre las filas sin cargar toda la hoja en memoria
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezados = [str(c).strip() if c is not None else "" for c in next(filas, [])]
+        for valores in filas:
+            if valores is None or all(v is None for v in valores):
+                continue
+            yield dict(zip(encabezados, valores))
+    finally:
+        libro.close()
+
+
+def _a_gasto(fila):
+    faltantes = [col for col in COLUMNAS_EXPORTADAS[1:6] if fila.get(col) in (None, "")]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en la fila: {', '.join(faltantes)}")
+    fecha = fila["fecha"]
+    if isinstance(fecha, (datetime.date, datetime.datetime)):
+        fecha = fecha.strftime("%Y-%m-%d")
+    return (str(fila["categoria"]), float(fila["monto"]), str(fila["periodicidad"]),
+            str(fecha), str(fila["etapa"]), fila.get("origen") or "general")
+
+
+def leer_gastos(ruta):
+    """
+    Recorre un archivo .csv o .xlsx con las columnas de la exportación a Excel
+    y produce tuplas listas para db_handler.insertar_gastos_lote.
+    La columna 'id' se ignora: la base asigna ids nuevos.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".csv":
+        filas = _leer_csv(ruta)
+    elif extension in (".xlsx", ".xlsm"):
+        filas = _leer_xlsx(ruta)
+    else:
+        raise ValueError("Formato no soportado, usa .csv o .xlsx.")
+    for fila in filas:
+        yield _a_gasto(fila)
+
+
+def importar_gastos(ruta, tamano_lote=db_handler.TAMANO_LOTE):
+    """Importa los gastos del archivo en una sola transacción y devuelve los ids insertados."""
+    return db_handler.insertar_gastos_lote(leer_gastos(ruta), tamano_lote=tamano_lote)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("Uso: python -m modules.importador <archivo.csv|archivo.xlsx>")
+        sys.exit(1)
+    db_handler.init_db()
+    ids = importar_gastos(sys.argv[1])
+    print(f"Se importaron {len(ids)} gastos.")
@@ -0,0 +1,118 @@
+# modules/inflation.py
+
+import csv
+import datetime
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from modules.expense_store import factores_periodicidad, UNICO, MENSUAL, ANUAL, FECHA_DESCONOCIDA
+
+# Tabla de inflación anual (%) por año; se puede cambiar por otra con el mismo formato
+RUTA_INFLACION = os.path.join("data", "inflacion.csv")
+
+
+def leer_tabla_inflacion(ruta=None):
+    """Lee el CSV (columnas anio, inflacion en %) y devuelve {año: tasa decimal}."""
+    ruta = ruta or RUTA_INFLACION
+    with open(ruta, newline="", encoding="utf-8") as archivo:
+        return {int(fila["anio"]): float(fila["inflacion"]) / 100 for fila in csv.DictReader(archivo)}
+
+
+_ORDINAL_1970 = datetime.date(1970, 1, 1).toordinal()
+
+
+def mes_inicial(inicio=None):
+    """
+    Mes absoluto (año * 12 + mes - 1) de 'inicio': 'YYYY-MM[-DD]', date, o un
+    mes absoluto ya calculado; por defecto el mes actual.
+    """
+    if inicio is None:
+        inicio = datetime.date.today()
+    if isinstance(inicio, (int, np.integer)):
+        return int(inicio)
+    if isinstance(inicio, str):
+        inicio = datetime.date.fromisoformat(f"{inicio[:7]}-01")
+    return inicio.year * 12 + inicio.month - 1
+
+
+def version_tabla(ruta=None):
+    """(ruta, fecha de modificación) de la tabla de inflación: cambia si se edita el CSV."""
+    ruta = ruta or RUTA_INFLACION
+    return ruta, os.path.getmtime(ruta)
+
+
+@lru_cache(maxsize=32)
+def _indice_cacheado(ruta, modificado, primer_mes, meses):
+    # 'modificado' forma parte de la clave: si el CSV cambia, el índice se vuelve a construir
+    tabla = leer_tabla_inflacion(ruta)
+    if not tabla:
+        raise ValueError(f"La tabla de inflación '{ruta}' está vacía.")
+    anios_tabla = np.array(sorted(tabla))
+    tasas_tabla = np.array([tabla[a] for a in anios_tabla])
+    # Año calendario de cada mes; los años fuera de la tabla usan el más cercano disponible
+    absolutos = primer_mes + np.arange(meses)
+    posiciones = np.clip(np.searchsorted(anios_tabla, absolutos // 12, side="right") - 1, 0, None)
+    crecimiento = np.log1p(tasas_tabla[posiciones]) / 12
+    # El mes de inicio vale 1.0; cada mes siguiente acumula la inflación mensual equivalente
+    indice = np.exp(np.concatenate(([0.0], np.cumsum(crecimiento[1:]))))
+    indice.setflags(write=False)
+    return indice
+
+
+def indice_precios(meses, inicio=None, ruta=None):
+    """
+    Índice acumulado de precios mes a mes a partir de 'inicio' (ver mes_inicial;
+    por defecto el mes actual), con 1.0 en el primer mes. Se calcula una vez por
+    combinación de tabla, inicio y meses, y se reutiliza (arreglo de sólo lectura).
+    """
+    return _indice_cacheado(*version_tabla(ruta), mes_inicial(inicio), int(meses))
+
+
+def meses_absolutos(ordinales):
+    """Mes absoluto (año * 12 + mes - 1) de cada fecha dada como ordinal (date.toordinal)."""
+    dias = (np.asarray(ordinales, dtype=np.int64) - _ORDINAL_1970).astype("datetime64[D]")
+    return dias.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+
+def totales_nominales(almacen, duraciones, inicio=None, ruta=None):
+    """
+    Total nominal de cada etapa (arreglo alineado con 'duraciones') gasto por gasto:
+    cada gasto empieza en el mes de su fecha y dura lo que su etapa; los que no
+    tienen fecha válida empiezan donde caería su etapa si las etapas fueran una
+    tras otra desde 'inicio'. El índice de precios vale 1.0 en el mes de 'inicio'
+    (por defecto el actual), así que los meses anteriores quedan deflactados.
+    único -> índice del mes de inicio del gasto; mensual -> suma del índice en
+    sus meses; anual -> esa suma / 12.
+    """
+    duraciones = np.asarray(duraciones, dtype=np.int64)
+    num_etapas = duraciones.size
+    n = almacen.n
+    etapas = almacen.etapa[:n]
+    dentro = etapas < num_etapas
+    etapas = etapas[dentro]
+    if etapas.size == 0:
+        return np.zeros(num_etapas)
+    codigos = almacen.periodicidad[:n][dentro]
+    montos = almacen.monto[:n][dentro]
+    ordinales = almacen.fecha[:n][dentro]
+    referencia = mes_inicial(inicio)
+    conocidas = ordinales != FECHA_DESCONOCIDA
+    # Sin fecha: el mes en que empezaría la etapa, con las etapas una tras otra
+    inicios_etapa = referencia + np.cumsum(duraciones) - duraciones
+    comienzos = inicios_etapa[etapas]
+    comienzos[conocidas] = meses_absolutos(ordinales[conocidas])
+    fines = comienzos + duraciones[etapas]
+    base = min(int(comienzos.min()), referencia)
+    ultimo = max(int(fines.max()), referencia + 1)
+    indice = indice_precios(ultimo - base, base, ruta)
+    indice = indice / indice[referencia - base]
+    acumulado = np.concatenate(([0.0], np.cumsum(indice)))
+    desde, hasta = comienzos - base, fines - base
+    suma_meses = acumulado[hasta] - acumulado[desde]
+    factores = np.zeros(etapas.size)
+    factores[codigos == UNICO] = indice[np.minimum(desde, indice.size - 1)][codigos == UNICO]
+    factores[codigos == MENSUAL] = suma_meses[codigos == MENSUAL]
+    factores[codigos == ANUAL] = suma_meses[codigos == ANUAL] / 12
+    return np.bincount(etapas, weights=montos * factores, minlength=num_etapas)
@@ -1,62 +1,279 @@
 # modules/models.py
 
-class Gasto:
+from collections import namedtuple
+from collections.abc import MutableSequence
+
+from modules.expense_base import GastoBase, Periodicidad, total_periodico
+from modules.expense_store import AlmacenGastos
+from modules.inflation import totales_nominales, mes_inicial, version_tabla
+
+
+def normalizar_nombre(nombre):
+    """Forma canónica del nombre de una etapa para compararlo ('  Primer año ' -> 'primer año')."""
+    return (nombre or "").strip().lower()
+
+
+def calcular_total_periodico(monto, periodicidad, periodos):
+    """Total de un monto con periodicidad 'único', 'mensual' o 'anual' a lo largo de 'periodos' meses."""
+    return total_periodico(monto, periodicidad, periodos)
+
+
+class Gasto(GastoBase):
+    __slots__ = ("categoria", "fecha", "etapa")
+
     def __init__(self, categoria, monto, periodicidad, fecha, etapa):
+        super().__init__(monto, periodicidad)  # 'único', 'mensual', 'anual'
         self.categoria = categoria
-        self.monto = monto
-        self.periodicidad = periodicidad  # 'único', 'mensual', 'anual'
         self.fecha = fecha
         self.etapa = etapa
 
+    calcular_total = GastoBase.total
+
+
+class GastoGuardado(namedtuple("GastoGuardado", "categoria monto periodicidad fecha etapa id")):
+    """
+    Gasto leído del almacén de una etapa. Es de sólo lectura: asignar un atributo
+    lanza AttributeError, porque el cambio no llegaría al almacén. Para cambiar un
+    gasto se quita y se agrega otro. id es el de la base, o None.
+    """
+    __slots__ = ()
+
     def calcular_total(self, periodos):
-        if self.periodicidad == "único":
-            return self.monto
-        elif self.periodicidad == "mensual":
-            return self.monto * periodos
-        elif self.periodicidad == "anual":
-            return self.monto * (periodos / 12)
+        return total_periodico(self.monto, self.periodicidad, periodos)
+
+    total = calcular_total
+
+
+class GastosEtapa(MutableSequence):
+    """
+    Vista de lista de los gastos de una etapa. Se lee del almacén en cada acceso
+    y lo que se agrega o se quita pasa por la etapa (agregar_gasto / quitar_gasto),
+    así que etapa.gastos.append(g) sigue funcionando como con la lista de antes.
+    A diferencia de aquella lista, los elementos son GastoGuardado de sólo lectura
+    (no los Gasto agregados), sólo se puede agregar al final y no se pueden
+    reemplazar elementos.
+    """
+    def __init__(self, etapa):
+        self._etapa = etapa
+
+    def _posiciones(self):
+        return self._etapa._almacen.posiciones_etapa(self._etapa._indice)
+
+    def _gasto(self, posicion):
+        categoria, monto, periodicidad, fecha, gasto_id = self._etapa._almacen.fila(int(posicion))
+        return GastoGuardado(categoria, monto, periodicidad, fecha, self._etapa.nombre, gasto_id)
+
+    def __len__(self):
+        return len(self._posiciones())
+
+    def __getitem__(self, indice):
+        posiciones = self._posiciones()
+        if isinstance(indice, slice):
+            return [self._gasto(p) for p in posiciones[indice]]
+        return self._gasto(posiciones[indice])
+
+    def __setitem__(self, indice, valor):
+        raise TypeError("Los gastos de una etapa no se reemplazan: quite uno y agregue otro")
+
+    def __delitem__(self, indice):
+        posiciones = self._posiciones()
+        quitar = posiciones[indice] if isinstance(indice, slice) else [posiciones[indice]]
+        # De la última posición a la primera: al quitar, el último gasto ocupa el
+        # lugar libre y las posiciones menores no cambian
+        for posicion in sorted((int(p) for p in quitar), reverse=True):
+            self._quitar_posicion(posicion)
+
+    def _quitar_posicion(self, posicion):
+        almacen = self._etapa._almacen
+        gasto_id = almacen.fila(posicion)[4]
+        if gasto_id is None:
+            almacen.quitar_posicion(posicion)
         else:
-            return 0
+            self._etapa.quitar_gasto(gasto_id)
+
+    def insert(self, indice, gasto):
+        if indice < len(self):
+            raise TypeError("Los gastos de una etapa sólo se pueden agregar al final")
+        self._etapa.agregar_gasto(gasto)
+
+    def append(self, gasto):
+        self._etapa.agregar_gasto(gasto)
+
+    def remove(self, gasto):
+        """Quita el primer gasto con la misma categoría, monto, periodicidad y fecha."""
+        buscado = (gasto.categoria, gasto.monto, gasto.periodicidad, gasto.fecha)
+        almacen = self._etapa._almacen
+        for posicion in self._posiciones():
+            if almacen.fila(int(posicion))[:4] == buscado:
+                self._quitar_posicion(int(posicion))
+                return
+        raise ValueError("El gasto no está en la etapa")
+
+    def clear(self):
+        del self[:]
+
+    def __repr__(self):
+        return f"GastosEtapa({self._etapa.nombre!r}, {len(self)} gastos)"
 
 
 class Etapa:
     def __init__(self, nombre, duracion_meses):
         self.nombre = nombre
+        # Los gastos viven en columnas de un AlmacenGastos; al agregar la etapa
+        # a un PlanVida pasa a usar el almacén compartido del plan.
+        self._almacen = AlmacenGastos()
+        self._indice = 0
+        self._total_cache = None  # (versión de la etapa en el almacén, total)
         self.duracion_meses = duracion_meses
-        self.gastos = []  # Lista de objetos Gasto
 
-    def agregar_gasto(self, gasto):
-        self.gastos.append(gasto)
+    @property
+    def duracion_meses(self):
+        return self._duracion_meses
+
+    @duracion_meses.setter
+    def duracion_meses(self, valor):
+        # Los totales dependen de la duración: al cambiarla se invalida la caché
+        self._duracion_meses = valor
+        self._total_cache = None
+
+    @property
+    def gastos(self):
+        """
+        Gastos de la etapa como lista (GastosEtapa): append, remove, del, etc.
+        modifican el almacén; los elementos (GastoGuardado) son de sólo lectura.
+        """
+        return GastosEtapa(self)
+
+    @gastos.setter
+    def gastos(self, gastos):
+        gastos = list(gastos)
+        vista = GastosEtapa(self)
+        vista.clear()
+        vista.extend(gastos)
+
+    def agregar_gasto(self, gasto, gasto_id=None):
+        """Agrega el gasto; con gasto_id (id en la base) se podrá quitar después con quitar_gasto."""
+        self._almacen.agregar(gasto.categoria, gasto.monto, gasto.periodicidad, gasto.fecha,
+                              self._indice, gasto_id)
+
+    def quitar_gasto(self, gasto_id):
+        """Quita el gasto con ese id de la base; devuelve True si pertenecía a la etapa."""
+        if self._almacen.etapa_de(gasto_id) != self._indice:
+            return False
+        self._almacen.quitar(gasto_id)
+        return True
+
+    def totales_por_periodicidad(self):
+        """Suma de montos de la etapa por periodicidad: {'único': ..., 'mensual': ..., 'anual': ...}."""
+        sumas = self._almacen.sumas_etapa(self._indice)
+        return {p.texto: float(sumas[p]) for p in Periodicidad if p.texto}
 
     def calcular_total_gastos(self):
-        return sum(gasto.calcular_total(self.duracion_meses) for gasto in self.gastos)
+        # Sólo los cambios de esta etapa invalidan su total
+        version = self._almacen.version_etapa(self._indice)
+        if self._total_cache is None or self._total_cache[0] != version:
+            self._total_cache = (version, self._almacen.total_etapa(self._indice, self._duracion_meses))
+        return self._total_cache[1]
+
+    def _usar_almacen(self, almacen, indice):
+        # Copia los gastos que ya tuviera la etapa al nuevo almacén
+        for categoria, monto, periodicidad, fecha, gasto_id in list(self._almacen.filas(self._indice)):
+            almacen.agregar(categoria, monto, periodicidad, fecha, indice, gasto_id)
+        self._almacen = almacen
+        self._indice = indice
+        self._total_cache = None
 
 
 class PlanVida:
     def __init__(self):
         self.etapas = []  # Ejemplo: "Embarazo", "Nacimiento", "Primer Año", etc.
+        self.almacen = AlmacenGastos()  # Gastos de todas las etapas, columna "etapa" = índice
+        self._indice_etapas = {}  # nombre normalizado -> Etapa
+        self._total_cache = None  # ((versión, duraciones), total)
+        self._nominal_cache = None  # ((versión, duraciones, mes de inicio, tabla), totales)
 
     def agregar_etapa(self, etapa):
+        etapa._usar_almacen(self.almacen, len(self.etapas))
         self.etapas.append(etapa)
+        self._indice_etapas.setdefault(normalizar_nombre(etapa.nombre), etapa)
+        self._total_cache = None
+
+    def buscar_etapa(self, nombre):
+        """Devuelve la Etapa con ese nombre (sin importar mayúsculas ni espacios) o None."""
+        return self._indice_etapas.get(normalizar_nombre(nombre))
+
+    def asignar_gastos(self, filas):
+        """
+        Asigna en una sola pasada las filas de la tabla gastos
+        (id, categoria, monto, periodicidad, fecha, etapa, origen) a sus etapas.
+        Devuelve un diccionario {etapa desconocida: cantidad de filas} con las que no se asignaron.
+        """
+        desconocidas = {}
+        indices = {nombre: etapa._indice for nombre, etapa in self._indice_etapas.items()}
+        agregar = self.almacen.agregar
+        for fila in filas:
+            gasto_id, categoria, monto, periodicidad, fecha, etapa_nombre = fila[:6]
+            indice = indices.get(normalizar_nombre(etapa_nombre))
+            if indice is None:
+                desconocidas[etapa_nombre] = desconocidas.get(etapa_nombre, 0) + 1
+                continue
+            agregar(categoria, monto, periodicidad, fecha, indice, gasto_id)
+        return desconocidas
+
+    def quitar_gasto(self, gasto_id):
+        """Quita el gasto con ese id de la base de la etapa que lo tenga; devuelve True si existía."""
+        return self.almacen.quitar(gasto_id) is not None
+
+    def limpiar_gastos(self):
+        """Quita todos los gastos de todas las etapas (por ejemplo, antes de recargarlos)."""
+        self.almacen.vaciar()
+
+    def totales_por_periodicidad(self):
+        """Suma de montos de todo el plan por periodicidad."""
+        sumas = self.almacen.sumas[:len(self.etapas)].sum(axis=0)
+        return {p.texto: float(sumas[p]) for p in Periodicidad if p.texto}
+
+    def duracion_total(self):
+        """Meses desde el inicio de la primera etapa hasta el final de la última."""
+        return sum(etapa.duracion_meses for etapa in self.etapas)
 
     def calcular_total_plan(self):
-        return sum(etapa.calcular_total_gastos() for etapa in self.etapas)
+        clave = (self.almacen.version, tuple(etapa.duracion_meses for etapa in self.etapas))
+        if self._total_cache is None or self._total_cache[0] != clave:
+            total = float(self.almacen.totales_por_etapa(list(clave[1])).sum())
+            self._total_cache = (clave, total)
+        return self._total_cache[1]
+
+    def totales_etapas(self, inflacion=False, inicio=None):
+        """
+        Total de cada etapa (arreglo alineado con self.etapas). Con inflacion=True
+        son pesos nominales: cada gasto se indexa desde el mes de su fecha con el
+        índice de precios de data/inflacion.csv, que vale 1.0 en 'inicio' (por
+        defecto el mes actual); ver inflation.totales_nominales. Se guardan hasta
+        que cambian los gastos, las etapas, el mes de inicio o la tabla (arreglo de
+        sólo lectura). Sin inflación son pesos de hoy (reales).
+        """
+        duraciones = [etapa.duracion_meses for etapa in self.etapas]
+        if inflacion:
+            clave = (self.almacen.version, tuple(duraciones), mes_inicial(inicio), version_tabla())
+            if self._nominal_cache is None or self._nominal_cache[0] != clave:
+                totales = totales_nominales(self.almacen, duraciones, clave[2])
+                totales.setflags(write=False)
+                self._nominal_cache = (clave, totales)
+            return self._nominal_cache[1]
+        return self.almacen.totales_por_etapa(duraciones)
+
+    def calcular_total_plan_nominal(self, inicio=None):
+        return float(self.totales_etapas(inflacion=True, inicio=inicio).sum())
 
 
-class Ingreso:
+class Ingreso(GastoBase):
+    __slots__ = ("tipo", "fecha", "descripcion")
+
     def __init__(self, tipo, monto, periodicidad, fecha, descripcion=""):
+        super().__init__(monto, periodicidad)
         self.tipo = tipo
-        self.monto = monto
-        self.periodicidad = periodicidad
         self.fecha = fecha
         self.descripcion = descripcion
 
-    def calcular_total(self, duracion):
-        if self.periodicidad == "único":
-            return self.monto
-        elif self.periodicidad == "mensual":
-            return self.monto * duracion
-        elif self.periodicidad == "anual":
-            return self.monto * (duracion / 12)
-        else:
-            return 0
+    calcular_total = GastoBase.total
@@ -0,0 +1,284 @@
+# modules/pdf_report.py
+
+import datetime
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from modules import db_handler
+from modules.finances import simular_montecarlo
+
+RUTA_PDF = "reporte_plan_vida.pdf"
+# PNG de las gráficas ya dibujadas, nombrados por el hash de sus datos
+CARPETA_GRAFICAS = os.path.join("data", "graficas_cache")
+MAX_GRAFICAS = 30
+# Cambiarlo invalida las gráficas guardadas (por ejemplo, si cambia cómo se dibujan)
+VERSION_GRAFICAS = 1
+DPI_GRAFICAS = 150
+# A partir de cuántas gráficas por dibujar conviene un pool de procesos: cada
+# proceso arranca un intérprete e importa matplotlib, más caro que dibujar 2 o 3
+UMBRAL_GRAFICAS_PROCESOS = 6
+# Filas de detalle por tabla: cada tabla cabe más o menos en una página, así
+# platypus no tiene que partir tablas enormes
+FILAS_POR_TABLA = 40
+# Cuántas categorías se muestran en la gráfica de barras (las de mayor monto)
+MAX_CATEGORIAS_GRAFICA = 25
+
+
+# ---------------- Gráficas ----------------
+def _barras_categorias(ranura, datos):
+    ax = ranura.ax
+    ranura.barras("montos", datos["categorias"], datos["montos"])
+    ax.set_title("Gastos por Categoría")
+    ax.set_ylabel("MXN")
+    ax.tick_params(axis="x", labelrotation=60, labelsize=7)
+    for etiqueta in ax.get_xticklabels():
+        etiqueta.set_horizontalalignment("right")
+
+
+def _lineas_flujo(ranura, datos):
+    ax = ranura.ax
+    for columna in ("Gastos", "Ingresos", "Balance"):
+        ranura.linea(columna, datos["meses"], datos[columna], label=columna)
+    ax.set_title("Flujo Mensual Proyectado")
+    ax.set_xlabel("Mes")
+    ax.set_ylabel("MXN")
+    ax.legend()
+    ax.grid(True)
+
+
+def _bandas_inversion(ranura, datos):
+    ax = ranura.ax
+    meses = datos["meses"]
+    ax.fill_between(meses, datos["P5"], datos["P95"], alpha=0.3, label="P5 - P95")
+    ranura.linea("P50", meses, datos["P50"], label="Mediana (P50)")
+    if datos.get("meta") is not None:
+        ranura.linea("meta", [meses[0], meses[-1]], [datos["meta"]] * 2, color="red", linestyle="--",
+                     label=f"Meta ${datos['meta']:,.0f}")
+    ax.set_title("Proyección de la Inversión (Monte Carlo)")
+    ax.set_xlabel("Meses")
+    ax.set_ylabel("Valor Acumulado (MXN)")
+    ax.legend()
+    ax.grid(True)
+
+
+_DIBUJOS = {"categorias": _barras_categorias, "flujo": _lineas_flujo, "inversion": _bandas_inversion}
+
+
+def _dibujar(tipo, datos, ruta):
+    """Dibuja la gráfica fuera de pantalla (Agg) y la guarda como PNG."""
+    from modules.charts import Ranura
+    ranura = Ranura(figsize=(7.5, 4))
+    ranura.preparar(tipo)
+    _DIBUJOS[tipo](ranura, datos)
+    ranura.fig.tight_layout()
+    # Se escribe a un temporal y se renombra: nunca queda un PNG a medias en la caché
+    ranura.fig.savefig(ruta + ".tmp", format="png", dpi=DPI_GRAFICAS)
+    os.replace(ruta + ".tmp", ruta)
+    return ruta
+
+
+def clave_grafica(tipo, datos):
+    """Hash de la gráfica: mismo tipo y mismos datos dan el mismo PNG."""
+    texto = json.dumps([VERSION_GRAFICAS, tipo, datos], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def _limpiar_cache(carpeta, conservar):
+    archivos = sorted((os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta) if nombre.endswith(".png")),
+                      key=os.path.getmtime)
+    for ruta in archivos[:max(len(archivos) - MAX_GRAFICAS, 0)]:
+        if ruta not in conservar:
+            os.remove(ruta)
+
+
+def renderizar_graficas(pedidos, carpeta=None, procesos=None):
+    """
+    pedidos: {nombre: (tipo, datos)} con datos serializables en JSON.
+    Devuelve {nombre: ruta del PNG}. Las gráficas que ya están en la caché (por
+    el hash de sus datos) no se vuelven a dibujar; las que faltan se dibujan en
+    este hilo, o en un pool de procesos si son UMBRAL_GRAFICAS_PROCESOS o más.
+    El pool usa spawn: la aplicación tiene varios hilos (Tk, la base) y hacer
+    fork de un proceso con hilos puede dejar candados tomados en el hijo.
+    """
+    carpeta = carpeta or CARPETA_GRAFICAS
+    os.makedirs(carpeta, exist_ok=True)
+    rutas = {nombre: os.path.join(carpeta, clave_grafica(tipo, datos) + ".png")
+             for nombre, (tipo, datos) in pedidos.items()}
+    faltantes = [(tipo, datos, rutas[nombre]) for nombre, (tipo, datos) in pedidos.items()
+                 if not os.path.exists(rutas[nombre])]
+    if len(faltantes) >= UMBRAL_GRAFICAS_PROCESOS and procesos != 1:
+        max_workers = procesos or min(len(faltantes), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_dibujar, *zip(*faltantes)))
+    else:
+        for tarea in faltantes:
+            _dibujar(*tarea)
+    for ruta in rutas.values():
+        os.utime(ruta)  # Las usadas hace poco son las últimas en borrarse
+    _limpiar_cache(carpeta, set(rutas.values()))
+    return rutas
+
+
+# ---------------- Datos del reporte ----------------
+def _datos_graficas(inversion, creditos, meses):
+    from modules.time_management import proyectar_flujo_por_paginas, mes_absoluto
+    totales = sorted(db_handler.totales_gastos_por_categoria(), key=lambda fila: fila[1] or 0, reverse=True)
+    totales = totales[:MAX_CATEGORIAS_GRAFICA]
+    pedidos = {"categorias": ("categorias", {"categorias": [str(c) for c, _ in totales],
+                                             "montos": [float(m or 0) for _, m in totales]})}
+
+    inicio = db_handler.primera_fecha()
+    if inicio is None or mes_absoluto(inicio) < 0:
+        inicio = datetime.date.today().isoformat()
+    paginas = db_handler.paginas_gastos()
+    if creditos:
+        paginas = itertools.chain(paginas, [list(creditos)])
+    flujo = proyectar_flujo_por_paginas(paginas, db_handler.paginas_ingresos(), inicio, meses)
+    pedidos["flujo"] = ("flujo", {"meses": flujo["Mes"].tolist(),
+                                  **{c: flujo[c].round(2).tolist() for c in ("Gastos", "Ingresos", "Balance")}})
+
+    if inversion is not None:
+        p = inversion
+        # Semilla fija: los mismos parámetros dan la misma simulación y la gráfica sale de la caché
+        resultado = simular_montecarlo(p["initial"], p["monthly"], p["rate"], p["term"],
+                                       volatility=p["volatility"], caminos=p["paths"], objetivo=p["target"], semilla=0)
+        pedidos["inversion"] = ("inversion", {"meses": resultado["meses"].tolist(), "meta": p["target"],
+                                              **{b: resultado[b].round(2).tolist() for b in ("P5", "P50", "P95")}})
+    return pedidos, flujo
+
+
+def _etapas_con_gastos(resumen_etapas):
+    """Etapas de la base (en el orden del plan y después las demás) con sus totales por categoría."""
+    por_etapa = {}
+    # Tablas resumen mantenidas por triggers: una fila por grupo, como el reporte en pantalla
+    for etapa, categoria, total in db_handler.totales_gastos_por_etapa_categoria():
+        # Los gastos sin etapa quedan en el grupo '' y no tienen sección propia
+        if etapa:
+            por_etapa.setdefault(etapa, []).append((categoria, total or 0))
+    orden = [nombre for nombre, *_ in resumen_etapas if nombre in por_etapa]
+    return [(etapa, por_etapa[etapa]) for etapa in orden + sorted(set(por_etapa) - set(orden))]
+
+
+# ---------------- Documento ----------------
+def _estilo_tabla(colors, TableStyle, alinear_derecha=()):
+    estilo = [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FEC736")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F4ECF7")]),
+    ]
+    for columna in alinear_derecha:
+        estilo.append(("ALIGN", (columna, 0), (columna, -1), "RIGHT"))
+    return TableStyle(estilo)
+
+
+def _dinero(valor):
+    return "" if valor is None else f"{valor:,.2f}"
+
+
+def generar_reporte_pdf(ruta=RUTA_PDF, resumen_etapas=(), inversion=None, creditos=(), meses=60,
+                        carpeta_graficas=None, procesos=None):
+    """
+    Reporte PDF de varias páginas: resumen por etapa, gráficas (barras por
+    categoría, flujo mensual y bandas de la inversión), una sección por etapa con
+    sus totales por categoría y el detalle de sus gastos, y los ingresos.
+    Los datos se leen de la base en una sola transacción de lectura (una vista
+    coherente) que se cierra antes de dibujar y armar el documento, para no
+    frenar los checkpoints del WAL. Las gráficas se reutilizan si sus datos no
+    cambiaron (ver renderizar_graficas). Pensado para correr fuera del hilo de Tk.
+    resumen_etapas: filas (etapa, meses, total real, total nominal o None).
+    inversion: parámetros de la simulación (como SimulationPage.inversion_params) o None.
+    Devuelve {"paginas": páginas del PDF, "gastos": filas de detalle}.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image,
+                                    PageBreak, KeepTogether)
+
+    resumen_etapas = list(resumen_etapas)
+    with db_handler.transaccion(escritura=False):
+        pedidos, _ = _datos_graficas(inversion, creditos, meses)
+        etapas = [(etapa, categorias, list(db_handler.paginas_gastos(FILAS_POR_TABLA, etapa=etapa)))
+                  for etapa, categorias in _etapas_con_gastos(resumen_etapas)]
+        paginas_ingresos = list(db_handler.paginas_ingresos(FILAS_POR_TABLA))
+    rutas = renderizar_graficas(pedidos, carpeta_graficas, procesos)
+
+    estilos = getSampleStyleSheet()
+    historia = []
+    filas_detalle = 0
+
+    # Portada: título y resumen por etapa
+    historia.append(Paragraph("Reporte del Plan de Vida del Bebé", estilos["Title"]))
+    historia.append(Paragraph(f"Generado el {datetime.date.today():%d/%m/%Y}", estilos["Normal"]))
+    historia.append(Spacer(1, 0.2 * inch))
+    historia.append(Paragraph("Resumen por Etapa", estilos["Heading2"]))
+    filas = [["Etapa", "Meses", "Total (pesos de hoy)", "Total nominal"]]
+    filas += [[etapa, meses_etapa, _dinero(real), _dinero(nominal)]
+              for etapa, meses_etapa, real, nominal in resumen_etapas]
+    if resumen_etapas:
+        nominales = [n for *_, n in resumen_etapas]
+        filas.append(["Total", "", _dinero(sum(r for _, _, r, _ in resumen_etapas)),
+                      _dinero(None if None in nominales else sum(nominales))])
+    tabla = Table(filas, repeatRows=1, colWidths=[1.8 * inch, 0.8 * inch, 1.9 * inch, 1.9 * inch])
+    tabla.setStyle(_estilo_tabla(colors, TableStyle, alinear_derecha=(1, 2, 3)))
+    historia.append(tabla)
+
+    # Gráficas, una debajo de otra (dos por página)
+    historia.append(PageBreak())
+    historia.append(Paragraph("Gráficas", estilos["Heading1"]))
+    for nombre in ("categorias", "flujo", "inversion"):
+        if nombre in rutas:
+            historia.append(Image(rutas[nombre], width=7 * inch, height=7 * inch * 4 / 7.5))
+            historia.append(Spacer(1, 0.15 * inch))
+
+    # Una sección por etapa: totales por categoría y detalle de gastos
+    for etapa, categorias, paginas in etapas:
+        historia.append(PageBreak())
+        historia.append(Paragraph(f"Etapa: {etapa}", estilos["Heading1"]))
+        filas = [["Categoría", "Total"]] + [[c or "", _dinero(t)] for c, t in sorted(categorias, key=lambda fila: str(fila[0]))]
+        filas.append(["Total de la etapa", _dinero(sum(t for _, t in categorias))])
+        tabla = Table(filas, repeatRows=1, colWidths=[4.5 * inch, 1.8 * inch])
+        tabla.setStyle(_estilo_tabla(colors, TableStyle, alinear_derecha=(1,)))
+        historia.append(KeepTogether([Paragraph("Totales por categoría", estilos["Heading3"]), tabla]))
+        historia.append(Paragraph("Detalle de gastos", estilos["Heading3"]))
+        for pagina in paginas:
+            filas = [["Id", "Categoría", "Monto", "Periodicidad", "Fecha", "Origen"]]
+            filas += [[id_fila, categoria or "", _dinero(monto), periodicidad, fecha, origen]
+                      for id_fila, categoria, monto, periodicidad, fecha, _, origen in pagina]
+            filas_detalle += len(pagina)
+            tabla = Table(filas, repeatRows=1,
+                          colWidths=[0.6 * inch, 2.6 * inch, 1.1 * inch, 1.0 * inch, 0.9 * inch, 1.0 * inch])
+            tabla.setStyle(_estilo_tabla(colors, TableStyle, alinear_derecha=(0, 2)))
+            historia.append(tabla)
+
+    # Ingresos
+    historia.append(PageBreak())
+    historia.append(Paragraph("Ingresos", estilos["Heading1"]))
+    for pagina in paginas_ingresos:
+        filas = [["Id", "Tipo", "Monto", "Periodicidad", "Fecha", "Descripción"]]
+        filas += [[id_fila, tipo or "", _dinero(monto), periodicidad, fecha, descripcion or ""]
+                  for id_fila, tipo, monto, periodicidad, fecha, descripcion in pagina]
+        tabla = Table(filas, repeatRows=1,
+                      colWidths=[0.6 * inch, 1.6 * inch, 1.1 * inch, 1.0 * inch, 0.9 * inch, 2.0 * inch])
+        tabla.setStyle(_estilo_tabla(colors, TableStyle, alinear_derecha=(0, 2)))
+        historia.append(tabla)
+    if not paginas_ingresos:
+        historia.append(Paragraph("No hay ingresos registrados.", estilos["Normal"]))
+
+    def numerar(lienzo, documento):
+        lienzo.saveState()
+        lienzo.setFont("Helvetica", 8)
+        lienzo.drawRightString(documento.pagesize[0] - 0.75 * inch, 0.5 * inch, f"Página {documento.page}")
+        lienzo.restoreState()
+
+    documento = SimpleDocTemplate(ruta, pagesize=letter, title="Reporte del Plan de Vida del Bebé",
+                                  leftMargin=0.75 * inch, rightMargin=0.75 * inch)
+    documento.build(historia, onFirstPage=numerar, onLaterPages=numerar)
+    return {"paginas": documento.page, "gastos": filas_detalle}
@@ -1,17 +1,20 @@
 # modules/services.py
 
-class ServiceExpense:
+from modules.expense_base import GastoBase
+
+
+class ServiceExpense(GastoBase):
+    __slots__ = ("servicio",)
+
     def __init__(self, servicio, costo, periodicidad):
+        super().__init__(costo, periodicidad)
         self.servicio = servicio
-        self.costo = costo
-        self.periodicidad = periodicidad
 
-    def total(self, periodos):
-        if self.periodicidad == "único":
-            return self.costo
-        elif self.periodicidad == "mensual":
-            return self.costo * periodos
-        elif self.periodicidad == "anual":
-            return self.costo * (periodos / 12)
-        else:
-            return 0
+    @property
+    def costo(self):
+        # El costo es el monto por periodo de GastoBase
+        return self.monto
+
+    @costo.setter
+    def costo(self, valor):
+        self.monto = valor
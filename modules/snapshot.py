@@ -0,0 +1,91 @@
+# modules/snapshot.py
+
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from modules.expense_store import DTYPE_REGISTRO
+
+# Estado precalculado del plan para arrancar sin releer todos los gastos:
+# <ruta>.<n>.npy con las columnas del almacén y <ruta>.json con lo demás
+# (incluido el nombre del .npy vigente)
+RUTA_SNAPSHOT = os.path.join("data", "plan_vida_snapshot")
+FORMATO = 2
+
+
+def _carpeta_y_base(ruta):
+    ruta = ruta or RUTA_SNAPSHOT
+    return os.path.dirname(ruta) or ".", os.path.basename(ruta)
+
+
+def _borrar_anteriores(carpeta, base, vigente):
+    # El .npy cargado al arrancar sigue mapeado en memoria y en Windows no se
+    # puede borrar todavía: lo que falle se intenta otra vez al siguiente guardado
+    for nombre in glob.glob(os.path.join(glob.escape(carpeta), glob.escape(base) + ".*npy")):
+        if os.path.basename(nombre) != vigente:
+            try:
+                os.remove(nombre)
+            except OSError:
+                pass
+
+
+def guardar_snapshot(plan, version, ruta=None):
+    """
+    Guarda el almacén de gastos del plan junto con la versión de los datos
+    (db_handler.version_datos) que representa. Cada guardado escribe un .npy con
+    nombre nuevo, así nunca se sobrescribe el que está mapeado en memoria; el
+    .json se escribe a un temporal y se reemplaza al final, así nunca queda un
+    snapshot a medias.
+    """
+    carpeta, base = _carpeta_y_base(ruta)
+    ruta_json = os.path.join(carpeta, base + ".json")
+    registro, meta = plan.almacen.exportar()
+    archivo_npy = f"{base}.{time.time_ns()}.npy"
+    meta.update(formato=FORMATO, etapas=[etapa.nombre for etapa in plan.etapas],
+                version=version, filas_registro=int(registro.size), archivo=archivo_npy)
+    try:
+        with open(os.path.join(carpeta, archivo_npy), "wb") as archivo:
+            np.save(archivo, registro)
+        with open(ruta_json + ".tmp", "w", encoding="utf-8") as archivo:
+            json.dump(meta, archivo, ensure_ascii=False)
+        # Al reemplazar el .json el nuevo .npy pasa a ser el vigente
+        os.replace(ruta_json + ".tmp", ruta_json)
+    except OSError as e:
+        print("No se pudo guardar el snapshot del plan:", e)
+        return
+    _borrar_anteriores(carpeta, base, archivo_npy)
+
+
+def cargar_snapshot(plan, version, ruta=None):
+    """
+    Restaura el almacén del plan desde el snapshot si todavía sirve: misma base
+    de datos, mismas etapas y, desde que se guardó, sólo inserciones (ninguna modificación ni
+    borrado). Las columnas se mapean en memoria, sin leer ni convertir fila por fila.
+    Devuelve la versión guardada (si es igual a 'version' no falta nada; si no,
+    faltan las filas con id mayor que su 'ultimo_id') o None si hay que recargar todo.
+    """
+    carpeta, base = _carpeta_y_base(ruta)
+    try:
+        with open(os.path.join(carpeta, base + ".json"), encoding="utf-8") as archivo:
+            meta = json.load(archivo)
+        if meta.get("formato") != FORMATO or meta.get("etapas") != [etapa.nombre for etapa in plan.etapas]:
+            return None
+        guardada = meta["version"]
+        # Un snapshot de otra base (otro archivo o una base recreada) no sirve
+        if (guardada.get("base") != version["base"]
+                or guardada["modificaciones"] != version["modificaciones"]
+                or guardada["inserciones"] > version["inserciones"]
+                or guardada["ultimo_id"] > version["ultimo_id"]):
+            return None
+        registro = np.load(os.path.join(carpeta, meta["archivo"]), mmap_mode="c")
+    except (OSError, ValueError, KeyError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print("Snapshot del plan no válido, se recargará desde la base:", e)
+        return None
+    if registro.dtype != DTYPE_REGISTRO or registro.size != meta["filas_registro"]:
+        return None
+    plan.almacen.restaurar(registro, meta)
+    return guardada
@@ -1,19 +1,140 @@
 # modules/time_management.py
 
+import numpy as np
 import pandas as pd
 
-def generar_cronograma_financiero():
-    data = {
-        "Mes": list(range(1, 61)),
-        "Gastos": [0] * 60,
-        "Ingresos": [0] * 60,
-        "Balance": [0] * 60
-    }
-    df = pd.DataFrame(data)
-    return df
-
-def actualizar_cronograma(df, mes, gastos, ingresos):
-    df.loc[df['Mes'] == mes, 'Gastos'] = gastos
-    df.loc[df['Mes'] == mes, 'Ingresos'] = ingresos
-    df.loc[df['Mes'] == mes, 'Balance'] = ingresos - gastos
-    return df
+from modules.expense_base import Periodicidad
+
+
+def _meses_absolutos(fechas):
+    """Convierte fechas 'YYYY-MM-DD' en número de mes absoluto (año * 12 + mes - 1); -1 si no es válida."""
+    fechas = pd.to_datetime(pd.Series(list(fechas), dtype=object), errors="coerce", format="%Y-%m-%d")
+    meses = fechas.dt.year * 12 + fechas.dt.month - 1
+    return meses.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _columnas(filas):
+    # Un DataFrame de dataset_cache ya trae el código de periodicidad y el mes calculados
+    if isinstance(filas, pd.DataFrame):
+        return (filas["monto"].to_numpy(dtype=np.float64), filas["codigo"].to_numpy(dtype=np.int8),
+                filas["mes"].to_numpy(dtype=np.int64))
+    # Tanto gastos como ingresos tienen monto, periodicidad y fecha en las posiciones 2, 3 y 4
+    filas = list(filas)
+    montos = np.array([f[2] or 0 for f in filas], dtype=np.float64)
+    codigos = np.array([int(Periodicidad.desde_texto(f[3])) for f in filas], dtype=np.int8)
+    meses = _meses_absolutos(f[4] for f in filas)
+    return montos, codigos, meses
+
+
+def expandir_periodicidad(montos, codigos, desplazamientos, meses):
+    """
+    Distribuye cada monto sobre una rejilla mensual de 'meses' posiciones a
+    partir de su mes de inicio (desplazamiento respecto al primer mes):
+    único -> sólo ese mes, mensual -> ese mes y todos los siguientes,
+    anual -> ese mes y cada 12 meses. Los montos que empezaron antes de la
+    rejilla siguen contando desde el mes 0 (o su siguiente aniversario).
+    Devuelve un arreglo de longitud 'meses'.
+    """
+    montos = np.asarray(montos, dtype=np.float64)
+    codigos = np.asarray(codigos)
+    desplazamientos = np.asarray(desplazamientos, dtype=np.int64)
+    flujo = np.zeros(meses, dtype=np.float64)
+    if meses <= 0 or montos.size == 0:
+        return flujo
+
+    # Únicos: se suman en su mes si cae dentro de la rejilla
+    unico = (codigos == Periodicidad.UNICO) & (desplazamientos >= 0) & (desplazamientos < meses)
+    flujo += np.bincount(desplazamientos[unico], weights=montos[unico], minlength=meses)[:meses]
+
+    # Mensuales: arreglo de diferencias (+monto en el mes de inicio) y suma acumulada
+    mensual = (codigos == Periodicidad.MENSUAL) & (desplazamientos < meses)
+    inicio = np.maximum(desplazamientos[mensual], 0)
+    flujo += np.cumsum(np.bincount(inicio, weights=montos[mensual], minlength=meses)[:meses])
+
+    # Anuales: la rejilla se ve como (años x 12); cada monto se acumula hacia abajo
+    # en su columna (mes del año), o sea, se repite cada 12 meses
+    anual = (codigos == Periodicidad.ANUAL) & (desplazamientos < meses)
+    inicio = desplazamientos[anual]
+    inicio = np.where(inicio < 0, inicio % 12, inicio)  # primer aniversario dentro de la rejilla
+    anios = -(-meses // 12)
+    diferencias = np.zeros(anios * 12, dtype=np.float64)
+    np.add.at(diferencias, inicio, montos[anual])
+    flujo += np.cumsum(diferencias.reshape(anios, 12), axis=0).ravel()[:meses]
+    return flujo
+
+
+def mes_absoluto(fecha):
+    """Mes absoluto (año * 12 + mes - 1) de 'YYYY-MM' o 'YYYY-MM-DD'; -1 si no es válida."""
+    return int(_meses_absolutos([f"{str(fecha)[:7]}-01"])[0])
+
+
+def flujo_mensual(filas, primer_mes, meses):
+    """
+    Flujo mes a mes (arreglo de 'meses') de unas filas de gastos o ingresos, a
+    partir del mes absoluto 'primer_mes'. Las filas con fecha inválida se ignoran.
+    Como el resultado es una suma, se puede calcular por partes y sumar.
+    """
+    return _flujo(_columnas(filas), primer_mes, meses)
+
+
+def _flujo(columnas, primer_mes, meses):
+    montos, codigos, meses_filas = columnas
+    validos = meses_filas >= 0
+    return expandir_periodicidad(montos[validos], codigos[validos], meses_filas[validos] - primer_mes, meses)
+
+
+def _cronograma(primer_mes, flujo_gastos, flujo_ingresos):
+    meses = flujo_gastos.size
+    balance = flujo_ingresos - flujo_gastos
+    absolutos = primer_mes + np.arange(meses)
+    return pd.DataFrame({
+        "Mes": np.arange(1, meses + 1),
+        "Periodo": [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in absolutos],
+        "Gastos": flujo_gastos,
+        "Ingresos": flujo_ingresos,
+        "Balance": balance,
+        "Balance Acumulado": np.cumsum(balance),
+    })
+
+
+def proyectar_flujo(gastos, ingresos, meses=60, inicio=None):
+    """
+    Proyecta mes a mes los gastos e ingresos registrados.
+    gastos / ingresos: filas de las tablas (como las devuelve db_handler) o
+                       DataFrames de dataset_cache.marco.
+    inicio: 'YYYY-MM' o 'YYYY-MM-DD' del primer mes; por defecto, el mes del
+            registro más antiguo (o el mes actual si no hay registros).
+    Devuelve un DataFrame con Mes, Periodo, Gastos, Ingresos, Balance y Balance Acumulado.
+    """
+    columnas_g = _columnas(gastos)
+    columnas_i = _columnas(ingresos)
+    if inicio is not None:
+        primer_mes = mes_absoluto(inicio)
+    else:
+        validos = np.concatenate([m[m >= 0] for m in (columnas_g[2], columnas_i[2])])
+        if validos.size:
+            primer_mes = int(validos.min())
+        else:
+            hoy = pd.Timestamp.today()
+            primer_mes = hoy.year * 12 + hoy.month - 1
+    return _cronograma(primer_mes, _flujo(columnas_g, primer_mes, meses), _flujo(columnas_i, primer_mes, meses))
+
+
+def proyectar_flujo_por_paginas(paginas_gastos, paginas_ingresos, inicio, meses=60):
+    """
+    Igual que proyectar_flujo, pero recibe páginas de filas (p. ej. db_handler.paginas_gastos)
+    y sólo tiene una en memoria a la vez. Aquí 'inicio' es obligatorio.
+    """
+    primer_mes = mes_absoluto(inicio)
+    flujo_gastos = np.zeros(meses)
+    flujo_ingresos = np.zeros(meses)
+    for pagina in paginas_gastos:
+        flujo_gastos += flujo_mensual(pagina, primer_mes, meses)
+    for pagina in paginas_ingresos:
+        flujo_ingresos += flujo_mensual(pagina, primer_mes, meses)
+    return _cronograma(primer_mes, flujo_gastos, flujo_ingresos)
+
+
+def generar_cronograma_financiero(gastos=(), ingresos=(), meses=60, inicio=None):
+    """Cronograma de 'meses' meses con Gastos, Ingresos y Balance proyectados de los registros."""
+    return proyectar_flujo(gastos, ingresos, meses=meses, inicio=inicio)